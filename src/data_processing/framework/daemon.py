@@ -0,0 +1,540 @@
+"""
+Data Processing Framework - Worker Daemon
+
+Keeps the transformation wrapper resident so jobs skip interpreter startup,
+engine imports and config parsing:
+1. Accepts job submissions over HTTP on localhost or a Unix socket
+2. Queues jobs by priority with a bounded queue (submissions are rejected when full)
+3. Executes jobs concurrently on a fixed set of worker threads, admitted against
+   a CPU and memory budget; jobs sharing an output directory or target table
+   run one after the other
+4. Reuses warm engine instances and parsed transformation configs between jobs
+   (DQ suites are loaded by each run)
+
+The API can run any contract and config the daemon user can read, so it only
+binds to localhost by default; use --token and --allowed-dir before exposing it.
+
+Usage:
+    python -m framework.daemon serve --port 8765 --workers 4
+    python -m framework.daemon submit --contract contract.yaml --config transform.yaml
+    python -m framework.daemon status <job_id>
+"""
+
+import sys
+import os
+import copy
+import hmac
+import json
+import itertools
+import uuid
+import queue
+import socket
+import argparse
+import threading
+import logging
+import urllib.request
+import urllib.error
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+# Add framework to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from wrapper import (DQTransformationWrapper, TransformationConfig, TransformationEngine,
+                     load_config, prepare_output_dir)
+from utils.scheduler import AdmissionScheduler, CostEstimator
+from utils.structured_logging import setup_logging
+from utils.connections import get_connection_pool, load_destination
+
+
+@dataclass
+class Job:
+    """A transformation job submitted to the daemon"""
+    job_id: str
+    contract_path: str
+    config_path: str
+    output_dir: Optional[str] = None
+    force: bool = False
+    priority: Optional[int] = None  # Overrides execution.priority of the config
+    status: str = 'queued'  # queued | waiting (for admission) | running | success | failed
+    submitted_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    skipped: bool = False
+    error: Optional[str] = None
+    engine: Optional[TransformationEngine] = field(default=None, repr=False)  # Set while running
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable view of the job, with live engine progress while running"""
+        job = {key: value for key, value in self.__dict__.items() if key != 'engine'}
+        engine = self.engine
+        if engine is not None:
+            job['progress'] = engine.progress()
+        return job
+
+
+class EnginePool:
+    """Idle engine instances per transformation type, reused across jobs"""
+    
+    def __init__(self):
+        self._idle: Dict[str, List[TransformationEngine]] = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, engine_type: str) -> Optional[TransformationEngine]:
+        """Take an idle engine for a type, or None if none is warm"""
+        with self._lock:
+            idle = self._idle.get(engine_type)
+            return idle.pop() if idle else None
+    
+    def release(self, engine_type: str, engine: TransformationEngine):
+        """Return an engine to the pool"""
+        with self._lock:
+            self._idle.setdefault(engine_type, []).append(engine)
+
+
+class ConfigCache:
+    """Parsed transformation configs keyed by path and modification time, least recently used evicted"""
+    
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._configs: 'OrderedDict[Tuple, TransformationConfig]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def load(self, config_path: str, contract_path: str, output_dir: str) -> TransformationConfig:
+        """Load a config, re-parsing only when the file changed"""
+        key = (
+            os.path.abspath(config_path), os.path.getmtime(config_path),
+            os.path.abspath(contract_path), output_dir
+        )
+        with self._lock:
+            config = self._configs.get(key)
+            if config is None:
+                config = load_config(config_path, contract_path, output_dir)
+                self._configs[key] = config
+                # Edited configs leave their old versions behind
+                while len(self._configs) > self.max_entries:
+                    self._configs.popitem(last=False)
+            else:
+                self._configs.move_to_end(key)
+        
+        # Jobs get their own copy so per-run changes never leak between jobs
+        return copy.deepcopy(config)
+
+
+class RunLocks:
+    """Locks that serialize jobs sharing an output directory or a target table"""
+    
+    def __init__(self):
+        self._locks: Dict[str, threading.Lock] = {}
+        self._holders: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def hold(self, keys: List[str]):
+        """Hold the locks of all keys (taken in sorted order, so jobs cannot deadlock)"""
+        keys = sorted(set(keys))
+        with self._lock:
+            for key in keys:
+                self._locks.setdefault(key, threading.Lock())
+                self._holders[key] = self._holders.get(key, 0) + 1
+        acquired = []
+        try:
+            for key in keys:
+                self._locks[key].acquire()
+                acquired.append(key)
+            yield
+        finally:
+            for key in reversed(acquired):
+                self._locks[key].release()
+            with self._lock:
+                for key in keys:
+                    self._holders[key] -= 1
+                    if not self._holders[key]:
+                        del self._holders[key]
+                        del self._locks[key]
+
+
+class WorkerDaemon:
+    """Resident job executor with a bounded queue and warm state"""
+    
+    def __init__(self, output_dir: str, workers: int = 4, max_queue: int = 100,
+                 max_history: int = 1000, scheduler: AdmissionScheduler = None,
+                 allowed_dirs: List[str] = None):
+        self.output_dir = output_dir
+        # Contracts and configs must live under these directories (any readable file if None)
+        self.allowed_dirs = [os.path.realpath(path) for path in allowed_dirs] if allowed_dirs else None
+        self.workers = max(1, workers)
+        self.jobs: Dict[str, Job] = {}
+        # Entries are (-priority, sequence, job) so higher priorities are served first
+        self.queue: 'queue.PriorityQueue[Tuple[int, int, Job]]' = queue.PriorityQueue(maxsize=max_queue)
+        self.scheduler = scheduler or AdmissionScheduler(max_concurrent=self.workers)
+        self.cost_estimator = CostEstimator()
+        self._sequence = itertools.count()
+        self.max_history = max_history
+        self.engine_pool = EnginePool()
+        self.config_cache = ConfigCache()
+        self.run_locks = RunLocks()
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+    
+    def start(self):
+        """Start worker threads"""
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"dq-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.logger.info(f"Worker daemon started with {self.workers} workers")
+    
+    def stop(self):
+        """Stop accepting work and let workers exit after their current job"""
+        self._stopping.set()
+    
+    def submit(self, contract_path: str, config_path: str, output_dir: str = None,
+               force: bool = False, priority: int = None) -> Job:
+        """Queue a job; raises queue.Full when the daemon is saturated"""
+        for path in (contract_path, config_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"File not found: {path}")
+            if not self.is_allowed(path):
+                raise PermissionError(f"Not under an allowed directory: {path}")
+        
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            contract_path=contract_path,
+            config_path=config_path,
+            output_dir=output_dir,
+            force=force,
+            priority=priority
+        )
+        self.queue.put_nowait((-(priority or 0), next(self._sequence), job))
+        
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._trim_history()
+        
+        self.logger.info(f"Job {job.job_id} queued: {config_path}")
+        return job
+    
+    def is_allowed(self, path: str) -> bool:
+        """Whether a submitted file lies under one of the allowed directories"""
+        if self.allowed_dirs is None:
+            return True
+        path = os.path.realpath(path)
+        return any(os.path.commonpath([path, allowed]) == allowed for allowed in self.allowed_dirs)
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job"""
+        with self._lock:
+            return self.jobs.get(job_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Queue and job counters"""
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        
+        return {
+            'workers': self.workers,
+            'queue_size': self.queue.qsize(),
+            'queue_capacity': self.queue.maxsize,
+            'jobs': counts,
+            'scheduler': self.scheduler.stats(),
+            'connections': get_connection_pool().stats()
+        }
+    
+    def _worker(self):
+        """Worker loop"""
+        while not self._stopping.is_set():
+            try:
+                _, _, job = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                # Close warehouse sessions left idle too long while there is no work
+                get_connection_pool().prune()
+                continue
+            
+            try:
+                self._execute(job)
+            finally:
+                self.queue.task_done()
+    
+    def _execute(self, job: Job):
+        """Run one job with a warm engine once the scheduler admits it"""
+        job.status = 'waiting'
+        engine = None
+        config = None
+        
+        try:
+            output_dir = job.output_dir or os.path.join(
+                self.output_dir, os.path.splitext(os.path.basename(job.config_path))[0]
+            )
+            config = self.config_cache.load(job.config_path, job.contract_path, output_dir)
+            config.force = job.force
+            
+            # Runs sharing an output directory (run state, reports) or a target table wait for each other
+            with self.run_locks.hold(self._lock_keys(config)):
+                prepare_output_dir(output_dir)
+                
+                engine = self.engine_pool.acquire(config.type)
+                wrapper = DQTransformationWrapper(config, engine=engine)
+                engine = wrapper.engine
+                job.engine = engine
+                
+                priority = job.priority if job.priority is not None else config.priority
+                with self.scheduler.admit(config.name, self.cost_estimator.estimate(config), priority):
+                    job.status = 'running'
+                    job.started_at = datetime.now().isoformat()
+                    success = wrapper.run()
+            job.skipped = wrapper.skipped
+            job.status = 'success' if success else 'failed'
+        
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            self.logger.error(f"Job {job.job_id} failed: {str(e)}")
+        
+        finally:
+            job.engine = None
+            if engine is not None and config is not None:
+                self.engine_pool.release(config.type, engine)
+            job.finished_at = datetime.now().isoformat()
+            self.logger.info(f"Job {job.job_id} {job.status}")
+    
+    @staticmethod
+    def _lock_keys(config: TransformationConfig) -> List[str]:
+        """Output directory and destination-qualified target tables of a job"""
+        destination = get_connection_pool().destination_key(load_destination(config.contract_path))
+        keys = [f"output:{os.path.realpath(config.output_dir)}"]
+        keys.extend(f"table:{destination}:{table.lower()}" for table in config.target_tables)
+        return keys
+    
+    def _trim_history(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        if len(self.jobs) <= self.max_history:
+            return
+        
+        finished = [job for job in self.jobs.values() if job.status in ('success', 'failed')]
+        for job in finished[:len(self.jobs) - self.max_history]:
+            del self.jobs[job.job_id]
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """JSON API for the worker daemon"""
+    
+    daemon: WorkerDaemon = None
+    # Bearer token required on every request when set
+    token: Optional[str] = None
+    
+    def do_GET(self):
+        """GET /health, /jobs/<id>"""
+        if not self._authorized():
+            return
+        if self.path == '/health':
+            self._send(200, {'status': 'ok', **self.daemon.stats()})
+        elif self.path.startswith('/jobs/'):
+            job = self.daemon.get(self.path[len('/jobs/'):])
+            if job:
+                self._send(200, job.to_dict())
+            else:
+                self._send(404, {'error': 'Job not found'})
+        else:
+            self._send(404, {'error': 'Not found'})
+    
+    def do_POST(self):
+        """POST /jobs with {contract, config, output?, force?, priority?}"""
+        if not self._authorized():
+            return
+        if self.path != '/jobs':
+            self._send(404, {'error': 'Not found'})
+            return
+        
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            job = self.daemon.submit(
+                contract_path=payload['contract'],
+                config_path=payload['config'],
+                output_dir=payload.get('output'),
+                force=bool(payload.get('force', False)),
+                priority=int(payload['priority']) if payload.get('priority') is not None else None
+            )
+            self._send(202, job.to_dict())
+        except queue.Full:
+            # Backpressure: clients retry later instead of piling up work
+            self._send(503, {'error': 'Job queue is full, retry later'}, {'Retry-After': '5'})
+        except PermissionError as e:
+            self._send(403, {'error': str(e)})
+        except (KeyError, ValueError, FileNotFoundError) as e:
+            self._send(400, {'error': str(e)})
+    
+    def _authorized(self) -> bool:
+        """Check the bearer token, answering 401 when it is missing or wrong"""
+        if not self.token:
+            return True
+        if hmac.compare_digest(self.headers.get('Authorization', ''), f"Bearer {self.token}"):
+            return True
+        self._send(401, {'error': 'Missing or invalid token'}, {'WWW-Authenticate': 'Bearer'})
+        return False
+    
+    def _send(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None):
+        """Write a JSON response"""
+        data = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def address_string(self) -> str:
+        """Unix socket clients have no host/port"""
+        if isinstance(self.client_address, tuple) and self.client_address:
+            return str(self.client_address[0])
+        return 'unix'
+    
+    def log_message(self, format: str, *args):
+        """Route access logs through the framework logger"""
+        logging.getLogger(__name__).debug(format % args)
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """HTTP server listening on a Unix domain socket"""
+    daemon_threads = True
+    
+    def server_bind(self):
+        """Replace a stale socket file before binding"""
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def serve(daemon: WorkerDaemon, host: str = '127.0.0.1', port: int = 8765,
+          socket_path: str = None, token: str = None):
+    """Serve the daemon API until interrupted"""
+    handler = type('BoundDaemonRequestHandler', (DaemonRequestHandler,), {'daemon': daemon, 'token': token})
+    if not token and not socket_path and host not in ('127.0.0.1', 'localhost', '::1'):
+        daemon.logger.warning(f"Worker daemon on {host} accepts unauthenticated jobs; set --token")
+    
+    if socket_path:
+        server = ThreadingUnixHTTPServer(socket_path, handler)
+        address = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        address = f"http://{host}:{port}"
+    
+    daemon.start()
+    daemon.logger.info(f"Worker daemon listening on {address}")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        daemon.logger.info("Shutting down worker daemon")
+    finally:
+        daemon.stop()
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def _request(method: str, path: str, payload: Dict[str, Any] = None, url: str = None,
+             socket_path: str = None, token: str = None) -> Tuple[int, Dict[str, Any]]:
+    """Send a request to a running daemon"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    
+    if socket_path:
+        import http.client
+        
+        class UnixHTTPConnection(http.client.HTTPConnection):
+            def connect(self):
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.connect(socket_path)
+        
+        connection = UnixHTTPConnection('localhost')
+        connection.request(method, path, body=data, headers=headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b'{}')
+    
+    request = urllib.request.Request(f"{url}{path}", data=data, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read() or b'{}')
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'{}')
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Resident worker daemon for DQ transformations')
+    parser.add_argument('--url', default='http://127.0.0.1:8765', help='Daemon URL (client commands)')
+    parser.add_argument('--socket', help='Unix socket path instead of HTTP on localhost')
+    parser.add_argument('--token', default=os.environ.get('DQ_DAEMON_TOKEN'),
+                        help='Bearer token required by (serve) or sent to the daemon (default: $DQ_DAEMON_TOKEN)')
+    
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    serve_parser = subparsers.add_parser('serve', help='Start the daemon')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='Address to bind')
+    serve_parser.add_argument('--port', type=int, default=8765, help='Port to bind')
+    serve_parser.add_argument('--workers', type=int, default=4, help='Concurrent jobs')
+    serve_parser.add_argument('--max-queue', type=int, default=100, help='Queued jobs before rejecting submissions')
+    serve_parser.add_argument('--output', default='./output', help='Default output directory for jobs')
+    serve_parser.add_argument('--max-cpus', type=float, help='CPU budget for concurrent jobs (default: all cores)')
+    serve_parser.add_argument('--max-memory-mb', type=float, help='Memory budget in MB (default: 80%% of host memory)')
+    serve_parser.add_argument('--allowed-dir', action='append',
+                              help='Only accept contracts and configs under this directory (repeatable)')
+    
+    submit_parser = subparsers.add_parser('submit', help='Submit a job')
+    submit_parser.add_argument('--contract', required=True, help='Path to data contract YAML file')
+    submit_parser.add_argument('--config', required=True, help='Path to transformation config YAML file')
+    submit_parser.add_argument('--output', help='Output directory for this job')
+    submit_parser.add_argument('--force', action='store_true', help='Run even if inputs are unchanged')
+    submit_parser.add_argument('--priority', type=int, help='Admission priority (higher first)')
+    
+    status_parser = subparsers.add_parser('status', help='Show job status')
+    status_parser.add_argument('job_id', help='Job identifier')
+    
+    subparsers.add_parser('health', help='Show daemon health and queue size')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'serve':
+        setup_logging()
+        scheduler = AdmissionScheduler(args.max_cpus, args.max_memory_mb, args.workers)
+        daemon = WorkerDaemon(args.output, args.workers, args.max_queue, scheduler=scheduler,
+                              allowed_dirs=args.allowed_dir)
+        serve(daemon, args.host, args.port, args.socket, args.token)
+        sys.exit(0)
+    
+    if args.command == 'submit':
+        status, body = _request('POST', '/jobs', {
+            'contract': os.path.abspath(args.contract),
+            'config': os.path.abspath(args.config),
+            'output': os.path.abspath(args.output) if args.output else None,
+            'force': args.force,
+            'priority': args.priority
+        }, args.url, args.socket, args.token)
+    elif args.command == 'status':
+        status, body = _request('GET', f"/jobs/{args.job_id}", url=args.url, socket_path=args.socket,
+                                token=args.token)
+    else:
+        status, body = _request('GET', '/health', url=args.url, socket_path=args.socket, token=args.token)
+    
+    print(json.dumps(body, indent=2))
+    sys.exit(0 if status < 400 else 1)
+
+
+if __name__ == "__main__":
+    main()
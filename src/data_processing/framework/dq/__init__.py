@@ -3,5 +3,7 @@ Data Quality module for the DQ Transformation Framework
 """
 
 from .gx_runner import GXRunner, GXCheckFailedException
+from .result_store import DQResultStore
+from .result_cache import DQResultCache
 
-__all__ = ['GXRunner', 'GXCheckFailedException']
+__all__ = ['GXRunner', 'GXCheckFailedException', 'DQResultStore', 'DQResultCache']
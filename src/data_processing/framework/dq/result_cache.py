@@ -0,0 +1,83 @@
+"""
+DQ Result Cache
+
+Memoizes DQ check results by (destination, table fingerprint, suite hash,
+check name). Only tables with a reliable fingerprint (a version, cursor,
+content hash or file stats) are cached, so a changed table is never served
+a stale result.
+In a chain of transformations the post-checks of step N and the pre-checks
+of step N+1 validate the same, unchanged table; with a shared cache directory
+the second validation is served from disk instead of being re-run.
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+from typing import Dict, Any, Optional
+
+from utils.fingerprint import hash_payload
+
+
+class DQResultCache:
+    """File-based cache of DQ check results"""
+    
+    def __init__(self, cache_dir: str, max_age_seconds: Optional[int] = None):
+        self.cache_dir = cache_dir
+        self.max_age_seconds = max_age_seconds
+        self.logger = logging.getLogger(__name__)
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(table_fingerprint: str, suite_hash: str, check_name: str, destination: Dict[str, Any]) -> str:
+        """Cache key for a check on a table state in a destination"""
+        return hash_payload([destination, table_fingerprint, suite_hash, check_name])
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached result for a key, or None on miss/expiry"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        
+        try:
+            if self.max_age_seconds is not None:
+                age = time.time() - os.path.getmtime(path)
+                if age > self.max_age_seconds:
+                    return None
+            
+            with open(path, 'r') as f:
+                return json.load(f)['result']
+        
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable DQ cache entry {path}: {str(e)}")
+            return None
+    
+    def put(self, key: str, result: Dict[str, Any], context: Dict[str, Any] = None):
+        """Store a result for a key"""
+        path = self._path(key)
+        entry = {
+            'stored_at': time.time(),
+            'context': context or {},
+            'result': result
+        }
+        
+        try:
+            # Write then rename so concurrent readers never see a partial entry; the temporary
+            # file is unique so concurrent writers (threads or processes) do not share it
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(entry, f, default=str)
+                os.replace(tmp_path, path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+        
+        except Exception as e:
+            self.logger.warning(f"Could not write DQ cache entry {path}: {str(e)}")
+    
+    def _path(self, key: str) -> str:
+        """File path for a cache key"""
+        return os.path.join(self.cache_dir, f"{key}.json")
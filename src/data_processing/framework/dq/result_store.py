@@ -0,0 +1,305 @@
+"""
+DQ Result Store
+
+Append-only columnar history of data quality check results. Every call to
+GXRunner.run_checks writes one Parquet file per run under
+``{output_dir}/dq_history``; files are never rewritten, so concurrent runs
+cannot clobber each other. Queries go through DuckDB's ``read_parquet``.
+
+Usage:
+    python -m dq.result_store --output ./output failure-rates
+    python -m dq.result_store --output ./output trend --table orders --check completeness_check
+"""
+
+import os
+import sys
+import json
+import uuid
+import argparse
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+
+# Column layout of the history files; order is kept stable across writers
+RESULT_COLUMNS = [
+    'run_id',
+    'timestamp',
+    'check_type',
+    'contract_path',
+    'table_name',
+    'check_name',
+    'success',
+    'duration_ms',
+    'row_count',
+    'observed_value',
+    'metrics',
+]
+
+
+class DQResultStore:
+    """Append-only Parquet store for DQ check results"""
+    
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.history_dir = os.path.join(output_dir, 'dq_history')
+        self.logger = logging.getLogger(__name__)
+        
+        os.makedirs(self.history_dir, exist_ok=True)
+    
+    def append(self, run_id: str, check_type: str, contract_path: str,
+               records: List[Dict[str, Any]]) -> Optional[str]:
+        """Append the results of one check run as a new Parquet file"""
+        if not records:
+            return None
+        
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.logger.error("pyarrow not installed. Install with: pip install pyarrow")
+            return None
+        
+        try:
+            timestamp = datetime.now()
+            rows = {column: [] for column in RESULT_COLUMNS}
+            for record in records:
+                rows['run_id'].append(run_id)
+                rows['timestamp'].append(timestamp)
+                rows['check_type'].append(check_type)
+                rows['contract_path'].append(contract_path)
+                rows['table_name'].append(record['table'])
+                rows['check_name'].append(record['check_name'])
+                rows['success'].append(bool(record['success']))
+                rows['duration_ms'].append(float(record.get('duration_ms', 0.0)))
+                rows['row_count'].append(record.get('row_count'))
+                rows['observed_value'].append(self._to_float(record.get('observed_value')))
+                rows['metrics'].append(json.dumps(record.get('metrics') or {}, default=str))
+            
+            schema = pa.schema([
+                ('run_id', pa.string()),
+                ('timestamp', pa.timestamp('us')),
+                ('check_type', pa.string()),
+                ('contract_path', pa.string()),
+                ('table_name', pa.string()),
+                ('check_name', pa.string()),
+                ('success', pa.bool_()),
+                ('duration_ms', pa.float64()),
+                ('row_count', pa.int64()),
+                ('observed_value', pa.float64()),
+                ('metrics', pa.string()),
+            ])
+            table = pa.Table.from_pydict(rows, schema=schema)
+            
+            # Partition directories by check type and day to keep listings small
+            partition_dir = os.path.join(
+                self.history_dir,
+                f"check_type={check_type}",
+                f"date={timestamp.strftime('%Y-%m-%d')}"
+            )
+            os.makedirs(partition_dir, exist_ok=True)
+            
+            # Write to a temporary name first so readers never see a partial file
+            file_name = f"{timestamp.strftime('%H%M%S')}_{run_id}_{uuid.uuid4().hex[:8]}.parquet"
+            file_path = os.path.join(partition_dir, file_name)
+            tmp_path = f"{file_path}.tmp"
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, file_path)
+            
+            self.logger.info(f"DQ results appended to history: {file_path}")
+            return file_path
+        
+        except Exception as e:
+            self.logger.error(f"Error appending DQ results to history: {str(e)}")
+            return None
+    
+    def failure_rates(self, table: str = None, check_name: str = None,
+                      since: str = None) -> List[Dict[str, Any]]:
+        """Failure rate per table and check"""
+        where, params = self._filters(table, check_name, since)
+        query = f"""
+            SELECT
+                table_name,
+                check_name,
+                COUNT(*) AS total_runs,
+                SUM(CASE WHEN success THEN 0 ELSE 1 END) AS failed_runs,
+                AVG(CASE WHEN success THEN 0.0 ELSE 1.0 END) AS failure_rate,
+                MAX(timestamp) AS last_run
+            FROM {self._source()}
+            {where}
+            GROUP BY table_name, check_name
+            ORDER BY failure_rate DESC, table_name, check_name
+        """
+        return self._query(query, params)
+    
+    def metric_trend(self, table: str, check_name: str = None, since: str = None,
+                     bucket: str = 'day') -> List[Dict[str, Any]]:
+        """Metric trend (row count, observed value, duration) bucketed over time"""
+        if bucket not in ('hour', 'day', 'week', 'month'):
+            raise ValueError(f"Unsupported trend bucket: {bucket}")
+        
+        where, params = self._filters(table, check_name, since)
+        query = f"""
+            SELECT
+                date_trunc('{bucket}', timestamp) AS period,
+                table_name,
+                check_name,
+                COUNT(*) AS runs,
+                AVG(CASE WHEN success THEN 0.0 ELSE 1.0 END) AS failure_rate,
+                AVG(row_count) AS avg_row_count,
+                AVG(observed_value) AS avg_observed_value,
+                MIN(observed_value) AS min_observed_value,
+                MAX(observed_value) AS max_observed_value,
+                AVG(duration_ms) AS avg_duration_ms
+            FROM {self._source()}
+            {where}
+            GROUP BY period, table_name, check_name
+            ORDER BY period, table_name, check_name
+        """
+        return self._query(query, params)
+    
+    def history(self, table: str = None, check_name: str = None, since: str = None,
+                limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent raw check results"""
+        where, params = self._filters(table, check_name, since)
+        query = f"""
+            SELECT run_id, timestamp, check_type, table_name, check_name, success,
+                   duration_ms, row_count, observed_value, metrics
+            FROM {self._source()}
+            {where}
+            ORDER BY timestamp DESC
+            LIMIT {int(limit)}
+        """
+        return self._query(query, params)
+    
+    def _source(self) -> str:
+        """read_parquet expression over all history files"""
+        pattern = os.path.join(self.history_dir, '**', '*.parquet').replace("'", "''")
+        return f"read_parquet('{pattern}', hive_partitioning = false, union_by_name = true)"
+    
+    def _filters(self, table: Optional[str], check_name: Optional[str],
+                 since: Optional[str]):
+        """Build WHERE clause and parameters"""
+        clauses = []
+        params = []
+        if table:
+            clauses.append('table_name = ?')
+            params.append(table)
+        if check_name:
+            clauses.append('check_name = ?')
+            params.append(check_name)
+        if since:
+            clauses.append('timestamp >= CAST(? AS TIMESTAMP)')
+            params.append(since)
+        
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return where, params
+    
+    def _query(self, query: str, params: List[Any]) -> List[Dict[str, Any]]:
+        """Run a query against the history files"""
+        if not self._has_history():
+            return []
+        
+        try:
+            import duckdb
+        except ImportError:
+            self.logger.error("DuckDB not installed. Install with: pip install duckdb")
+            return []
+        
+        connection = duckdb.connect(':memory:')
+        try:
+            cursor = connection.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            connection.close()
+    
+    def _has_history(self) -> bool:
+        """Check if at least one history file exists"""
+        for _, _, files in os.walk(self.history_dir):
+            if any(name.endswith('.parquet') for name in files):
+                return True
+        return False
+    
+    @staticmethod
+    def _to_float(value: Any) -> Optional[float]:
+        """Coerce observed values to float where possible"""
+        if value is None or isinstance(value, bool):
+            return None if value is None else float(value)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+
+def main():
+    """Command line entry point for querying DQ history"""
+    parser = argparse.ArgumentParser(description='Query the DQ result history')
+    parser.add_argument('--output', default='./output', help='Output directory containing dq_history')
+    parser.add_argument('--format', choices=['table', 'json'], default='table', help='Output format')
+    
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    rates = subparsers.add_parser('failure-rates', help='Failure rate per table and check')
+    rates.add_argument('--table', help='Filter on table name')
+    rates.add_argument('--check', help='Filter on check name')
+    rates.add_argument('--since', help='Only include results after this ISO timestamp')
+    
+    trend = subparsers.add_parser('trend', help='Metric trend for a table')
+    trend.add_argument('--table', required=True, help='Table name')
+    trend.add_argument('--check', help='Filter on check name')
+    trend.add_argument('--since', help='Only include results after this ISO timestamp')
+    trend.add_argument('--bucket', default='day', choices=['hour', 'day', 'week', 'month'],
+                       help='Time bucket for aggregation')
+    
+    history = subparsers.add_parser('history', help='Most recent raw results')
+    history.add_argument('--table', help='Filter on table name')
+    history.add_argument('--check', help='Filter on check name')
+    history.add_argument('--since', help='Only include results after this ISO timestamp')
+    history.add_argument('--limit', type=int, default=100, help='Maximum number of rows')
+    
+    args = parser.parse_args()
+    store = DQResultStore(args.output)
+    
+    if args.command == 'failure-rates':
+        rows = store.failure_rates(args.table, args.check, args.since)
+    elif args.command == 'trend':
+        rows = store.metric_trend(args.table, args.check, args.since, args.bucket)
+    else:
+        rows = store.history(args.table, args.check, args.since, args.limit)
+    
+    if args.format == 'json':
+        print(json.dumps(rows, indent=2, default=str))
+    else:
+        _print_table(rows)
+    
+    sys.exit(0)
+
+
+def _print_table(rows: List[Dict[str, Any]]):
+    """Print rows as an aligned text table"""
+    if not rows:
+        print("No DQ history found")
+        return
+    
+    columns = list(rows[0].keys())
+    values = [[_format_value(row[column]) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(row[i]) for row in values)) for i, column in enumerate(columns)]
+    
+    print('  '.join(column.ljust(widths[i]) for i, column in enumerate(columns)))
+    print('  '.join('-' * width for width in widths))
+    for row in values:
+        print('  '.join(value.ljust(widths[i]) for i, value in enumerate(row)))
+
+
+def _format_value(value: Any) -> str:
+    """Format a single value for display"""
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    if value is None:
+        return ''
+    return str(value)
+
+
+if __name__ == "__main__":
+    main()
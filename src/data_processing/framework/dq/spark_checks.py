@@ -0,0 +1,281 @@
+"""
+In-job DQ checks for Spark transformations
+
+Spark scripts call check_dataframe on an output DataFrame before writing it.
+The contract-derived expectations of the table are evaluated in the same job
+with a single aggregation over the persisted DataFrame, and the results are
+handed back to the wrapper (through a file in the output dir), which uses
+them instead of re-reading the written table. Only DataFrames that replace
+the whole table (overwrite=True) stand for the table; checks of an appended
+batch say nothing about uniqueness or row counts of the result.
+
+The handoff file is written by the driver, so the job must run in client
+deploy mode (or with an output dir on storage the driver shares).
+
+Usage in a Spark script:
+    from dq.spark_checks import check_dataframe
+
+    orders = check_dataframe(orders, 'main.orders', args.contract, args.output, overwrite=True)
+    orders.write.mode('overwrite').saveAsTable('main.orders')
+"""
+
+import os
+import json
+import glob
+import time
+import logging
+from typing import Dict, Any, List, Optional
+
+import yaml
+
+
+logger = logging.getLogger(__name__)
+
+# GX expectation types that can be evaluated in the aggregation pass
+SUPPORTED_EXPECTATIONS = (
+    'expect_column_values_to_not_be_null',
+    'expect_column_values_to_be_unique',
+    'expect_compound_columns_to_be_unique',
+    'expect_column_values_to_be_in_set',
+    'expect_column_values_to_be_between',
+    'expect_column_values_to_match_regex',
+    'expect_table_row_count_to_be_between'
+)
+
+
+def handoff_path(output_dir: str) -> str:
+    """File through which in-job results reach the wrapper"""
+    return os.path.join(output_dir, 'state', 'in_job_dq.json')
+
+
+def _bare_name(table: str) -> str:
+    return table.split('.')[-1]
+
+
+def _schema_entry(contract: Dict[str, Any], table: str) -> Dict[str, Any]:
+    """Contract schema of a table, also for its staging table (<table>__<suffix>)"""
+    schema = contract.get('schema', {})
+    name = _bare_name(table)
+    if name in schema:
+        return schema[name] or {}
+    if '__' in name:
+        return schema.get(name.rsplit('__', 1)[0]) or {}
+    return {}
+
+
+def contract_expectations(contract: Dict[str, Any], table: str) -> List[Dict[str, Any]]:
+    """Expectations declared by the contract columns of a table, in GX form"""
+    entry = _schema_entry(contract, table)
+    expectations = []
+    
+    primary_key = entry.get('primary_key') or []
+    if isinstance(primary_key, str):
+        primary_key = [primary_key]
+    if primary_key:
+        expectations.append({'expectation_type': 'expect_compound_columns_to_be_unique',
+                             'kwargs': {'column_list': list(primary_key)}})
+    
+    for column, spec in (entry.get('columns') or {}).items():
+        spec = spec or {}
+        if spec.get('nullable') is False or spec.get('required') or column in primary_key:
+            expectations.append({'expectation_type': 'expect_column_values_to_not_be_null',
+                                 'kwargs': {'column': column}})
+        if spec.get('unique'):
+            expectations.append({'expectation_type': 'expect_column_values_to_be_unique',
+                                 'kwargs': {'column': column}})
+        values = spec.get('in_set', spec.get('enum'))
+        if values:
+            expectations.append({'expectation_type': 'expect_column_values_to_be_in_set',
+                                 'kwargs': {'column': column, 'value_set': list(values)}})
+        minimum, maximum = spec.get('min', spec.get('minimum')), spec.get('max', spec.get('maximum'))
+        if minimum is not None or maximum is not None:
+            expectations.append({'expectation_type': 'expect_column_values_to_be_between',
+                                 'kwargs': {'column': column, 'min_value': minimum, 'max_value': maximum}})
+        pattern = spec.get('pattern', spec.get('regex'))
+        if pattern:
+            expectations.append({'expectation_type': 'expect_column_values_to_match_regex',
+                                 'kwargs': {'column': column, 'regex': pattern}})
+    return expectations
+
+
+def suite_expectations(suites_path: str, table: str) -> List[Dict[str, Any]]:
+    """Supported expectations of the GX suites named after a table"""
+    expectations = []
+    name = _bare_name(table)
+    candidates = [name, name.rsplit('__', 1)[0]] if '__' in name else [name]
+    for candidate in candidates:
+        for path in sorted(glob.glob(os.path.join(suites_path, '**', f"*{candidate}*.json"), recursive=True)):
+            with open(path, 'r') as f:
+                suite = json.load(f)
+            expectations.extend(
+                expectation for expectation in suite.get('expectations', [])
+                if expectation.get('expectation_type', expectation.get('type')) in SUPPORTED_EXPECTATIONS
+            )
+        if expectations:
+            break
+    for expectation in expectations:
+        expectation.setdefault('expectation_type', expectation.get('type'))
+    return expectations
+
+
+def check_name(expectation: Dict[str, Any]) -> str:
+    """Stable name of an expectation, e.g. expect_column_values_to_not_be_null:id"""
+    kwargs = expectation.get('kwargs', {})
+    columns = kwargs.get('column_list') or ([kwargs['column']] if 'column' in kwargs else [])
+    name = expectation['expectation_type']
+    return f"{name}:{','.join(columns)}" if columns else name
+
+
+def _aggregates(expectations: List[Dict[str, Any]]):
+    """Aggregate expressions counting the violations of each expectation"""
+    from pyspark.sql import functions as F
+    
+    def violations(condition):
+        return F.sum(F.when(condition, 1).otherwise(0))
+    
+    aggregates = [F.count(F.lit(1)).alias('__rows')]
+    for index, expectation in enumerate(expectations):
+        kind = expectation['expectation_type']
+        kwargs = expectation.get('kwargs', {})
+        alias = f"__e{index}"
+        column = F.col(kwargs['column']) if 'column' in kwargs else None
+        
+        if kind == 'expect_column_values_to_not_be_null':
+            aggregates.append(violations(column.isNull()).alias(alias))
+        elif kind in ('expect_column_values_to_be_unique', 'expect_compound_columns_to_be_unique'):
+            columns = kwargs.get('column_list') or [kwargs['column']]
+            complete = F.lit(True)
+            for name in columns:
+                complete = complete & F.col(name).isNotNull()
+            # Duplicates: complete rows beyond the distinct key values
+            aggregates.append(
+                (violations(complete) - F.countDistinct(*[F.col(name) for name in columns])).alias(alias)
+            )
+        elif kind == 'expect_column_values_to_be_in_set':
+            aggregates.append(violations(column.isNotNull() & ~column.isin(list(kwargs['value_set']))).alias(alias))
+        elif kind == 'expect_column_values_to_be_between':
+            outside = F.lit(False)
+            if kwargs.get('min_value') is not None:
+                outside = outside | (column < F.lit(kwargs['min_value']))
+            if kwargs.get('max_value') is not None:
+                outside = outside | (column > F.lit(kwargs['max_value']))
+            aggregates.append(violations(column.isNotNull() & outside).alias(alias))
+        elif kind == 'expect_column_values_to_match_regex':
+            aggregates.append(violations(column.isNotNull() & ~column.rlike(kwargs['regex'])).alias(alias))
+    return aggregates
+
+
+def evaluate(df, expectations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Row count and per-expectation results of a DataFrame, from one aggregation"""
+    started = time.perf_counter()
+    row = df.agg(*_aggregates(expectations)).collect()[0]
+    row_count = row['__rows']
+    duration_ms = (time.perf_counter() - started) * 1000
+    
+    results = []
+    for index, expectation in enumerate(expectations):
+        kind = expectation['expectation_type']
+        kwargs = expectation.get('kwargs', {})
+        if kind == 'expect_table_row_count_to_be_between':
+            low, high = kwargs.get('min_value'), kwargs.get('max_value')
+            success = (low is None or row_count >= low) and (high is None or row_count <= high)
+            observed = row_count
+        else:
+            observed = row[f"__e{index}"] or 0
+            success = observed == 0
+        results.append({
+            'check_name': check_name(expectation),
+            'success': bool(success),
+            'row_count': row_count,
+            'observed_value': observed,
+            'metrics': {'expectation': expectation, 'in_job': True}
+        })
+    return {'row_count': row_count, 'duration_ms': duration_ms, 'results': results}
+
+
+def write_handoff(output_dir: str, table: str, evaluation: Dict[str, Any]):
+    """Add a table's results to the handoff file"""
+    path = handoff_path(output_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with open(path, 'r') as f:
+            handoff = json.load(f)
+    except (OSError, ValueError):
+        handoff = {'tables': {}}
+    
+    handoff['tables'][table] = {**evaluation, 'checked_at': time.time()}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(handoff, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def check_dataframe(df, table: str, contract_path: str, output_dir: str, suites_path: Optional[str] = None,
+                    persist: bool = True, overwrite: bool = False):
+    """Evaluate a table's expectations on the DataFrame about to be written to it
+    
+    Pass overwrite=True when the DataFrame replaces the table (mode('overwrite'));
+    results of appended DataFrames are recorded but not used for the table.
+    The DataFrame is persisted (unless persist is False) so writing it after the
+    checks does not recompute it; the persisted DataFrame is returned.
+    """
+    with open(contract_path, 'r') as f:
+        contract = yaml.safe_load(f) or {}
+    
+    expectations = contract_expectations(contract, table)
+    if suites_path and os.path.isdir(suites_path):
+        expectations.extend(suite_expectations(suites_path, table))
+    
+    if persist:
+        df = df.persist()
+    
+    evaluation = evaluate(df, expectations)
+    write_handoff(output_dir, table, {**evaluation, 'overwrite': bool(overwrite)})
+    
+    failed = [result['check_name'] for result in evaluation['results'] if not result['success']]
+    if failed:
+        logger.error(f"In-job DQ checks failed on {table}: {failed}")
+    else:
+        logger.info(f"In-job DQ checks passed on {table}: {len(expectations)} expectations, "
+                    f"{evaluation['row_count']} rows")
+    return df
+
+
+def load_handoff(output_dir: str) -> Optional[Dict[str, Any]]:
+    """In-job results handed back by the last Spark execution, if any"""
+    try:
+        with open(handoff_path(output_dir), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_handoff(output_dir: str):
+    """Remove results of a previous execution"""
+    try:
+        os.remove(handoff_path(output_dir))
+    except FileNotFoundError:
+        pass
+
+
+def uncovered_checks(handoff: Dict[str, Any], tables: List[str], check_names: List[str]) -> List[str]:
+    """Configured checks without an in-job result (by check or expectation name) for every table"""
+    uncovered = []
+    for check in check_names:
+        for table in tables:
+            entry = find_table_results(handoff, table) or {}
+            names = {result['check_name'] for result in entry.get('results', [])}
+            names |= {name.split(':', 1)[0] for name in names}
+            if check not in names:
+                uncovered.append(check)
+                break
+    return uncovered
+
+
+def find_table_results(handoff: Dict[str, Any], table: str) -> Optional[Dict[str, Any]]:
+    """Results for a table, matched by qualified or bare name"""
+    tables = handoff.get('tables', {})
+    if table in tables:
+        return tables[table]
+    matches = [entry for name, entry in tables.items() if _bare_name(name) == _bare_name(table)]
+    return matches[0] if len(matches) == 1 else None
@@ -1 +1,104 @@
-# Engine modules for the data processing framework
+"""
+Engine modules for the data processing framework
+
+Engines are declared by name and imported only when a transformation selects
+them, so starting the wrapper does not pay for dbt, Spark or database driver
+imports it will not use. Engines are resolved, in order, from:
+
+1. Engines registered at runtime with register_engine()
+2. Built-in engines shipped with the framework
+3. Installed packages exposing the 'dq_framework.engines' entry point group
+4. A 'package.module:ClassName' import path used directly as the engine type
+"""
+
+import importlib
+import logging
+import threading
+from typing import Dict, List, Union
+
+# Entry point group third-party packages use to provide engines, e.g. in pyproject.toml:
+#   [project.entry-points."dq_framework.engines"]
+#   delta = "my_package.delta_engine:DeltaEngine"
+ENTRY_POINT_GROUP = 'dq_framework.engines'
+
+BUILTIN_ENGINES = {
+    'dbt': '.dbt_engine:DbtEngine',
+    'sql': '.sql_engine:SqlEngine',
+    'spark': '.spark_engine:SparkEngine',
+    'python': '.python_engine:PythonEngine',
+}
+
+_registered: Dict[str, Union[str, type]] = {}
+_loaded: Dict[str, type] = {}
+_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+
+def register_engine(name: str, engine: Union[str, type]):
+    """Register an engine class, or a 'module:Class' path imported on first use"""
+    with _lock:
+        _registered[name] = engine
+        _loaded.pop(name, None)
+
+
+def available_engines() -> List[str]:
+    """Names of all engines that can be selected, without importing them"""
+    names = set(BUILTIN_ENGINES) | set(_registered)
+    names.update(entry_point.name for entry_point in _entry_points())
+    return sorted(names)
+
+
+def get_engine_class(name: str) -> type:
+    """Resolve and import the engine class for a transformation type"""
+    with _lock:
+        if name in _loaded:
+            return _loaded[name]
+    
+    target = _registered.get(name) or BUILTIN_ENGINES.get(name)
+    if target is None:
+        for entry_point in _entry_points():
+            if entry_point.name == name:
+                target = entry_point.value
+                break
+    
+    if target is None and ':' in name:
+        target = name
+    
+    if target is None:
+        raise ValueError(
+            f"Unsupported transformation type: {name}. Available engines: {available_engines()}"
+        )
+    
+    engine_class = target if isinstance(target, type) else _import_target(target)
+    
+    with _lock:
+        _loaded[name] = engine_class
+    return engine_class
+
+
+def _import_target(target: str) -> type:
+    """Import 'module:Class'; modules starting with '.' are relative to this package"""
+    module_name, _, class_name = target.partition(':')
+    if not class_name:
+        raise ValueError(f"Engine target must be 'module:Class', got: {target}")
+    
+    module = importlib.import_module(module_name, package=__name__ if module_name.startswith('.') else None)
+    logger.debug(f"Loaded engine {class_name} from {module.__name__}")
+    return getattr(module, class_name)
+
+
+def _entry_points():
+    """Installed engine entry points"""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+    
+    try:
+        return list(entry_points(group=ENTRY_POINT_GROUP))
+    except TypeError:
+        # Python < 3.10 returns a dict of groups
+        return list(entry_points().get(ENTRY_POINT_GROUP, []))
+
+
+__all__ = ['register_engine', 'available_engines', 'get_engine_class', 'ENTRY_POINT_GROUP', 'BUILTIN_ENGINES']
@@ -0,0 +1,130 @@
+"""
+Transformation engine base classes
+
+Shared by the wrapper and every engine implementation. Kept free of engine
+imports so that engines can be loaded lazily by the registry.
+"""
+
+import threading
+from typing import Dict, Any, List, Optional
+from dataclasses import dataclass, field
+from abc import ABC, abstractmethod
+
+from utils.retry import last_error_line
+
+
+@dataclass
+class TransformationConfig:
+    """Configuration for a data transformation"""
+    name: str
+    type: str
+    source_tables: List[str]
+    target_tables: List[str]
+    transformation_config: Dict[str, Any]
+    pre_dq_checks: List[str]
+    post_dq_checks: List[str]
+    contract_path: str
+    output_dir: str
+    gx_suites_path: Optional[str] = None  # Path to Step 5 generated GX suites
+    dq_cache: Dict[str, Any] = field(default_factory=dict)  # DQ result memoization settings
+    post_checks_in_job: bool = False  # Use results of checks run inside the job as the post-check outcome
+    cursor_columns: Dict[str, str] = field(default_factory=dict)  # Per-table cursor for fingerprints
+    execution_mode: str = 'standard'  # standard | speculative
+    write_audit_publish: bool = False  # Audit staging tables before publishing them
+    keep_previous: bool = False  # Keep replaced targets as <table>__previous on publish
+    keep_failed_staging: bool = True  # Keep staging tables that failed the audit
+    skip_unchanged: bool = False  # Skip the run when inputs match the last successful run
+    force: bool = False  # Run even if inputs are unchanged
+    staging_suffix: Optional[str] = None  # Suffix for staging tables (default: __staging)
+    table_overrides: Dict[str, str] = field(default_factory=dict)  # Target -> table actually written
+    tracing: Dict[str, Any] = field(default_factory=dict)  # Span export settings
+    resources: Dict[str, Any] = field(default_factory=dict)  # Resource accounting and limits
+    logging: Dict[str, Any] = field(default_factory=dict)  # Log level, console format and rotation
+    connections: Dict[str, Any] = field(default_factory=dict)  # Destination connection pool settings
+    timeout_seconds: Optional[float] = None  # Stop engine subprocesses running longer than this
+    priority: int = 0  # Admission priority when runs compete for resources (higher first)
+    checkpoints: bool = False  # Resume a failed run after its completed phases
+    retry: Dict[str, Any] = field(default_factory=dict)  # Retry policy for transient failures
+
+
+class TransformationEngine(ABC):
+    """Abstract base class for transformation engines"""
+    
+    # Engines that honour TransformationConfig.table_overrides can write to staging tables
+    supports_staging = False
+    
+    # Engines whose executions are safe to repeat are retried on transient failures by default
+    idempotent = True
+    
+    # Subprocess engines keep the SubprocessRunner of their current or last execution here
+    runner = None
+    
+    # Exception that made the last execution fail, if the engine caught one
+    last_error = None
+    
+    def __init__(self):
+        # Statements whose runtime or plan regressed against their baseline in the last execution
+        self.query_regressions: List[Dict[str, Any]] = []
+        # Settings the engine derived for the last execution (e.g. Spark auto-tuning)
+        self.engine_settings: Dict[str, Any] = {}
+        # Set by cancel(); cleared when an execution starts and shared with its subprocesses
+        self._cancelled = threading.Event()
+    
+    @abstractmethod
+    def execute(self, config: TransformationConfig) -> bool:
+        """Execute the transformation"""
+        pass
+    
+    @abstractmethod
+    def validate_config(self, config: Dict[str, Any], destination: Dict[str, Any] = None) -> bool:
+        """Validate engine-specific configuration (against the contract destination, when given)"""
+        pass
+    
+    def prepare_sources(self, config: TransformationConfig) -> bool:
+        """Make engine-managed sources (e.g. Parquet views) queryable before pre-checks"""
+        return True
+    
+    def export_outputs(self, config: TransformationConfig) -> bool:
+        """Write published targets to engine-managed outputs (e.g. Parquet files)"""
+        return True
+    
+    def cancel(self):
+        """Request cancellation of a running execution (best effort)"""
+        self._cancelled.set()
+        runner = self.runner
+        if runner is not None:
+            runner.cancel()
+    
+    def _start_execution(self):
+        """Reset per-execution state; called first by every execute()"""
+        self._cancelled.clear()
+        self.runner = None
+        self.last_error = None
+        self.query_regressions = []
+        self.engine_settings = {}
+    
+    def _check_cancelled(self):
+        """Stop the current execution between steps once cancel() was called"""
+        if self._cancelled.is_set():
+            raise RuntimeError("Transformation cancelled")
+    
+    def progress(self) -> Dict[str, Any]:
+        """Live progress metrics of the current execution"""
+        return dict(self.runner.progress) if self.runner is not None else {}
+    
+    def process_usage(self) -> Dict[str, Any]:
+        """CPU seconds, peak RSS and duration of the last engine subprocess"""
+        result = self.runner.result if self.runner is not None else None
+        if result is None:
+            return {}
+        return {**result.rusage, 'duration_seconds': result.duration_seconds}
+    
+    def failure_cause(self):
+        """Error or last error output line explaining why the last execution failed"""
+        if self.last_error is not None:
+            return self.last_error
+        return last_error_line(self.output_tail())
+    
+    def output_tail(self) -> List[str]:
+        """Last output lines of the current or last execution"""
+        return self.runner.tail() if self.runner is not None else []
@@ -5,20 +5,22 @@ Handles dbt-based transformations with proper configuration validation
 and execution within the DQ wrapper framework.
 """
 
-import subprocess
 import os
 import logging
 from typing import Dict, Any
-from ..wrapper import TransformationEngine, TransformationConfig
+from .base import TransformationEngine, TransformationConfig
+from utils.resources import limit_command, limit_violation
+from utils.subprocess_runner import SubprocessRunner, DbtProgressParser
 
 
 class DbtEngine(TransformationEngine):
     """dbt transformation engine"""
     
     def __init__(self):
+        super().__init__()
         self.logger = logging.getLogger(__name__)
     
-    def validate_config(self, config: Dict[str, Any]) -> bool:
+    def validate_config(self, config: Dict[str, Any], destination: Dict[str, Any] = None) -> bool:
         """Validate dbt-specific configuration"""
         dbt_config = config.get('dbt', {})
         
@@ -45,6 +47,7 @@ class DbtEngine(TransformationEngine):
     
     def execute(self, config: TransformationConfig) -> bool:
         """Execute dbt transformation"""
+        self._start_execution()
         try:
             dbt_config = config.transformation_config.get('dbt', {})
             project_dir = dbt_config['project_dir']
@@ -66,26 +69,31 @@ class DbtEngine(TransformationEngine):
             cmd = ' '.join(cmd_parts)
             self.logger.info(f"Executing dbt command: {cmd}")
             
-            # Execute dbt command
-            result = subprocess.run(
-                cmd,
+            # Declared memory/CPU limits are enforced on the subprocess
+            limits = config.resources.get('limits', {})
+            
+            # Execute dbt command, tracking model completion
+            self.runner = SubprocessRunner(
+                'dbt',
+                self.logger,
+                timeout=config.timeout_seconds,
+                progress_parser=DbtProgressParser(),
+                cancel_event=self._cancelled
+            )
+            result = self.runner.run(
+                limit_command(cmd, limits, shell=True),
                 shell=True,
-                capture_output=True,
-                text=True,
                 cwd=project_dir
             )
             
-            # Log output
-            if result.stdout:
-                self.logger.info(f"dbt stdout: {result.stdout}")
-            if result.stderr:
-                self.logger.warning(f"dbt stderr: {result.stderr}")
-            
-            if result.returncode == 0:
+            if result.success:
                 self.logger.info("dbt transformation completed successfully")
                 return True
             else:
                 self.logger.error(f"dbt transformation failed with return code: {result.returncode}")
+                violation = None if result.timed_out or result.cancelled else limit_violation(result.returncode, limits)
+                if violation:
+                    self.logger.error(f"dbt transformation resource limit: {violation}")
                 return False
                 
         except Exception as e:
@@ -5,34 +5,66 @@ Handles custom Python-based transformations with proper configuration validation
 and execution within the DQ wrapper framework.
 """
 
-import subprocess
 import sys
 import os
 import logging
 from typing import Dict, Any
-from ..wrapper import TransformationEngine, TransformationConfig
+from .base import TransformationEngine, TransformationConfig
+from utils.arrow_tables import read_table, write_table, to_arrow, concat_tables, table_sizes
+from utils.connections import get_connection_pool, load_destination
+from utils.partitioned import (SINGLE_RESULT, PartitionedRun, load_entrypoint, call_entrypoint,
+                               split_by_key, split_by_rows)
+from utils.python_envs import EnvironmentCache
+from utils.resources import limit_command, limit_violation
+from utils.subprocess_runner import SubprocessRunner
 
 
 class PythonEngine(TransformationEngine):
     """Python transformation engine"""
     
+    # Scripts receive the (possibly staging) targets through --target-tables
+    supports_staging = True
+    # Scripts may have side effects beyond their outputs; retried only when configured
+    idempotent = False
+    
     def __init__(self):
+        super().__init__()
         self.logger = logging.getLogger(__name__)
     
-    def validate_config(self, config: Dict[str, Any]) -> bool:
+    def validate_config(self, config: Dict[str, Any], destination: Dict[str, Any] = None) -> bool:
         """Validate Python-specific configuration"""
         python_config = config.get('python', {})
+        mode = python_config.get('mode', 'subprocess')
+        if mode not in ('subprocess', 'in_process'):
+            self.logger.error(f"Unsupported Python execution mode: {mode}")
+            return False
         
         # Check required fields
-        required_fields = ['script_path']
+        required_fields = ['entrypoint'] if mode == 'in_process' else ['script_path']
         for field in required_fields:
             if field not in python_config:
                 self.logger.error(f"Missing required Python config field: {field}")
                 return False
         
+        if mode == 'in_process':
+            if ':' not in python_config['entrypoint']:
+                self.logger.error("Python entrypoint must be module:function or path/to/file.py:function")
+                return False
+            if python_config.get('input_format', 'arrow') not in ('arrow', 'pandas'):
+                self.logger.error(f"Unsupported Python input_format: {python_config['input_format']}")
+                return False
+            if python_config.get('requirements_file'):
+                # pip would install into the framework's own interpreter, under every other run
+                self.logger.error("Python requirements_file is not supported in in_process mode; install the "
+                                  "packages alongside the framework or use mode: subprocess")
+                return False
+            if destination and destination.get('type') == 'bigquery':
+                self.logger.error("In-process Python transformations cannot write to BigQuery; use mode: subprocess")
+                return False
+        
         # Check if Python script exists
-        script_path = python_config['script_path']
-        if not os.path.exists(script_path):
+        script_path = python_config.get('script_path')
+        if script_path and not os.path.exists(script_path):
             self.logger.error(f"Python script not found: {script_path}")
             return False
         
@@ -46,22 +78,45 @@ class PythonEngine(TransformationEngine):
     
     def execute(self, config: TransformationConfig) -> bool:
         """Execute Python transformation"""
+        self._start_execution()
         try:
             python_config = config.transformation_config.get('python', {})
-            script_path = python_config['script_path']
+            if python_config.get('mode', 'subprocess') == 'in_process':
+                return self._execute_in_process(config, python_config)
             
-            # Install requirements if specified
+            # Requirements run in a cached environment built for their hash
+            python_executable = python_config.get('python_executable', sys.executable)
             requirements_file = python_config.get('requirements_file')
             if requirements_file:
-                if not self._install_requirements(requirements_file):
+                environment = python_config.get('environment', {})
+                if environment.get('isolated', True):
+                    # The environment cannot be evicted while the script runs in it
+                    with EnvironmentCache.from_config(environment).use(
+                        requirements_file, python_executable, self._cancelled
+                    ) as python_executable:
+                        if not python_executable:
+                            self.logger.error("Failed to provision the Python environment")
+                            return False
+                        return self._run_script(config, python_config, python_executable)
+                elif not self._install_requirements(requirements_file):
                     return False
+            return self._run_script(config, python_config, python_executable)
+                
+        except Exception as e:
+            self.logger.error(f"Error executing Python transformation: {str(e)}")
+            return False
+    
+    def _run_script(self, config: TransformationConfig, python_config: Dict[str, Any], python_executable: str) -> bool:
+        """Run the script in a subprocess of the given interpreter"""
+        try:
+            self._check_cancelled()
+            script_path = python_config['script_path']
             
             # Build Python command
-            python_executable = python_config.get('python_executable', sys.executable)
             cmd_parts = [python_executable, script_path]
             
             # Add script arguments
-            script_args = python_config.get('args', [])
+            script_args = list(python_config.get('args', []))
             
             # Pass contract path and output dir as arguments
             script_args.extend([
@@ -84,32 +139,172 @@ class PythonEngine(TransformationEngine):
             # Set working directory if specified
             working_dir = python_config.get('working_dir', os.path.dirname(script_path))
             
-            # Execute Python script
-            result = subprocess.run(
-                cmd_parts,
-                capture_output=True,
-                text=True,
+            # Declared memory/CPU limits are enforced on the subprocess
+            limits = config.resources.get('limits', {})
+            
+            # Execute Python script, streaming its output
+            self.runner = SubprocessRunner('python', self.logger, timeout=config.timeout_seconds,
+                                           cancel_event=self._cancelled)
+            result = self.runner.run(
+                limit_command(cmd_parts, limits),
                 env=env,
                 cwd=working_dir
             )
             
-            # Log output
-            if result.stdout:
-                self.logger.info(f"Python stdout: {result.stdout}")
-            if result.stderr:
-                self.logger.warning(f"Python stderr: {result.stderr}")
-            
-            if result.returncode == 0:
+            if result.success:
                 self.logger.info("Python transformation completed successfully")
                 return True
             else:
                 self.logger.error(f"Python transformation failed with return code: {result.returncode}")
+                violation = None if result.timed_out or result.cancelled else limit_violation(result.returncode, limits)
+                if violation:
+                    self.logger.error(f"Python transformation resource limit: {violation}")
                 return False
                 
         except Exception as e:
             self.logger.error(f"Error executing Python transformation: {str(e)}")
             return False
     
+    def _execute_in_process(self, config: TransformationConfig, python_config: Dict[str, Any]) -> bool:
+        """Call the entrypoint function with the source tables and write the tables it returns"""
+        if config.resources.get('limits'):
+            self.logger.warning("Resource limits and timeouts are not enforced on in-process transformations")
+        
+        input_format = python_config.get('input_format', 'arrow')
+        columns = python_config.get('columns', {})
+        write_mode = python_config.get('write_mode', 'replace')
+        
+        # Published target -> table written by this run (its staging table when staged)
+        published = {staged: target for target, staged in config.table_overrides.items()}
+        write_tables = {published.get(table, table): table for table in config.target_tables}
+        
+        pool = get_connection_pool()
+        connection = pool.acquire(load_destination(config.contract_path))
+        try:
+            # Only the declared columns of each source are fetched
+            sources = {table: read_table(connection, table, columns.get(table)) for table in config.source_tables}
+            self.logger.info(f"Loaded source tables: {table_sizes(sources)}")
+            
+            context = {
+                'target_tables': list(write_tables),
+                'contract_path': config.contract_path,
+                'output_dir': config.output_dir,
+                'params': python_config.get('params', {})
+            }
+            if python_config.get('partitioning'):
+                self._execute_partitioned(connection, python_config, sources, context, write_tables, write_mode)
+            else:
+                function = load_entrypoint(python_config['entrypoint'], self._module_path(python_config),
+                                           python_config.get('reload', True))
+                if input_format == 'pandas':
+                    sources = {table: data.to_pandas() for table, data in sources.items()}
+                # A running function cannot be interrupted; cancellation takes effect between steps
+                self._check_cancelled()
+                self.logger.info(f"Calling {python_config['entrypoint']}")
+                result = call_entrypoint(function, sources, context)
+                
+                outputs = self._collect_outputs(result, list(write_tables))
+                for target, data in outputs.items():
+                    self._check_cancelled()
+                    write_table(connection, write_tables[target], data, write_mode)
+                    self.logger.info(f"Wrote {data.num_rows} rows to {write_tables[target]}")
+            
+            if hasattr(connection, 'commit'):
+                connection.commit()
+            
+            self.logger.info("Python transformation completed successfully")
+            return True
+        
+        except Exception as e:
+            self.logger.error(f"Error in in-process Python transformation: {str(e)}")
+            self.last_error = e
+            if hasattr(connection, 'rollback'):
+                try:
+                    connection.rollback()
+                except Exception as rollback_error:
+                    self.logger.debug(f"Rollback failed: {str(rollback_error)}")
+            return False
+        
+        finally:
+            pool.release(connection)
+    
+    def _execute_partitioned(self, connection, python_config: Dict[str, Any], sources: Dict[str, Any],
+                             context: Dict[str, Any], write_tables: Dict[str, str], write_mode: str):
+        """Map the entrypoint over partitions of one source in worker processes and write the results"""
+        partitioning = python_config['partitioning']
+        source = partitioning.get('source') or next(iter(sources))
+        workers = int(partitioning.get('workers') or os.cpu_count() or 1)
+        output = partitioning.get('output', 'concat')
+        targets = list(write_tables)
+        
+        if partitioning.get('key'):
+            pieces = split_by_key(sources[source], partitioning['key'],
+                                  workers * int(partitioning.get('partitions_per_worker', 4)))
+        else:
+            pieces = split_by_rows(sources[source], int(partitioning.get('rows', 1000000)))
+        self.logger.info(
+            f"Calling {python_config['entrypoint']} over {len(pieces)} partitions of {source} "
+            f"with up to {workers} workers"
+        )
+        
+        with PartitionedRun(python_config['entrypoint'], self._module_path(python_config), workers,
+                            partitioning.get('start_method', 'spawn'),
+                            python_config.get('input_format', 'arrow')) as run:
+            # Other sources are shared whole with every partition
+            shared = {table: run.share(data) for table, data in sources.items() if table != source}
+            partitions = [{**shared, source: run.share(piece)} for piece in pieces]
+            pieces = None
+            
+            collected = {}
+            written = set()
+            for index, outputs in run.map(partitions, context):
+                self._check_cancelled()
+                result = outputs[SINGLE_RESULT] if list(outputs) == [SINGLE_RESULT] else outputs
+                tables = self._collect_outputs(result, targets)
+                if output == 'per_partition':
+                    # Written as partitions finish, so results are not all held at once
+                    for target, data in tables.items():
+                        write_table(connection, write_tables[target], data,
+                                    'append' if target in written else write_mode)
+                        written.add(target)
+                    result = outputs = tables = data = None
+                    run.release(index)
+                else:
+                    collected[index] = tables
+            
+            if output != 'per_partition':
+                for target in targets:
+                    self._check_cancelled()
+                    data = concat_tables([collected[index][target] for index in sorted(collected)])
+                    write_table(connection, write_tables[target], data, write_mode)
+                    self.logger.info(f"Wrote {data.num_rows} rows to {write_tables[target]}")
+                collected = data = result = outputs = tables = None
+    
+    @staticmethod
+    def _module_path(python_config: Dict[str, Any]) -> str:
+        return python_config.get('module_path', python_config.get('working_dir'))
+    
+    @staticmethod
+    def _collect_outputs(result: Any, targets: list) -> Dict[str, Any]:
+        """Map the function result to target tables (a single table is allowed for a single target)"""
+        if not isinstance(result, dict):
+            if len(targets) != 1:
+                raise ValueError(f"Expected a dict of tables for targets {targets}")
+            result = {targets[0]: result}
+        
+        outputs = {}
+        for name, value in result.items():
+            # Results may be keyed by bare table name
+            matches = [target for target in targets if name in (target, target.split('.')[-1])]
+            if not matches:
+                raise ValueError(f"Result table {name} is not a target table {targets}")
+            outputs[matches[0]] = to_arrow(value)
+        
+        missing = set(targets) - set(outputs)
+        if missing:
+            raise ValueError(f"No result returned for target tables: {sorted(missing)}")
+        return outputs
+    
     def _install_requirements(self, requirements_file: str) -> bool:
         """Install Python requirements"""
         try:
@@ -117,17 +312,15 @@ class PythonEngine(TransformationEngine):
             
             cmd = [sys.executable, '-m', 'pip', 'install', '-r', requirements_file]
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True
-            )
+            self.runner = SubprocessRunner('pip', self.logger, stderr_level=logging.INFO,
+                                           cancel_event=self._cancelled)
+            result = self.runner.run(cmd)
             
-            if result.returncode == 0:
+            if result.success:
                 self.logger.info("Requirements installed successfully")
                 return True
             else:
-                self.logger.error(f"Failed to install requirements: {result.stderr}")
+                self.logger.error(f"Failed to install requirements: {' | '.join(result.stderr_tail[-5:])}")
                 return False
                 
         except Exception as e:
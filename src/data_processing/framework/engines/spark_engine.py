@@ -5,24 +5,55 @@ Handles PySpark-based transformations with proper configuration validation
 and execution within the DQ wrapper framework.
 """
 
-import subprocess
 import os
+import sys
 import logging
-from typing import Dict, Any
-from ..wrapper import TransformationEngine, TransformationConfig
+import time
+import threading
+from typing import Dict, Any, List
+from .base import TransformationEngine, TransformationConfig
+from utils.partitioned import load_entrypoint
+from utils.resources import limit_command, limit_violation
+from utils.spark_connect import get_connect_server
+from utils.spark_tuning import SparkTuner
+from utils.subprocess_runner import SubprocessRunner, SparkProgressParser
+
+
+# Scripts import framework helpers such as dq.spark_checks from here
+FRAMEWORK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 class SparkEngine(TransformationEngine):
     """Spark transformation engine"""
     
+    # Redirected targets are passed to the script through --target-tables
+    supports_staging = True
+    # Scripts may have side effects beyond their outputs; retried only when configured
+    idempotent = False
+    
     def __init__(self):
+        super().__init__()
         self.logger = logging.getLogger(__name__)
+        # Spark Connect session of an in-process execution, for cancellation
+        self._session = None
+        # Tuner of the current execution when spark.auto_tune is enabled
+        self._tuner = None
     
-    def validate_config(self, config: Dict[str, Any]) -> bool:
+    def validate_config(self, config: Dict[str, Any], destination: Dict[str, Any] = None) -> bool:
         """Validate Spark-specific configuration"""
         spark_config = config.get('spark', {})
+        mode = spark_config.get('mode', 'submit')
+        if mode not in ('submit', 'connect'):
+            self.logger.error(f"Unsupported Spark execution mode: {mode}")
+            return False
         
         # Check required fields
+        if mode == 'connect' and 'entrypoint' in spark_config:
+            if ':' not in spark_config['entrypoint']:
+                self.logger.error("Spark entrypoint must be module:function or path/to/file.py:function")
+                return False
+            return True
+        
         required_fields = ['script_path']
         for field in required_fields:
             if field not in spark_config:
@@ -39,8 +70,26 @@ class SparkEngine(TransformationEngine):
     
     def execute(self, config: TransformationConfig) -> bool:
         """Execute Spark transformation"""
+        self._start_execution()
+        spark_config = self._auto_tune(config, config.transformation_config.get('spark', {}))
+        started = time.monotonic()
+        success = self._execute(config, spark_config)
+        
+        if self._tuner is not None:
+            # Entrypoint runs have no subprocess output; their exception explains the failure
+            output = self.output_tail()
+            if self.last_error is not None:
+                output = output + str(self.last_error).splitlines()
+            self._tuner.record(self.engine_settings['spark_tuning'], success, time.monotonic() - started, output)
+        return success
+    
+    def _execute(self, config: TransformationConfig, spark_config: Dict[str, Any]) -> bool:
+        """Run spark-submit, or a Spark Connect client in connect mode"""
         try:
-            spark_config = config.transformation_config.get('spark', {})
+            self._check_cancelled()
+            if spark_config.get('mode', 'submit') == 'connect':
+                return self._execute_connect(config, spark_config)
+            
             script_path = spark_config['script_path']
             
             # Build spark-submit command
@@ -48,6 +97,10 @@ class SparkEngine(TransformationEngine):
             
             # Add Spark configuration options
             spark_conf = spark_config.get('conf', {})
+            if config.post_checks_in_job and spark_conf.get('spark.submit.deployMode') == 'cluster':
+                # check_dataframe writes its results on the driver, which then runs on a cluster node
+                self.logger.warning("In-job DQ results need client deploy mode (or an output dir shared with "
+                                    "the driver); otherwise the written tables are checked")
             for key, value in spark_conf.items():
                 cmd_parts.extend(['--conf', f'{key}={value}'])
             
@@ -78,46 +131,210 @@ class SparkEngine(TransformationEngine):
             cmd_parts.append(script_path)
             
             # Add script arguments
-            script_args = spark_config.get('args', [])
-            
-            # Pass contract path and output dir as arguments
-            script_args.extend([
-                '--contract', config.contract_path,
-                '--output', config.output_dir
-            ])
-            
-            cmd_parts.extend(script_args)
+            cmd_parts.extend(self._script_args(config, spark_config))
             
             cmd = ' '.join(cmd_parts)
             self.logger.info(f"Executing Spark command: {cmd}")
             
             # Set environment variables if specified
-            env = os.environ.copy()
-            spark_env = spark_config.get('env', {})
-            env.update(spark_env)
+            env = self._script_env(spark_config)
+            
+            # Declared memory/CPU limits are enforced on the subprocess
+            limits = config.resources.get('limits', {})
             
-            # Execute spark-submit command
-            result = subprocess.run(
-                cmd,
+            # Execute spark-submit command; Spark logs to stderr, so it is not a warning
+            self.runner = SubprocessRunner(
+                'spark',
+                self.logger,
+                timeout=config.timeout_seconds,
+                progress_parser=SparkProgressParser(),
+                stderr_level=logging.INFO,
+                cancel_event=self._cancelled
+            )
+            result = self.runner.run(
+                limit_command(cmd, limits, shell=True),
                 shell=True,
-                capture_output=True,
-                text=True,
                 env=env
             )
             
-            # Log output
-            if result.stdout:
-                self.logger.info(f"Spark stdout: {result.stdout}")
-            if result.stderr:
-                self.logger.warning(f"Spark stderr: {result.stderr}")
-            
-            if result.returncode == 0:
+            if result.success:
                 self.logger.info("Spark transformation completed successfully")
                 return True
             else:
                 self.logger.error(f"Spark transformation failed with return code: {result.returncode}")
+                violation = None if result.timed_out or result.cancelled else limit_violation(result.returncode, limits)
+                if violation:
+                    self.logger.error(f"Spark transformation resource limit: {violation}")
                 return False
                 
         except Exception as e:
             self.logger.error(f"Error executing Spark transformation: {str(e)}")
+            self.last_error = e
             return False
+    
+    def _auto_tune(self, config: TransformationConfig, spark_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Spark config with sizing derived from the inputs and previous runs (spark.auto_tune)"""
+        self._tuner = None
+        auto_tune = spark_config.get('auto_tune', {})
+        if not auto_tune.get('enabled', False):
+            return spark_config
+        
+        conf = spark_config.get('conf', {})
+        master = str(spark_config.get('master') or conf.get('spark.master') or 'local[*]')
+        try:
+            tuner = SparkTuner(config.output_dir, auto_tune)
+            tuning = tuner.recommend(tuner.input_stats(config.contract_path, config.source_tables), master)
+        except Exception as e:
+            self.logger.warning(f"Spark auto-tuning failed, using the configured settings: {str(e)}")
+            return spark_config
+        
+        self._tuner = tuner
+        self.engine_settings = {'spark_tuning': tuning}
+        self.logger.info(
+            f"Spark auto-tuning for {tuning['input_mb']} MB ({tuning['throughput_source']} throughput "
+            f"{tuning['throughput_mb_per_core_second']} MB/core/s): "
+            + ', '.join(f"{key}={tuning[key]}" for key in ('num_executors', 'executor_cores', 'executor_memory',
+                                                            'driver_memory') if key in tuning)
+            + f", conf={tuning['conf']}"
+        )
+        if spark_config.get('mode', 'submit') == 'connect':
+            self.logger.info("Spark Connect runs only apply the tuned spark.sql.* settings (entrypoint sessions)")
+        
+        # Tuned sizing replaces the static values; other settings are kept
+        tuned = {**spark_config, 'conf': {**conf, **tuning['conf']}}
+        for key in ('num_executors', 'executor_cores', 'executor_memory', 'driver_memory'):
+            if key in tuning:
+                tuned[key] = tuning[key]
+        return tuned
+    
+    def _execute_connect(self, config: TransformationConfig, spark_config: Dict[str, Any]) -> bool:
+        """Run the transformation as a client session of a long-lived Spark Connect server"""
+        connect_config = spark_config.get('connect', {})
+        # An external server is used as is; otherwise the framework's local server is started once
+        remote = connect_config.get('remote') or get_connect_server(connect_config).ensure()
+        self._check_cancelled()
+        
+        if spark_config.get('entrypoint'):
+            return self._execute_entrypoint(config, spark_config, remote)
+        
+        # pyspark scripts create their session with SparkSession.builder.getOrCreate(),
+        # which connects to SPARK_REMOTE instead of starting a driver
+        cmd_parts = [spark_config.get('python_executable', sys.executable), spark_config['script_path']]
+        cmd_parts.extend(self._script_args(config, spark_config))
+        self.logger.info(f"Executing Spark Connect client against {remote}: {' '.join(cmd_parts)}")
+        
+        env = self._script_env(spark_config)
+        env['SPARK_REMOTE'] = remote
+        
+        limits = config.resources.get('limits', {})
+        self.runner = SubprocessRunner('spark', self.logger, timeout=config.timeout_seconds,
+                                       stderr_level=logging.INFO, cancel_event=self._cancelled)
+        result = self.runner.run(
+            limit_command(cmd_parts, limits),
+            env=env,
+            cwd=spark_config.get('working_dir', os.path.dirname(spark_config['script_path']) or None)
+        )
+        
+        if result.success:
+            self.logger.info("Spark transformation completed successfully")
+            return True
+        self.logger.error(f"Spark transformation failed with return code: {result.returncode}")
+        return False
+    
+    def _execute_entrypoint(self, config: TransformationConfig, spark_config: Dict[str, Any], remote: str) -> bool:
+        """Call entrypoint(spark, context) with a new client session of the server"""
+        try:
+            from pyspark.sql import SparkSession
+        except ImportError:
+            self.logger.error("pyspark not installed. Install with: pip install 'pyspark[connect]'")
+            return False
+        
+        function = load_entrypoint(spark_config['entrypoint'],
+                                   spark_config.get('module_path', spark_config.get('working_dir')),
+                                   spark_config.get('reload', True))
+        
+        # Each run gets its own session: temp views and SQL settings do not leak between runs
+        session = SparkSession.builder.remote(remote).create()
+        self._session = session
+        timed_out = threading.Event()
+        timer = None
+        if config.timeout_seconds:
+            timer = threading.Timer(config.timeout_seconds, self._time_out, (session, timed_out))
+            timer.daemon = True
+            timer.start()
+        
+        try:
+            # A cancel that arrived before the session was registered has not interrupted it
+            self._check_cancelled()
+            
+            # Static settings belong to the server; session-level SQL settings apply per run
+            for key, value in spark_config.get('conf', {}).items():
+                if key.startswith('spark.sql.'):
+                    session.conf.set(key, str(value))
+            
+            context = {
+                'source_tables': list(config.source_tables),
+                'target_tables': list(config.target_tables),
+                'contract_path': config.contract_path,
+                'output_dir': config.output_dir,
+                'params': spark_config.get('params', {})
+            }
+            self.logger.info(f"Calling {spark_config['entrypoint']} with a Spark Connect session of {remote}")
+            function(session, context)
+            
+            self.logger.info("Spark transformation completed successfully")
+            return True
+        
+        except Exception as e:
+            if timed_out.is_set():
+                self.logger.error(f"Spark transformation timed out after {config.timeout_seconds}s")
+            self.logger.error(f"Error in Spark Connect transformation: {str(e)}")
+            self.last_error = e
+            return False
+        
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self._session = None
+            # Releases the client session only; the server keeps running
+            session.stop()
+    
+    def cancel(self):
+        """Interrupt the running Spark Connect session, or stop the subprocess"""
+        session = self._session
+        if session is not None:
+            self._interrupt(session)
+        super().cancel()
+    
+    def _time_out(self, session, timed_out: threading.Event):
+        timed_out.set()
+        self._interrupt(session)
+    
+    def _interrupt(self, session):
+        try:
+            session.interruptAll()
+        except Exception as e:
+            self.logger.debug(f"Interrupting Spark Connect session failed: {str(e)}")
+    
+    @staticmethod
+    def _script_env(spark_config: Dict[str, Any]) -> Dict[str, str]:
+        """Environment of the script: configured variables and the framework on PYTHONPATH"""
+        env = os.environ.copy()
+        env.update(spark_config.get('env', {}))
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [FRAMEWORK_DIR, env.get('PYTHONPATH')]))
+        return env
+    
+    @staticmethod
+    def _script_args(config: TransformationConfig, spark_config: Dict[str, Any]) -> List[str]:
+        """Script arguments followed by the contract, output dir and redirected targets"""
+        script_args = list(spark_config.get('args', []))
+        
+        # Pass contract path and output dir as arguments
+        script_args.extend([
+            '--contract', config.contract_path,
+            '--output', config.output_dir
+        ])
+        
+        if config.table_overrides:
+            script_args.extend(['--target-tables', ','.join(config.target_tables)])
+        return script_args
@@ -6,162 +6,539 @@ within the DQ wrapper framework.
 """
 
 import os
-import yaml
+import glob
 import logging
-from typing import Dict, Any
-from ..wrapper import TransformationEngine, TransformationConfig
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, date, timezone, timedelta
+from typing import Dict, Any, List
+from .base import TransformationEngine, TransformationConfig
+from utils.connections import get_connection_pool, load_destination, execute_statement, fetch_one
+from utils.lakehouse import register_parquet_views, export_table, partition_columns
+from utils.query_profile import QueryProfiler
+from utils.run_state import WatermarkStore
+from utils.staging import rewrite_table_references, default_schema
+from utils.sql_parser import SqlStatement, split_statements, analyze_statement, statement_dependencies
+from utils.sql_templating import (INCREMENTAL_STRATEGIES, has_template_markup, render_sql, table_exists,
+                                  query_columns, incremental_statements, seed_statement)
+from utils.tracing import get_tracer
+
+
+def read_execution_order(order_file: str, scripts_dir: str) -> List[str]:
+    """Script paths listed in an execution order file (comments and blank lines ignored)"""
+    paths = []
+    with open(order_file, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            paths.append(line if os.path.isabs(line) else os.path.join(scripts_dir, line))
+    return paths
 
 
 class SqlEngine(TransformationEngine):
     """SQL transformation engine"""
     
+    supports_staging = True
+    # Statements commit separately (autocommit, concurrent execution), so a repeated script
+    # can apply its inserts twice; retried only when configured
+    idempotent = False
+    
     def __init__(self):
+        super().__init__()
         self.logger = logging.getLogger(__name__)
+        self._active_connections = []
+        self._lock = threading.Lock()
+        self.profiler = None
     
-    def validate_config(self, config: Dict[str, Any]) -> bool:
+    def validate_config(self, config: Dict[str, Any], destination: Dict[str, Any] = None) -> bool:
         """Validate SQL-specific configuration"""
         sql_config = config.get('sql', {})
         
-        # Check required fields
-        required_fields = ['script_path']
-        for field in required_fields:
-            if field not in sql_config:
-                self.logger.error(f"Missing required SQL config field: {field}")
+        # Either a single script or a scripts directory is required
+        if 'script_path' not in sql_config and 'scripts_dir' not in sql_config:
+            self.logger.error("Missing required SQL config field: script_path or scripts_dir")
+            return False
+        
+        if 'scripts_dir' in sql_config and 'script_path' not in sql_config:
+            if not os.path.isdir(sql_config['scripts_dir']):
+                self.logger.error(f"SQL scripts directory not found: {sql_config['scripts_dir']}")
+                return False
+            order_file = sql_config.get('execution_order')
+            if order_file and not os.path.exists(order_file):
+                self.logger.error(f"SQL execution order file not found: {order_file}")
                 return False
         
-        # Check if SQL script exists
-        script_path = sql_config['script_path']
-        if not os.path.exists(script_path):
-            self.logger.error(f"SQL script not found: {script_path}")
+        script_paths = self._script_paths(sql_config)
+        if not script_paths:
+            self.logger.error(f"No SQL scripts found in: {sql_config['scripts_dir']}")
             return False
         
+        # Check if SQL scripts exist
+        for script_path in script_paths:
+            if not os.path.exists(script_path):
+                self.logger.error(f"SQL script not found: {script_path}")
+                return False
+        
+        explain = sql_config.get('profiling', {}).get('explain', 'plan')
+        if explain not in ('none', 'plan', 'analyze'):
+            self.logger.error(f"Unsupported profiling.explain mode: {explain}")
+            return False
+        
+        if sql_config.get('materialization') == 'incremental':
+            incremental = sql_config.get('incremental', {})
+            strategy = incremental.get('strategy', 'append')
+            if strategy not in INCREMENTAL_STRATEGIES:
+                self.logger.error(f"Unsupported incremental strategy: {strategy}")
+                return False
+            if strategy != 'append' and not incremental.get('unique_key'):
+                self.logger.error(f"Incremental strategy {strategy} requires incremental.unique_key")
+                return False
+        
         return True
     
+    def prepare_sources(self, config: TransformationConfig) -> bool:
+        """Register the lakehouse Parquet sources as views"""
+        lakehouse = config.transformation_config.get('sql', {}).get('lakehouse')
+        if not lakehouse or not lakehouse.get('sources'):
+            return True
+        
+        if not self._is_duckdb_file(config.contract_path):
+            self.logger.error("Lakehouse mode requires a DuckDB destination with a database file")
+            return False
+        
+        connection = self._get_db_connection(config.contract_path)
+        if not connection:
+            self.logger.error("Failed to establish database connection")
+            return False
+        try:
+            register_parquet_views(connection, lakehouse)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error registering Parquet sources: {str(e)}")
+            self.last_error = e
+            return False
+        finally:
+            get_connection_pool().release(connection)
+    
+    def export_outputs(self, config: TransformationConfig) -> bool:
+        """Write the target tables as (partitioned) Parquet in lakehouse mode"""
+        output = config.transformation_config.get('sql', {}).get('lakehouse', {}).get('output')
+        if not output:
+            return True
+        
+        if not self._is_duckdb_file(config.contract_path):
+            self.logger.error("Lakehouse mode requires a DuckDB destination with a database file")
+            return False
+        
+        connection = self._get_db_connection(config.contract_path)
+        if not connection:
+            self.logger.error("Failed to establish database connection")
+            return False
+        try:
+            for table in config.target_tables:
+                path = export_table(
+                    connection,
+                    table,
+                    output['path'],
+                    partition_columns(output.get('partition_by'), table),
+                    output.get('compression', 'zstd')
+                )
+                self.logger.info(f"Exported {table} to {path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error exporting Parquet outputs: {str(e)}")
+            self.last_error = e
+            return False
+        finally:
+            get_connection_pool().release(connection)
+    
+    @staticmethod
+    def _is_duckdb_file(contract_path: str) -> bool:
+        destination = load_destination(contract_path)
+        return destination.get('type') == 'duckdb' and destination.get('database', ':memory:') != ':memory:'
+    
     def execute(self, config: TransformationConfig) -> bool:
         """Execute SQL transformation"""
+        self._start_execution()
         try:
             sql_config = config.transformation_config.get('sql', {})
-            script_path = sql_config['script_path']
-            
-            # Read SQL script
-            with open(script_path, 'r') as f:
-                sql_content = f.read()
-            
-            self.logger.info(f"Executing SQL script: {script_path}")
-            
-            # Get database connection from contract
-            connection = self._get_db_connection(config.contract_path)
+            variables = self._template_variables(config, sql_config)
             
-            if not connection:
-                self.logger.error("Failed to establish database connection")
-                return False
+            destination = load_destination(config.contract_path)
+            dest_type = destination.get('type')
+            profiling = sql_config.get('profiling', {})
+            self.profiler = None
+            if profiling.get('enabled', False):
+                self.profiler = QueryProfiler(config.output_dir, profiling, dest_type)
             
-            # Execute SQL
-            try:
-                # Split SQL content by semicolons for multiple statements
-                statements = [stmt.strip() for stmt in sql_content.split(';') if stmt.strip()]
-                
-                for i, statement in enumerate(statements):
-                    self.logger.info(f"Executing statement {i+1}/{len(statements)}")
-                    connection.execute(statement)
+            statements = []
+            for script_path in self._script_paths(sql_config):
+                # Read SQL script
+                with open(script_path, 'r') as f:
+                    sql_content = f.read()
                 
-                # Commit if needed
-                if hasattr(connection, 'commit'):
-                    connection.commit()
+                # Render Jinja templates (auto-detected unless templating is set explicitly)
+                if sql_config.get('templating', has_template_markup(sql_content)):
+                    sql_content = render_sql(sql_content, variables, script_path)
                 
-                self.logger.info("SQL transformation completed successfully")
-                return True
+                # Redirect target table references (e.g. to staging tables)
+                if config.table_overrides:
+                    sql_content = rewrite_table_references(sql_content, config.table_overrides, dest_type,
+                                                           default_schema(destination))
                 
-            except Exception as e:
-                self.logger.error(f"Error executing SQL: {str(e)}")
-                # Rollback if needed
-                if hasattr(connection, 'rollback'):
-                    connection.rollback()
-                return False
+                for sql in split_statements(sql_content, dest_type):
+                    statements.append(analyze_statement(sql, script_path, len(statements), dest_type))
             
-            finally:
-                # Close connection
-                if hasattr(connection, 'close'):
-                    connection.close()
-                
+            self.logger.info(f"Executing SQL scripts: {list(dict.fromkeys(statement.source for statement in statements))}")
+            
+            max_parallel = int(sql_config.get('max_parallel', 1))
+            if sql_config.get('materialization') == 'incremental':
+                success = self._execute_incremental(config, sql_config, statements, variables)
+            elif max_parallel > 1 and self._can_run_concurrently(config.contract_path, statements):
+                success = self._execute_concurrently(config.contract_path, statements, max_parallel)
+            else:
+                success = self._execute_sequentially(config.contract_path, statements)
+            
+            if success and self.profiler:
+                # Only complete runs extend the baseline
+                self.query_regressions = self.profiler.save()
+            
+            if success and self._tracks_watermark(sql_config):
+                # Committed by the wrapper once post-checks pass
+                window = variables['run_window']
+                WatermarkStore(config.output_dir).stage(window['end'], window)
+                self.logger.info(f"Processed window {window['start']} .. {window['end']}")
+            return success
+        
         except Exception as e:
             self.logger.error(f"Error in SQL transformation: {str(e)}")
+            self.last_error = e
             return False
     
-    def _get_db_connection(self, contract_path: str):
-        """Get database connection from contract configuration"""
+    def _script_paths(self, sql_config: Dict[str, Any]) -> List[str]:
+        """Scripts to run: script_path, else the execution order file, else *.sql in scripts_dir"""
+        if 'script_path' in sql_config:
+            return [sql_config['script_path']]
+        
+        scripts_dir = sql_config['scripts_dir']
+        order_file = sql_config.get('execution_order') or os.path.join(scripts_dir, 'execution_order.txt')
+        if os.path.exists(order_file):
+            return read_execution_order(order_file, scripts_dir)
+        return sorted(glob.glob(os.path.join(scripts_dir, '*.sql')))
+    
+    @staticmethod
+    def _tracks_watermark(sql_config: Dict[str, Any]) -> bool:
+        """Whether runs of this transformation advance a watermark"""
+        return sql_config.get('materialization') == 'incremental' or 'incremental' in sql_config
+    
+    def _template_variables(self, config: TransformationConfig, sql_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Variables available to templated SQL scripts"""
+        # Target tables are the tables written by this run (staging tables when staged)
+        variables = {
+            'target': config.target_tables[0] if config.target_tables else None,
+            'targets': list(config.target_tables),
+            'source_tables': config.source_tables,
+            'var': sql_config.get('vars', {}),
+            'run_started_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            'watermark': None,
+            'run_window': {'start': None, 'end': None},
+            'is_incremental': False
+        }
+        if not self._tracks_watermark(sql_config):
+            return variables
+        
+        incremental = sql_config.get('incremental', {})
+        committed = WatermarkStore(config.output_dir).committed()
+        start = committed if committed is not None else incremental.get('initial_watermark')
+        
+        connection = self._get_db_connection(config.contract_path)
+        if not connection:
+            raise ConnectionError("Failed to establish database connection")
         try:
-            # Load contract to get connection details
-            with open(contract_path, 'r') as f:
-                contract = yaml.safe_load(f)
-            
-            # Extract connection info from contract
-            destination = contract.get('destination', {})
-            dest_type = destination.get('type')
+            end = self._window_end(connection, config, incremental, start)
+            target_exists = bool(config.target_tables) and table_exists(connection, self._published_table(config))
+        finally:
+            get_connection_pool().release(connection)
+        
+        variables.update({
+            'watermark': committed,
+            'run_window': {'start': start, 'end': end},
+            # Full builds on the first run, without a window start, or when asked to
+            'is_incremental': target_exists and start is not None and not incremental.get('full_refresh', False)
+        })
+        return variables
+    
+    @staticmethod
+    def _published_table(config: TransformationConfig) -> str:
+        """Published table behind the first target, which may be its staging table"""
+        write_target = config.target_tables[0]
+        return next((table for table, staged in config.table_overrides.items() if staged == write_target),
+                    write_target)
+    
+    def _window_end(self, connection, config: TransformationConfig, incremental: Dict[str, Any], start: Any) -> Any:
+        """Watermark reached by this run: MAX of the watermark column, else the current time"""
+        column = incremental.get('watermark_column')
+        if not column:
+            lag = timedelta(seconds=incremental.get('lag_seconds', 0))
+            return (datetime.now(timezone.utc) - lag).strftime('%Y-%m-%d %H:%M:%S')
+        
+        source = incremental.get('watermark_source') or (config.source_tables[0] if config.source_tables else None)
+        if not source:
+            raise ValueError("incremental.watermark_column requires watermark_source or a source table")
+        
+        row = fetch_one(connection, f"SELECT MAX({column}) FROM {source}")
+        value = row[0] if row else None
+        if value is None:
+            # Empty source: the window is empty
+            return start
+        return str(value) if isinstance(value, (datetime, date)) else value
+    
+    def _execute_incremental(self, config: TransformationConfig, sql_config: Dict[str, Any],
+                             statements: List[SqlStatement], variables: Dict[str, Any]) -> bool:
+        """Apply the model (the script's final SELECT) to the target table over the run window"""
+        incremental = sql_config.get('incremental', {})
+        if len(config.target_tables) != 1:
+            raise ValueError("Incremental materialization requires exactly one target table")
+        if not statements or statements[-1].sql.split(None, 1)[0].lower() not in ('select', 'with'):
+            raise ValueError("Incremental SQL scripts must end with the SELECT of the model")
+        
+        write_target = config.target_tables[0]
+        target = self._published_table(config)
+        model = statements[-1].sql
+        new_rows = f"{write_target.split('.')[-1]}__new_rows"
+        dest_type = load_destination(config.contract_path).get('type')
+        
+        connection = self._get_db_connection(config.contract_path)
+        if not connection:
+            self.logger.error("Failed to establish database connection")
+            self.last_error = ConnectionError("Failed to establish database connection")
+            return False
+        
+        self._track(connection)
+        index = len(statements)
+        
+        def run(sql: str):
+            nonlocal index
+            if self._cancelled.is_set():
+                raise RuntimeError("SQL transformation cancelled")
+            index += 1
+            self._execute_statement(connection, SqlStatement(sql=sql, source=f"incremental:{target}", index=index - 1))
+        
+        try:
+            for statement in statements[:-1]:
+                # A cancel before the connection was tracked could not interrupt it
+                if self._cancelled.is_set():
+                    raise RuntimeError("SQL transformation cancelled")
+                self._execute_statement(connection, statement)
             
-            if dest_type == 'duckdb':
-                return self._get_duckdb_connection(destination)
-            elif dest_type == 'postgres':
-                return self._get_postgres_connection(destination)
-            elif dest_type == 'bigquery':
-                return self._get_bigquery_connection(destination)
-            elif dest_type == 'snowflake':
-                return self._get_snowflake_connection(destination)
+            if variables['is_incremental']:
+                strategy = incremental.get('strategy', 'append')
+                self.logger.info(f"Applying new rows to {write_target} ({strategy})")
+                if write_target != target:
+                    # The staging table starts as a copy of the target
+                    run(seed_statement(write_target, target, dest_type))
+                run(f"DROP TABLE IF EXISTS {new_rows}")
+                run(f"CREATE TEMPORARY TABLE {new_rows} AS {model}")
+                columns = query_columns(connection, new_rows)
+                for sql in incremental_statements(write_target, new_rows, columns, strategy,
+                                                  incremental.get('unique_key')):
+                    run(sql)
+                run(f"DROP TABLE IF EXISTS {new_rows}")
             else:
-                self.logger.error(f"Unsupported destination type: {dest_type}")
-                return None
-                
+                self.logger.info(f"Building {write_target} in full")
+                run(f"DROP TABLE IF EXISTS {write_target}")
+                run(f"CREATE TABLE {write_target} AS {model}")
+            
+            if hasattr(connection, 'commit'):
+                connection.commit()
+            
+            self.logger.info("SQL transformation completed successfully")
+            return True
+        
         except Exception as e:
-            self.logger.error(f"Error getting database connection: {str(e)}")
-            return None
+            self.logger.error(f"Error executing SQL: {str(e)}")
+            self.last_error = e
+            self._rollback(connection)
+            return False
+        
+        finally:
+            self._untrack(connection)
+            get_connection_pool().release(connection)
     
-    def _get_duckdb_connection(self, config: Dict[str, Any]):
-        """Get DuckDB connection"""
+    def _execute_sequentially(self, contract_path: str, statements: List[SqlStatement]) -> bool:
+        """Run all statements in order on one connection, in one transaction where supported"""
+        # Get database connection from contract
+        connection = self._get_db_connection(contract_path)
+        
+        if not connection:
+            self.logger.error("Failed to establish database connection")
+            self.last_error = ConnectionError("Failed to establish database connection")
+            return False
+        
+        self._track(connection)
+        
+        # Execute SQL
         try:
-            import duckdb
-            db_path = config.get('database', ':memory:')
-            return duckdb.connect(db_path)
-        except ImportError:
-            self.logger.error("DuckDB not installed. Install with: pip install duckdb")
-            return None
+            for statement in statements:
+                if self._cancelled.is_set():
+                    raise RuntimeError("SQL transformation cancelled")
+                self.logger.info(f"Executing statement {statement.index + 1}/{len(statements)}")
+                self._execute_statement(connection, statement)
+            
+            # Commit if needed
+            if hasattr(connection, 'commit'):
+                connection.commit()
+            
+            self.logger.info("SQL transformation completed successfully")
+            return True
+        
+        except Exception as e:
+            self.logger.error(f"Error executing SQL: {str(e)}")
+            self.last_error = e
+            # Rollback if needed
+            self._rollback(connection)
+            return False
+        
+        finally:
+            # Return connection to the pool
+            self._untrack(connection)
+            get_connection_pool().release(connection)
     
-    def _get_postgres_connection(self, config: Dict[str, Any]):
-        """Get PostgreSQL connection"""
+    def _execute_concurrently(self, contract_path: str, statements: List[SqlStatement], max_parallel: int) -> bool:
+        """Run independent statements at the same time on separate connections
+        
+        Each statement commits on its own; a failure stops scheduling new
+        statements but does not roll back those already committed.
+        """
+        dependencies = statement_dependencies(statements)
+        pending = list(range(len(statements)))
+        completed = set()
+        running = {}
+        failure = None
+        
+        self.logger.info(f"Executing {len(statements)} statements with up to {max_parallel} connections")
+        with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix='sql') as executor:
+            while pending or running:
+                if failure is None and self._cancelled.is_set():
+                    failure = RuntimeError("SQL transformation cancelled")
+                if failure is None:
+                    for index in list(pending):
+                        if len(running) >= max_parallel:
+                            break
+                        if dependencies[index] <= completed:
+                            pending.remove(index)
+                            future = executor.submit(
+                                contextvars.copy_context().run, self._execute_pooled,
+                                contract_path, statements[index]
+                            )
+                            running[future] = index
+                
+                if not running:
+                    break
+                
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = running.pop(future)
+                    try:
+                        future.result()
+                        completed.add(index)
+                    except Exception as e:
+                        self.logger.error(f"Error executing statement {index + 1} ({statements[index].source}): {str(e)}")
+                        failure = failure or e
+        
+        if failure is not None:
+            self.last_error = failure
+            return False
+        
+        self.logger.info("SQL transformation completed successfully")
+        return True
+    
+    def _execute_pooled(self, contract_path: str, statement: SqlStatement):
+        """Run and commit one statement on a pooled connection"""
+        connection = self._get_db_connection(contract_path)
+        if not connection:
+            raise ConnectionError("Failed to establish database connection")
+        
+        self._track(connection)
         try:
-            import psycopg2
-            return psycopg2.connect(
-                host=config.get('host', 'localhost'),
-                port=config.get('port', 5432),
-                database=config.get('database'),
-                user=config.get('user'),
-                password=config.get('password')
+            self.logger.info(f"Executing statement {statement.index + 1} ({os.path.basename(statement.source)})")
+            self._execute_statement(connection, statement)
+            if hasattr(connection, 'commit'):
+                connection.commit()
+        except Exception:
+            self._rollback(connection)
+            raise
+        finally:
+            self._untrack(connection)
+            get_connection_pool().release(connection)
+    
+    def _execute_statement(self, connection, statement: SqlStatement):
+        """Run one statement inside a trace span"""
+        with get_tracer().span('sql.statement', index=statement.index + 1, script=statement.source,
+                               statement=statement.sql[:200]):
+            if self.profiler:
+                self.profiler.execute(connection, statement)
+            else:
+                execute_statement(connection, statement.sql)
+    
+    def _can_run_concurrently(self, contract_path: str, statements: List[SqlStatement]) -> bool:
+        """Whether statements may run on separate connections"""
+        destination = load_destination(contract_path)
+        if destination.get('type') == 'duckdb' and destination.get('database', ':memory:') == ':memory:':
+            self.logger.info("In-memory DuckDB connections do not share data, running statements sequentially")
+            return False
+        
+        session_statements = [statement for statement in statements if statement.session]
+        if session_statements:
+            self.logger.info(
+                f"Statement {session_statements[0].index + 1} uses connection state "
+                f"(transactions, variables or temporary tables), running statements sequentially"
             )
-        except ImportError:
-            self.logger.error("psycopg2 not installed. Install with: pip install psycopg2-binary")
-            return None
+            return False
+        return True
     
-    def _get_bigquery_connection(self, config: Dict[str, Any]):
-        """Get BigQuery connection"""
+    def _rollback(self, connection):
+        """Roll back after a failed statement without masking its error"""
+        if not hasattr(connection, 'rollback'):
+            return
         try:
-            from google.cloud import bigquery
-            client = bigquery.Client(project=config.get('project_id'))
-            return client
-        except ImportError:
-            self.logger.error("BigQuery client not installed. Install with: pip install google-cloud-bigquery")
-            return None
+            connection.rollback()
+        except Exception as e:
+            # e.g. DuckDB outside an explicit transaction
+            self.logger.debug(f"Rollback failed: {str(e)}")
+    
+    def _track(self, connection):
+        with self._lock:
+            self._active_connections.append(connection)
+    
+    def _untrack(self, connection):
+        with self._lock:
+            if connection in self._active_connections:
+                self._active_connections.remove(connection)
+    
+    def cancel(self):
+        """Interrupt the statements currently running on the active connections"""
+        self._cancelled.set()
+        with self._lock:
+            connections = list(self._active_connections)
+        
+        for connection in connections:
+            try:
+                if hasattr(connection, 'interrupt'):
+                    connection.interrupt()  # DuckDB
+                elif hasattr(connection, 'cancel'):
+                    connection.cancel()  # psycopg2
+            except Exception as e:
+                self.logger.warning(f"Could not cancel SQL transformation: {str(e)}")
+        if connections:
+            self.logger.info("SQL transformation cancelled")
     
-    def _get_snowflake_connection(self, config: Dict[str, Any]):
-        """Get Snowflake connection"""
+    def _get_db_connection(self, contract_path: str):
+        """Get a pooled database connection for the contract's destination"""
         try:
-            import snowflake.connector
-            return snowflake.connector.connect(
-                user=config.get('user'),
-                password=config.get('password'),
-                account=config.get('account'),
-                warehouse=config.get('warehouse'),
-                database=config.get('database'),
-                schema=config.get('schema')
-            )
-        except ImportError:
-            self.logger.error("Snowflake connector not installed. Install with: pip install snowflake-connector-python")
+            return get_connection_pool().acquire(load_destination(contract_path))
+        except Exception as e:
+            self.logger.error(f"Error getting database connection: {str(e)}")
             return None
@@ -0,0 +1,314 @@
+"""
+Data Processing Framework - Multi-Transformation DAG Runner
+
+Runs a directory of transformation configs as a dependency graph:
+1. Loads every transformation config in the directory
+2. Builds edges from target tables of one transformation to source tables of another
+3. Runs independent transformations concurrently within a worker, CPU and memory budget
+4. Skips downstream transformations when an upstream one fails
+5. Reports per-node timings and the critical path
+
+Usage:
+    python -m framework.runner --contract path/to/contract.yaml --configs path/to/configs/ --workers 4
+"""
+
+import sys
+import os
+import glob
+import time
+import argparse
+import yaml
+import logging
+from typing import Dict, Any, List, Optional, Set
+from dataclasses import dataclass, field
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Add framework to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from wrapper import DQTransformationWrapper, TransformationConfig, load_config, prepare_output_dir
+from utils.scheduler import AdmissionScheduler, CostEstimator
+from utils.structured_logging import setup_logging
+
+
+@dataclass
+class TransformationNode:
+    """A transformation in the dependency graph"""
+    name: str
+    config: TransformationConfig
+    config_path: str
+    upstream: Set[str] = field(default_factory=set)
+    downstream: Set[str] = field(default_factory=set)
+    status: str = 'pending'  # pending | queued | running | success | failed | skipped
+    queued_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    unchanged: bool = False  # Skipped because inputs matched the last successful run
+    timings: Dict[str, Any] = field(default_factory=dict)  # Phase timing summary of the run
+    resources: Dict[str, Any] = field(default_factory=dict)  # Resource usage of the whole run
+    
+    @property
+    def duration(self) -> float:
+        """Wall-clock duration in seconds"""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+    
+    @property
+    def wait_seconds(self) -> float:
+        """Time spent waiting for admission"""
+        if self.queued_at is None or self.started_at is None:
+            return 0.0
+        return self.started_at - self.queued_at
+
+
+class TransformationDAG:
+    """Dependency graph of transformations built from source/target tables"""
+    
+    def __init__(self, nodes: List[TransformationNode]):
+        self.nodes = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Duplicate transformation name: {node.name}")
+            self.nodes[node.name] = node
+        
+        self._build_edges()
+        self.order = self._topological_order()
+    
+    def _build_edges(self):
+        """Link producers of a table to its consumers"""
+        producers = {}
+        for node in self.nodes.values():
+            for table in node.config.target_tables:
+                producers.setdefault(table, set()).add(node.name)
+        
+        for node in self.nodes.values():
+            for table in node.config.source_tables:
+                for producer in producers.get(table, ()):
+                    if producer != node.name:
+                        node.upstream.add(producer)
+                        self.nodes[producer].downstream.add(node.name)
+    
+    def _topological_order(self) -> List[str]:
+        """Topological order of node names; raises on cycles"""
+        remaining = {name: len(node.upstream) for name, node in self.nodes.items()}
+        ready = sorted(name for name, count in remaining.items() if count == 0)
+        order = []
+        
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for child in sorted(self.nodes[name].downstream):
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+        
+        if len(order) != len(self.nodes):
+            cyclic = sorted(set(self.nodes) - set(order))
+            raise ValueError(f"Dependency cycle between transformations: {cyclic}")
+        
+        return order
+    
+    def critical_path(self) -> List[str]:
+        """Longest chain of dependent nodes by measured duration"""
+        best = {}
+        previous = {}
+        
+        for name in self.order:
+            node = self.nodes[name]
+            parent = max(node.upstream, key=lambda upstream: best[upstream], default=None)
+            best[name] = node.duration + (best[parent] if parent else 0.0)
+            previous[name] = parent
+        
+        if not best:
+            return []
+        
+        path = []
+        current = max(best, key=best.get)
+        while current:
+            path.append(current)
+            current = previous[current]
+        
+        return list(reversed(path))
+
+
+class DAGRunner:
+    """Run a transformation DAG with a bounded worker pool"""
+    
+    def __init__(self, dag: TransformationDAG, output_dir: str, max_workers: int = 4,
+                 scheduler: AdmissionScheduler = None):
+        self.dag = dag
+        self.output_dir = output_dir
+        self.max_workers = max(1, max_workers)
+        self.scheduler = scheduler or AdmissionScheduler(max_concurrent=self.max_workers)
+        self.cost_estimator = CostEstimator()
+        self.logger = logging.getLogger(__name__)
+    
+    def run(self) -> bool:
+        """Run every node; returns True if all nodes succeeded"""
+        started = time.time()
+        running = {}
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                for name in self._ready_nodes():
+                    if len(running) >= self.max_workers:
+                        break
+                    node = self.dag.nodes[name]
+                    node.status = 'queued'
+                    node.queued_at = time.time()
+                    running[executor.submit(self._run_node, node)] = name
+                
+                if not running:
+                    break
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    node = self.dag.nodes[name]
+                    node.finished_at = time.time()
+                    
+                    try:
+                        success = future.result()
+                    except Exception as e:
+                        success = False
+                        node.error = str(e)
+                    
+                    node.status = 'success' if success else 'failed'
+                    self.logger.info(f"Transformation node {name} {node.status} in {node.duration:.2f}s")
+                    
+                    if not success:
+                        self._skip_downstream(name)
+        
+        self._generate_report(time.time() - started)
+        return all(node.status == 'success' for node in self.dag.nodes.values())
+    
+    def _ready_nodes(self) -> List[str]:
+        """Pending nodes whose upstream nodes all succeeded, by priority then topological order"""
+        ready = [
+            name for name in self.dag.order
+            if self.dag.nodes[name].status == 'pending'
+            and all(self.dag.nodes[upstream].status == 'success' for upstream in self.dag.nodes[name].upstream)
+        ]
+        return sorted(ready, key=lambda name: -self.dag.nodes[name].config.priority)
+    
+    def _skip_downstream(self, name: str):
+        """Mark every transitive downstream node of a failed node as skipped"""
+        pending = list(self.dag.nodes[name].downstream)
+        while pending:
+            child = self.dag.nodes[pending.pop()]
+            if child.status == 'pending':
+                child.status = 'skipped'
+                child.error = f"Upstream transformation failed: {name}"
+                self.logger.warning(f"Skipping transformation node {child.name}: {child.error}")
+                pending.extend(child.downstream)
+    
+    def _run_node(self, node: TransformationNode) -> bool:
+        """Run a single transformation with its DQ checks"""
+        prepare_output_dir(node.config.output_dir)
+        cost = self.cost_estimator.estimate(node.config)
+        
+        with self.scheduler.admit(node.name, cost, node.config.priority):
+            node.status = 'running'
+            node.started_at = time.time()
+            self.logger.info(f"Starting transformation node: {node.name}")
+            wrapper = DQTransformationWrapper(node.config)
+            success = wrapper.run()
+        
+        node.unchanged = wrapper.skipped
+        node.timings = wrapper.tracer.summary()
+        node.resources = wrapper.resources.usage.get('run', {})
+        return success
+    
+    def _generate_report(self, total_seconds: float):
+        """Write per-node timings and the critical path"""
+        critical_path = self.dag.critical_path()
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'max_workers': self.max_workers,
+            'total_seconds': round(total_seconds, 3),
+            'critical_path': critical_path,
+            'critical_path_seconds': round(sum(self.dag.nodes[name].duration for name in critical_path), 3),
+            'nodes': {
+                name: {
+                    'status': node.status,
+                    'config_path': node.config_path,
+                    'upstream': sorted(node.upstream),
+                    'downstream': sorted(node.downstream),
+                    'duration_seconds': round(node.duration, 3),
+                    'wait_seconds': round(node.wait_seconds, 3),
+                    'unchanged': node.unchanged,
+                    'phases_ms': node.timings.get('phases_ms', {}),
+                    'resources': node.resources,
+                    'error': node.error
+                }
+                for name, node in ((name, self.dag.nodes[name]) for name in self.dag.order)
+            },
+            'summary': {
+                status: sum(1 for node in self.dag.nodes.values() if node.status == status)
+                for status in ('success', 'failed', 'skipped')
+            }
+        }
+        
+        report_path = os.path.join(self.output_dir, 'dag_report.yaml')
+        with open(report_path, 'w') as f:
+            yaml.dump(report, f, default_flow_style=False, sort_keys=False)
+        
+        self.logger.info(f"Critical path: {' -> '.join(critical_path)} ({report['critical_path_seconds']}s)")
+        self.logger.info(f"DAG report generated: {report_path}")
+
+
+def load_dag(configs_dir: str, contract_path: str, output_dir: str, force: bool = False) -> TransformationDAG:
+    """Load every transformation config in a directory into a DAG"""
+    config_paths = sorted(
+        glob.glob(os.path.join(configs_dir, '*.yaml')) + glob.glob(os.path.join(configs_dir, '*.yml'))
+    )
+    if not config_paths:
+        raise FileNotFoundError(f"No transformation configs found in: {configs_dir}")
+    
+    nodes = []
+    for config_path in config_paths:
+        # Peek at the name first so each node gets its own output directory
+        with open(config_path, 'r') as f:
+            name = yaml.safe_load(f)['transformation']['name']
+        
+        config = load_config(config_path, contract_path, os.path.join(output_dir, name))
+        config.force = force
+        
+        # Chained transformations share one DQ result cache by default
+        if config.dq_cache.get('enabled') and not config.dq_cache.get('dir'):
+            config.dq_cache = {**config.dq_cache, 'dir': os.path.join(output_dir, 'dq_cache')}
+        
+        nodes.append(TransformationNode(name=name, config=config, config_path=config_path))
+    
+    return TransformationDAG(nodes)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Execute a directory of transformations as a DAG')
+    parser.add_argument('--contract', required=True, help='Path to data contract YAML file')
+    parser.add_argument('--configs', required=True, help='Directory of transformation config YAML files')
+    parser.add_argument('--output', default='./output', help='Output directory for reports and logs')
+    parser.add_argument('--workers', type=int, default=4, help='Maximum number of concurrent transformations')
+    parser.add_argument('--force', action='store_true', help='Run every transformation even if its inputs are unchanged')
+    parser.add_argument('--max-cpus', type=float, help='CPU budget for concurrent transformations (default: all cores)')
+    parser.add_argument('--max-memory-mb', type=float, help='Memory budget in MB (default: 80%% of host memory)')
+    
+    args = parser.parse_args()
+    
+    os.makedirs(args.output, exist_ok=True)
+    setup_logging()
+    
+    dag = load_dag(args.configs, args.contract, args.output, args.force)
+    scheduler = AdmissionScheduler(args.max_cpus, args.max_memory_mb, args.workers)
+    runner = DAGRunner(dag, args.output, args.workers, scheduler)
+    success = runner.run()
+    
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
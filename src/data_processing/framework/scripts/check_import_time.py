@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the DQ Transformation Framework
+
+Runs `python -X importtime` on the wrapper module in a fresh interpreter and
+fails when cold-start import time exceeds a budget, or when an engine module
+is imported eagerly instead of through the lazy engine registry.
+
+Usage:
+    python scripts/check_import_time.py --budget-ms 250
+    python scripts/check_import_time.py --module runner --top 20
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+from typing import List, Tuple
+
+FRAMEWORK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when a transformation selects them
+LAZY_MODULES = (
+    'engines.dbt_engine',
+    'engines.sql_engine',
+    'engines.spark_engine',
+    'engines.python_engine',
+    'duckdb',
+    'pyarrow',
+    'psycopg2',
+    'pyspark',
+    'great_expectations',
+)
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure(module: str, runs: int) -> List[List[Tuple[str, int, int]]]:
+    """Import a module in fresh interpreters and parse -X importtime output"""
+    measurements = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True,
+            text=True,
+            cwd=FRAMEWORK_DIR
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+        
+        entries = []
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                entries.append((match.group(4), int(match.group(1)), int(match.group(2))))
+        measurements.append(entries)
+    return measurements
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Guard the cold-start import time of the framework')
+    parser.add_argument('--module', default='wrapper', help='Module to import (default: wrapper)')
+    parser.add_argument('--budget-ms', type=float, default=250.0, help='Maximum cumulative import time in ms')
+    parser.add_argument('--runs', type=int, default=3, help='Number of fresh interpreters (best run is used)')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to print')
+    
+    args = parser.parse_args()
+    
+    measurements = measure(args.module, max(1, args.runs))
+    
+    # The best run filters out noise from a cold disk cache
+    best = min(measurements, key=lambda entries: next(
+        (cumulative for name, _, cumulative in entries if name == args.module), 0
+    ))
+    total_us = next((cumulative for name, _, cumulative in best if name == args.module), 0)
+    
+    print(f"Cumulative import time of {args.module}: {total_us / 1000:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("Slowest imports (self time):")
+    for name, self_us, cumulative_us in sorted(best, key=lambda entry: entry[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {cumulative_us / 1000:8.1f} ms  {name}")
+    
+    failures = []
+    eager = sorted({name for name, _, _ in best if name in LAZY_MODULES})
+    if eager:
+        failures.append(f"Modules imported eagerly at startup: {eager}")
+    if total_us / 1000 > args.budget_ms:
+        failures.append(f"Import time {total_us / 1000:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+    
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Import time within budget")
+    
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Tests for the SQL script splitter and statement analysis"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sql_parser import split_statements, tokenize, analyze_statement, statement_dependencies, STRING
+
+
+def test_backslash_does_not_escape_standard_strings():
+    sql = r"SELECT * FROM a WHERE x LIKE 'a\_%' ESCAPE '\'; CREATE TABLE b AS SELECT 1; SELECT 2"
+    assert split_statements(sql) == [
+        r"SELECT * FROM a WHERE x LIKE 'a\_%' ESCAPE '\'",
+        "CREATE TABLE b AS SELECT 1",
+        "SELECT 2"
+    ]
+
+
+def test_backslash_escapes_in_escape_strings():
+    sql = r"SELECT E'it\'s; fine'; SELECT 2"
+    assert split_statements(sql) == [r"SELECT E'it\'s; fine'", "SELECT 2"]
+    assert (STRING, r"E'it\'s; fine'") in list(tokenize(sql))
+
+
+def test_backslash_escapes_in_backslash_dialects():
+    sql = r"SELECT 'it\'s; fine'; SELECT 2"
+    assert split_statements(sql, 'bigquery') == [r"SELECT 'it\'s; fine'", "SELECT 2"]
+    assert len(split_statements(sql)) == 2
+
+
+def test_begin_as_column_or_alias_is_not_a_block():
+    sql = "SELECT begin, x AS begin FROM t; CREATE TABLE b AS SELECT 1 AS begin; SELECT 3"
+    assert split_statements(sql) == [
+        "SELECT begin, x AS begin FROM t",
+        "CREATE TABLE b AS SELECT 1 AS begin",
+        "SELECT 3"
+    ]
+
+
+def test_begin_blocks_keep_their_semicolons():
+    sql = (
+        "BEGIN INSERT INTO a VALUES (1); IF x THEN BEGIN DELETE FROM a; END; END IF; END; "
+        "CREATE PROCEDURE p() AS BEGIN SELECT 1; END; "
+        "DECLARE n INT; BEGIN SELECT n; END; "
+        "BEGIN; SELECT 1; COMMIT"
+    )
+    assert split_statements(sql) == [
+        "BEGIN INSERT INTO a VALUES (1); IF x THEN BEGIN DELETE FROM a; END; END IF; END",
+        "CREATE PROCEDURE p() AS BEGIN SELECT 1; END",
+        "DECLARE n INT; BEGIN SELECT n; END",
+        "BEGIN",
+        "SELECT 1",
+        "COMMIT"
+    ]
+
+
+def test_readers_of_a_view_depend_on_writers_of_its_tables():
+    sql = "CREATE VIEW v AS SELECT * FROM t; INSERT INTO t SELECT 1; CREATE TABLE x AS SELECT * FROM v"
+    statements = [analyze_statement(statement) for statement in split_statements(sql)]
+    assert statement_dependencies(statements) == [set(), {0}, {0, 1}]
+
+
+def test_insert_column_list_is_not_a_barrier():
+    statement = analyze_statement("INSERT INTO main.t (a, b) SELECT a, b FROM s")
+    assert statement.writes == {'main.t'}
+    assert not statement.barrier
+    
+    statements = [analyze_statement(sql) for sql in (
+        "INSERT INTO a (id) SELECT id FROM s",
+        "INSERT INTO b (id) SELECT id FROM s",
+        "CREATE TABLE c AS SELECT * FROM a"
+    )]
+    assert statement_dependencies(statements) == [set(), set(), {0}]
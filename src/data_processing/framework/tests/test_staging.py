@@ -0,0 +1,32 @@
+"""Tests for redirecting SQL table references to staging tables"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.staging import rewrite_table_references
+
+
+OVERRIDES = {'main.orders': 'main.orders__staging'}
+
+
+def test_rewrites_identifier_references():
+    sql = 'CREATE TABLE main.orders AS SELECT main.orders.* FROM "main"."orders"; INSERT INTO MAIN.ORDERS SELECT 1'
+    assert rewrite_table_references(sql, OVERRIDES) == (
+        'CREATE TABLE main.orders__staging AS SELECT main.orders__staging.* FROM main.orders__staging; '
+        'INSERT INTO main.orders__staging SELECT 1'
+    )
+
+
+def test_leaves_literals_comments_and_other_names_alone():
+    sql = "SELECT 'main.orders' -- main.orders\nFROM db.main.orders, main.orders_archive /* main.orders */"
+    assert rewrite_table_references(sql, OVERRIDES) == sql
+
+
+def test_resolves_unqualified_names_against_the_default_schema():
+    sql = 'CREATE TABLE orders AS SELECT 1 AS id; SELECT orders.id FROM orders; SELECT orders FROM t'
+    assert rewrite_table_references(sql, OVERRIDES, default_schema='main') == (
+        'CREATE TABLE main.orders__staging AS SELECT 1 AS id; '
+        'SELECT orders.id FROM main.orders__staging AS orders; SELECT orders FROM t'
+    )
@@ -4,5 +4,8 @@ Utilities for the DQ Transformation Framework
 
 from .config import ConfigLoader, EnvironmentManager, ValidationUtils
 from .lineage import LineageTracker
+from .connections import ConnectionFactory
+from .fingerprint import TableFingerprinter
 
-__all__ = ['ConfigLoader', 'EnvironmentManager', 'ValidationUtils', 'LineageTracker']
+__all__ = ['ConfigLoader', 'EnvironmentManager', 'ValidationUtils', 'LineageTracker',
+           'ConnectionFactory', 'TableFingerprinter']
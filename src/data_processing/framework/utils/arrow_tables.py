@@ -0,0 +1,140 @@
+"""
+Arrow table I/O for the DQ Transformation Framework
+
+Reads destination tables into pyarrow Tables (only the requested columns)
+and writes pyarrow Tables back, so in-process Python transformations get
+their inputs without a second interpreter reloading them. DuckDB exchanges
+Arrow data natively; DB-API destinations go through row batches.
+"""
+
+from typing import Dict, Any, List, Optional
+
+
+# Rows per INSERT batch on DB-API destinations
+WRITE_BATCH_ROWS = 10000
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("pyarrow not installed. Install with: pip install pyarrow")
+
+
+def select_statement(table: str, columns: Optional[List[str]] = None) -> str:
+    """SELECT of the given columns of a table (all columns when None)"""
+    column_list = ', '.join(columns) if columns else '*'
+    return f"SELECT {column_list} FROM {table}"
+
+
+def read_table(connection, table: str, columns: Optional[List[str]] = None):
+    """Read a table (or the given columns of it) as a pyarrow Table"""
+    pa = _require_pyarrow()
+    query = select_statement(table, columns)
+    
+    if hasattr(connection, 'execute'):
+        # DuckDB: zero-copy Arrow result
+        result = connection.execute(query)
+        to_arrow = getattr(result, 'to_arrow_table', None) or result.fetch_arrow_table
+        return to_arrow()
+    
+    if hasattr(connection, 'query'):
+        # BigQuery client
+        return connection.query(query).result().to_arrow()
+    
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query)
+        if hasattr(cursor, 'fetch_arrow_all'):
+            # Snowflake
+            arrow_table = cursor.fetch_arrow_all()
+            if arrow_table is not None:
+                return arrow_table
+        names = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        return pa.table({name: [row[i] for row in rows] for i, name in enumerate(names)})
+    finally:
+        cursor.close()
+
+
+def sql_type(arrow_type) -> str:
+    """Column type for an Arrow type on DB-API destinations"""
+    pa = _require_pyarrow()
+    types = pa.types
+    if types.is_boolean(arrow_type):
+        return 'BOOLEAN'
+    if types.is_integer(arrow_type):
+        return 'BIGINT'
+    if types.is_floating(arrow_type):
+        return 'DOUBLE PRECISION'
+    if types.is_decimal(arrow_type):
+        return f"NUMERIC({arrow_type.precision}, {arrow_type.scale})"
+    if types.is_timestamp(arrow_type):
+        return 'TIMESTAMP'
+    if types.is_date(arrow_type):
+        return 'DATE'
+    if types.is_binary(arrow_type) or types.is_large_binary(arrow_type):
+        return 'BYTEA'
+    return 'TEXT'
+
+
+def write_table(connection, table: str, data, mode: str = 'replace'):
+    """Write a pyarrow Table to a DuckDB or DB-API destination table, replacing or appending to it"""
+    if mode not in ('replace', 'append'):
+        raise ValueError(f"Unsupported write mode: {mode}")
+    
+    if hasattr(connection, 'execute'):
+        # DuckDB scans the Arrow table in place
+        view = f"__arrow_{table.replace('.', '_')}"
+        connection.register(view, data)
+        try:
+            if mode == 'replace':
+                connection.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM {view}")
+            else:
+                connection.execute(f"INSERT INTO {table} BY NAME SELECT * FROM {view}")
+        finally:
+            connection.unregister(view)
+        return
+    
+    columns = ', '.join(data.column_names)
+    placeholders = ', '.join(['%s'] * data.num_columns)
+    cursor = connection.cursor()
+    try:
+        if mode == 'replace':
+            definitions = ', '.join(f"{field.name} {sql_type(field.type)}" for field in data.schema)
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"CREATE TABLE {table} ({definitions})")
+        insert = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+        for batch in data.to_batches(max_chunksize=WRITE_BATCH_ROWS):
+            rows = list(zip(*(column.to_pylist() for column in batch.columns)))
+            if rows:
+                cursor.executemany(insert, rows)
+    finally:
+        cursor.close()
+
+
+def to_arrow(value: Any):
+    """Convert a function result (pyarrow Table, RecordBatchReader or pandas DataFrame) to a pyarrow Table"""
+    pa = _require_pyarrow()
+    if isinstance(value, pa.Table):
+        return value
+    if isinstance(value, pa.RecordBatchReader):
+        return value.read_all()
+    if hasattr(value, 'to_arrow'):
+        # polars and similar frames
+        return value.to_arrow()
+    if type(value).__name__ == 'DataFrame':
+        return pa.Table.from_pandas(value, preserve_index=False)
+    raise TypeError(f"Expected a pyarrow Table or DataFrame, got {type(value).__name__}")
+
+
+def concat_tables(tables: List[Any]):
+    """Concatenate tables without copying, unifying schemas that differ (e.g. all-null columns)"""
+    pa = _require_pyarrow()
+    return pa.concat_tables(tables, promote_options='default')
+
+
+def table_sizes(tables: Dict[str, Any]) -> Dict[str, int]:
+    """Row counts of named Arrow tables, for logging"""
+    return {name: data.num_rows for name, data in tables.items()}
@@ -112,8 +112,10 @@ class ValidationUtils:
     @staticmethod
     def validate_engine_type(engine_type: str):
         """Validate engine type"""
-        valid_engines = ['dbt', 'sql', 'spark', 'python']
-        if engine_type not in valid_engines:
+        from engines import available_engines
+        
+        valid_engines = available_engines()
+        if engine_type not in valid_engines and ':' not in engine_type:
             raise ValueError(f"Invalid engine type: {engine_type}. Must be one of {valid_engines}")
     
     @staticmethod
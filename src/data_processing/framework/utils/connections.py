@@ -0,0 +1,402 @@
+"""
+Destination connection utilities for the DQ Transformation Framework
+
+Opens DB-API style connections to the destination declared in a data contract.
+Shared by the SQL engine and the DQ components so that every part of the
+framework talks to the warehouse the same way. A process-wide pool keeps
+warehouse sessions open between uses so back-to-back runs skip session setup.
+"""
+
+import json
+import time
+import yaml
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+
+def load_destination(contract_path: str) -> Dict[str, Any]:
+    """Load the destination section of a data contract"""
+    with open(contract_path, 'r') as f:
+        contract = yaml.safe_load(f) or {}
+    return contract.get('destination', {})
+
+
+# DuckDB settings that can be declared in the contract's destination
+DUCKDB_SETTINGS = ('threads', 'memory_limit', 'temp_directory', 'max_temp_directory_size')
+
+
+class ConnectionFactory:
+    """Create connections for the supported destination types"""
+    
+    SUPPORTED_TYPES = ('duckdb', 'postgres', 'bigquery', 'snowflake')
+    
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+    
+    def connect_from_contract(self, contract_path: str):
+        """Get database connection from contract configuration"""
+        try:
+            return self.connect(load_destination(contract_path))
+        except Exception as e:
+            self.logger.error(f"Error getting database connection: {str(e)}")
+            return None
+    
+    def connect(self, destination: Dict[str, Any]):
+        """Get database connection for a destination config"""
+        dest_type = destination.get('type')
+        
+        if dest_type == 'duckdb':
+            return self._get_duckdb_connection(destination)
+        elif dest_type == 'postgres':
+            return self._get_postgres_connection(destination)
+        elif dest_type == 'bigquery':
+            return self._get_bigquery_connection(destination)
+        elif dest_type == 'snowflake':
+            return self._get_snowflake_connection(destination)
+        else:
+            self.logger.error(f"Unsupported destination type: {dest_type}")
+            return None
+    
+    def _get_duckdb_connection(self, config: Dict[str, Any]):
+        """Get DuckDB connection"""
+        try:
+            import duckdb
+            db_path = config.get('database', ':memory:')
+            # Resource settings declared in the contract (spill directory for larger-than-memory queries)
+            settings = {key: str(config[key]) for key in DUCKDB_SETTINGS if config.get(key) is not None}
+            return duckdb.connect(db_path, config=settings)
+        except ImportError:
+            self.logger.error("DuckDB not installed. Install with: pip install duckdb")
+            return None
+    
+    def _get_postgres_connection(self, config: Dict[str, Any]):
+        """Get PostgreSQL connection"""
+        try:
+            import psycopg2
+            return psycopg2.connect(
+                host=config.get('host', 'localhost'),
+                port=config.get('port', 5432),
+                database=config.get('database'),
+                user=config.get('user'),
+                password=config.get('password')
+            )
+        except ImportError:
+            self.logger.error("psycopg2 not installed. Install with: pip install psycopg2-binary")
+            return None
+    
+    def _get_bigquery_connection(self, config: Dict[str, Any]):
+        """Get BigQuery connection"""
+        try:
+            from google.cloud import bigquery
+            client = bigquery.Client(project=config.get('project_id'))
+            return client
+        except ImportError:
+            self.logger.error("BigQuery client not installed. Install with: pip install google-cloud-bigquery")
+            return None
+    
+    def _get_snowflake_connection(self, config: Dict[str, Any]):
+        """Get Snowflake connection"""
+        try:
+            import snowflake.connector
+            return snowflake.connector.connect(
+                user=config.get('user'),
+                password=config.get('password'),
+                account=config.get('account'),
+                warehouse=config.get('warehouse'),
+                database=config.get('database'),
+                schema=config.get('schema')
+            )
+        except ImportError:
+            self.logger.error("Snowflake connector not installed. Install with: pip install snowflake-connector-python")
+            return None
+
+
+class ConnectionPool:
+    """Reusable connections keyed by destination config
+    
+    Idle connections are closed after max_idle_seconds and checked with a
+    trivial query before reuse when they have been idle longer than
+    health_check_seconds. At most max_size connections per destination are
+    open at once; further acquirers wait for one to be released. The
+    destination type of every connection handed out is kept, so connections
+    are told apart by type rather than by the methods they happen to have.
+    """
+    
+    # Local DuckDB connections are cheap to open, and open handles lock the
+    # database file against other processes (dbt, Spark or Python engines)
+    UNPOOLED_TYPES = ('duckdb',)
+    
+    def __init__(self, max_size: int = 4, max_idle_seconds: float = 300, health_check_seconds: float = 30,
+                 acquire_timeout: float = 300):
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_seconds = health_check_seconds
+        self.acquire_timeout = acquire_timeout
+        self.pooled_types: Optional[List[str]] = None
+        self.logger = logging.getLogger(__name__)
+        self.factory = ConnectionFactory()
+        
+        self._idle: Dict[str, List[Tuple[Any, float]]] = {}
+        self._open: Dict[str, int] = {}
+        self._keys: Dict[int, str] = {}
+        self._types: Dict[int, str] = {}
+        # Settings configured for a single destination, by destination key
+        self._settings: Dict[str, Dict[str, Any]] = {}
+        self._counters = {'opened': 0, 'reused': 0, 'health_check_failures': 0, 'expired': 0}
+        self._condition = threading.Condition()
+    
+    def configure(self, settings: Dict[str, Any] = None, destination: Dict[str, Any] = None):
+        """Apply pool settings from a transformation config's connections section
+        
+        With a destination the settings only apply to connections to it, so runs
+        sharing the process (DAG nodes, daemon jobs) do not resize each other's pools.
+        """
+        settings = settings or {}
+        with self._condition:
+            if destination is not None:
+                self._settings[self.destination_key(destination)] = dict(settings)
+                self._condition.notify_all()
+                return
+            self.max_size = int(settings.get('max_size', self.max_size))
+            self.max_idle_seconds = float(settings.get('max_idle_seconds', self.max_idle_seconds))
+            self.health_check_seconds = float(settings.get('health_check_seconds', self.health_check_seconds))
+            self.acquire_timeout = float(settings.get('acquire_timeout_seconds', self.acquire_timeout))
+            if 'pooled_types' in settings:
+                self.pooled_types = list(settings['pooled_types'])
+            self._condition.notify_all()
+    
+    @staticmethod
+    def destination_key(destination: Dict[str, Any]) -> str:
+        """Identity of a destination config"""
+        return json.dumps(destination, sort_keys=True, default=str)
+    
+    def is_pooled(self, destination: Dict[str, Any]) -> bool:
+        """Whether connections to a destination are kept for reuse"""
+        dest_type = destination.get('type')
+        pooled_types = self._setting(self.destination_key(destination), 'pooled_types', self.pooled_types)
+        if pooled_types is not None:
+            return dest_type in pooled_types
+        return dest_type not in self.UNPOOLED_TYPES
+    
+    def connection_type(self, connection) -> Optional[str]:
+        """Destination type of a connection handed out by the pool (None if unknown)"""
+        with self._condition:
+            return self._types.get(id(connection))
+    
+    def acquire(self, destination: Dict[str, Any]):
+        """Connection for exclusive use until released; None if it cannot be opened"""
+        if not self.is_pooled(destination):
+            connection = self.factory.connect(destination)
+            if connection is not None:
+                with self._condition:
+                    self._types[id(connection)] = destination.get('type')
+            return connection
+        
+        key = self.destination_key(destination)
+        deadline = time.monotonic() + float(self._setting(key, 'acquire_timeout_seconds', self.acquire_timeout))
+        with self._condition:
+            while True:
+                connection = self._take_idle(key)
+                if connection is not None:
+                    self._counters['reused'] += 1
+                    return connection
+                if self._open.get(key, 0) < int(self._setting(key, 'max_size', self.max_size)):
+                    # Reserve the slot, then connect outside the lock
+                    self._open[key] = self._open.get(key, 0) + 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ConnectionError(f"Timed out waiting for a {destination.get('type')} connection")
+                self._condition.wait(remaining)
+        
+        try:
+            connection = self.factory.connect(destination)
+        except Exception:
+            connection = None
+        
+        with self._condition:
+            if connection is None:
+                self._open[key] -= 1
+                self._condition.notify_all()
+                return None
+            self._counters['opened'] += 1
+            self._keys[id(connection)] = key
+            self._types[id(connection)] = destination.get('type')
+        return connection
+    
+    def release(self, connection, discard: bool = False):
+        """Return a connection to the pool (or close it if discarded or unpooled)"""
+        if connection is None:
+            return
+        
+        with self._condition:
+            key = self._keys.get(id(connection))
+            if key is None:
+                self._types.pop(id(connection), None)
+        if key is None:
+            _close(connection)
+            return
+        
+        if not discard:
+            # Leave no transaction open for the next user
+            try:
+                if hasattr(connection, 'rollback'):
+                    connection.rollback()
+            except Exception:
+                discard = True
+        
+        with self._condition:
+            if discard:
+                self._forget(key, connection)
+            else:
+                self._idle.setdefault(key, []).append((connection, time.monotonic()))
+            self._condition.notify_all()
+        if discard:
+            _close(connection)
+    
+    @contextmanager
+    def connection(self, destination: Dict[str, Any]):
+        """Hold a connection for the enclosed block"""
+        connection = self.acquire(destination)
+        if connection is None:
+            raise ConnectionError(f"Failed to establish {destination.get('type')} connection")
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+    
+    def _take_idle(self, key: str):
+        """Most recently used healthy idle connection (called with the lock held)"""
+        idle = self._idle.get(key, [])
+        max_idle = float(self._setting(key, 'max_idle_seconds', self.max_idle_seconds))
+        health_check = float(self._setting(key, 'health_check_seconds', self.health_check_seconds))
+        while idle:
+            connection, released_at = idle.pop()
+            idle_for = time.monotonic() - released_at
+            if idle_for > max_idle:
+                self._counters['expired'] += 1
+            elif idle_for <= health_check or self._is_healthy(connection):
+                return connection
+            else:
+                self._counters['health_check_failures'] += 1
+            self._forget(key, connection)
+            _close(connection)
+        return None
+    
+    def _is_healthy(self, connection) -> bool:
+        """Run a trivial query on a connection (called with the lock held)"""
+        try:
+            if self._types.get(id(connection)) == 'bigquery':
+                # BigQuery clients are stateless HTTP sessions
+                return True
+            fetch_one(connection, "SELECT 1")
+            return True
+        except Exception as e:
+            self.logger.info(f"Discarding unhealthy pooled connection: {str(e)}")
+            return False
+    
+    def _setting(self, key: str, name: str, default: Any) -> Any:
+        """A pool setting configured for a destination, or the pool-wide value"""
+        return self._settings.get(key, {}).get(name, default)
+    
+    def _forget(self, key: str, connection):
+        self._keys.pop(id(connection), None)
+        self._types.pop(id(connection), None)
+        self._open[key] = max(0, self._open.get(key, 0) - 1)
+    
+    def prune(self):
+        """Close connections idle for longer than max_idle_seconds"""
+        now = time.monotonic()
+        expired = []
+        with self._condition:
+            for key, idle in self._idle.items():
+                max_idle = float(self._setting(key, 'max_idle_seconds', self.max_idle_seconds))
+                keep = []
+                for connection, released_at in idle:
+                    if now - released_at > max_idle:
+                        expired.append(connection)
+                        self._forget(key, connection)
+                        self._counters['expired'] += 1
+                    else:
+                        keep.append((connection, released_at))
+                self._idle[key] = keep
+            self._condition.notify_all()
+        for connection in expired:
+            _close(connection)
+    
+    def close_all(self):
+        """Close all idle connections"""
+        with self._condition:
+            idle = [(key, connection) for key, entries in self._idle.items() for connection, _ in entries]
+            self._idle = {}
+            for key, connection in idle:
+                self._forget(key, connection)
+        for _, connection in idle:
+            _close(connection)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Open and idle connections per destination type, and reuse counters"""
+        with self._condition:
+            destinations = {}
+            for key, count in self._open.items():
+                dest_type = json.loads(key).get('type')
+                entry = destinations.setdefault(dest_type, {'open': 0, 'idle': 0})
+                entry['open'] += count
+                entry['idle'] += len(self._idle.get(key, []))
+            return {'max_size': self.max_size, 'destinations': destinations, **self._counters}
+
+
+def _close(connection):
+    try:
+        if hasattr(connection, 'close'):
+            connection.close()
+    except Exception:
+        pass
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """The process-wide connection pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+            atexit.register(_pool.close_all)
+        return _pool
+
+
+def fetch_one(connection, query: str, params: Optional[Sequence[Any]] = None):
+    """Run a query and return the first row, for DB-API and DuckDB connections"""
+    cursor = connection.cursor()
+    try:
+        if params is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query, params)
+        return cursor.fetchone()
+    finally:
+        if hasattr(cursor, 'close'):
+            cursor.close()
+
+
+def execute_statement(connection, statement: str, dest_type: Optional[str] = None):
+    """Run a statement without fetching its results, for DB-API, DuckDB and BigQuery connections"""
+    dest_type = dest_type or get_connection_pool().connection_type(connection)
+    if dest_type == 'duckdb':
+        # DuckDB: run on the connection itself so interrupt() can stop it
+        connection.execute(statement)
+    elif dest_type == 'bigquery':
+        # BigQuery client: wait for the job to finish
+        connection.query(statement).result()
+    else:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
@@ -0,0 +1,249 @@
+"""
+Table fingerprinting utilities for the DQ Transformation Framework
+
+A table fingerprint is a cheap summary of a table's state: row count, the
+maximum value of a cursor column, a snapshot/version identifier reported by
+the destination and, for file-backed tables, file sizes and modification
+times. Where the destination reports no version and no cursor is known
+(e.g. DuckDB), a content hash of the rows is taken instead, since the row
+count alone misses in-place updates. Only fingerprints with a version, a
+cursor, a content hash or file stats are reliable enough to skip work on.
+"""
+
+import os
+import glob
+import json
+import hashlib
+import yaml
+import logging
+from typing import Dict, Any, List, Optional
+
+from .connections import get_connection_pool, fetch_one
+
+
+def hash_payload(payload: Any) -> str:
+    """Stable SHA-256 of a JSON-serialisable payload"""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def hash_file(path: str) -> Optional[str]:
+    """SHA-256 of a file's content, or None if it does not exist"""
+    if not path or not os.path.isfile(path):
+        return None
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_reliable(components: Optional[Dict[str, Any]]) -> bool:
+    """Whether fingerprint components change whenever the table's data does"""
+    if not components:
+        return False
+    return any(components.get(key) is not None for key in ('files', 'version', 'max_cursor', 'content_hash'))
+
+
+def hash_directory(path: str) -> Optional[str]:
+    """SHA-256 over relative paths and contents of every file in a directory"""
+    if not path or not os.path.isdir(path):
+        return None
+    
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode('utf-8'))
+            digest.update((hash_file(file_path) or '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+class TableFingerprinter:
+    """Compute table fingerprints against the contract destination"""
+    
+    def __init__(self, contract_path: str, cursor_columns: Dict[str, str] = None):
+        self.contract_path = contract_path
+        self.cursor_columns = cursor_columns or {}
+        self.logger = logging.getLogger(__name__)
+        self._contract = None
+    
+    def fingerprint(self, table: str) -> Optional[str]:
+        """Fingerprint hash for a table, or None if it cannot be determined"""
+        components = self.components(table)
+        if components is None:
+            return None
+        return hash_payload(components)
+    
+    def fingerprint_many(self, tables: List[str]) -> Dict[str, Optional[str]]:
+        """Fingerprint hashes for several tables"""
+        return {table: self.fingerprint(table) for table in tables}
+    
+    def destination_identity(self) -> Dict[str, Any]:
+        """Where the fingerprinted tables live, so equal fingerprints of different warehouses differ"""
+        destination = self._get_destination()
+        identity = {key: destination.get(key) for key in ('type', 'host', 'port', 'account', 'project', 'database')
+                    if destination.get(key) is not None}
+        if identity.get('type') == 'duckdb' and identity.get('database') not in (None, ':memory:'):
+            identity['database'] = os.path.abspath(identity['database'])
+        return identity or {'contract': os.path.abspath(self.contract_path)}
+    
+    def components(self, table: str) -> Optional[Dict[str, Any]]:
+        """Raw fingerprint components for a table"""
+        try:
+            if self._is_file_table(table):
+                return self._file_components(table)
+            
+            destination = self._get_destination()
+            pool = get_connection_pool()
+            connection = pool.acquire(destination)
+            if connection is None:
+                return None
+            
+            try:
+                return self._table_components(connection, destination.get('type'), table)
+            finally:
+                pool.release(connection)
+        
+        except Exception as e:
+            self.logger.warning(f"Could not fingerprint table {table}: {str(e)}")
+            return None
+    
+    def _table_components(self, connection, dest_type: str, table: str) -> Dict[str, Any]:
+        """Fingerprint components for a warehouse table"""
+        quoted = self._quote_table(table, dest_type)
+        components = {'table': table}
+        
+        if dest_type == 'bigquery':
+            # BigQuery exposes row count and modification time as table metadata
+            metadata = connection.get_table(table)
+            components['row_count'] = metadata.num_rows
+            components['version'] = metadata.modified.isoformat() if metadata.modified else None
+            return components
+        
+        components['row_count'] = fetch_one(connection, f"SELECT COUNT(*) FROM {quoted}")[0]
+        
+        cursor_column = self._cursor_column(table)
+        if cursor_column:
+            row = fetch_one(connection, f"SELECT MAX({self._quote(cursor_column, dest_type)}) FROM {quoted}")
+            components['max_cursor'] = row[0]
+        
+        components['version'] = self._version(connection, dest_type, table)
+        if components['version'] is None and not cursor_column:
+            components['content_hash'] = self._content_hash(connection, dest_type, quoted)
+        return components
+    
+    def _content_hash(self, connection, dest_type: str, quoted: str) -> Optional[str]:
+        """Order-independent hash of every row, for destinations without a version"""
+        if dest_type == 'duckdb':
+            query = f"SELECT SUM(HASH(t)::HUGEINT) FROM {quoted} AS t"
+        elif dest_type == 'postgres':
+            query = f"SELECT md5(string_agg(md5(t::text), '' ORDER BY md5(t::text))) FROM {quoted} AS t"
+        elif dest_type == 'snowflake':
+            query = f"SELECT HASH_AGG(*) FROM {quoted}"
+        else:
+            return None
+        
+        try:
+            row = fetch_one(connection, query)
+            # An empty table hashes to NULL; its row count already says it is empty
+            return str(row[0]) if row and row[0] is not None else 'empty'
+        except Exception as e:
+            self.logger.debug(f"No content hash for {quoted}: {str(e)}")
+            return None
+    
+    def _version(self, connection, dest_type: str, table: str) -> Optional[Any]:
+        """Snapshot/version identifier reported by the destination, if any"""
+        schema, name = self._split_table(table)
+        
+        try:
+            if dest_type == 'snowflake':
+                row = fetch_one(
+                    connection,
+                    "SELECT LAST_ALTERED FROM INFORMATION_SCHEMA.TABLES "
+                    "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+                    ((schema or '').upper(), name.upper())
+                )
+                return row[0] if row else None
+        except Exception as e:
+            self.logger.debug(f"No version information for {table}: {str(e)}")
+        
+        # DuckDB has no per-table version. Postgres statistics counters (pg_stat_user_tables) are
+        # updated asynchronously and start over when a table is recreated, so they cannot prove that
+        # nothing changed; both fall back to the cursor or a content hash
+        return None
+    
+    def _file_components(self, table: str) -> Optional[Dict[str, Any]]:
+        """Fingerprint components for file-backed tables (paths or globs)"""
+        if os.path.isdir(table):
+            paths = [
+                os.path.join(root, name)
+                for root, _, files in os.walk(table)
+                for name in files
+            ]
+        else:
+            paths = glob.glob(table, recursive=True)
+        
+        if not paths:
+            return None
+        
+        files = []
+        for path in sorted(paths):
+            stat = os.stat(path)
+            files.append([path, stat.st_size, stat.st_mtime_ns])
+        
+        return {'table': table, 'files': files}
+    
+    def _cursor_column(self, table: str) -> Optional[str]:
+        """Cursor column for a table, from config or the contract incremental settings"""
+        if table in self.cursor_columns:
+            return self.cursor_columns[table]
+        
+        _, name = self._split_table(table)
+        if name in self.cursor_columns:
+            return self.cursor_columns[name]
+        
+        # Fall back to the contract cursor field when the table declares that column
+        contract = self._get_contract()
+        cursor_field = contract.get('source', {}).get('incremental', {}).get('cursor_field')
+        columns = contract.get('schema', {}).get(name, {}).get('columns', {})
+        if cursor_field and cursor_field in columns:
+            return cursor_field
+        
+        return None
+    
+    def _get_destination(self) -> Dict[str, Any]:
+        """Destination config from the contract"""
+        return self._get_contract().get('destination', {})
+    
+    def _get_contract(self) -> Dict[str, Any]:
+        """Data contract (cached)"""
+        if self._contract is None:
+            with open(self.contract_path, 'r') as f:
+                self._contract = yaml.safe_load(f) or {}
+        return self._contract
+    
+    @staticmethod
+    def _is_file_table(table: str) -> bool:
+        """Tables given as paths or globs are fingerprinted from the filesystem"""
+        return os.path.sep in table or table.endswith(('.parquet', '.csv', '.json')) or '*' in table
+    
+    @staticmethod
+    def _split_table(table: str):
+        """Split 'schema.table' into its parts"""
+        parts = table.split('.')
+        if len(parts) == 1:
+            return None, parts[0]
+        return parts[-2], parts[-1]
+    
+    @staticmethod
+    def _quote(identifier: str, dest_type: str) -> str:
+        """Quote a single identifier"""
+        quote = '`' if dest_type == 'bigquery' else '"'
+        return f"{quote}{identifier}{quote}"
+    
+    def _quote_table(self, table: str, dest_type: str) -> str:
+        """Quote a possibly schema-qualified table name"""
+        return '.'.join(self._quote(part, dest_type) for part in table.split('.'))
@@ -0,0 +1,136 @@
+"""
+DuckDB lakehouse utilities for the DQ Transformation Framework
+
+Exposes Parquet files written by ingestion (a Parquet directory, e.g. a dlt
+filesystem destination, or the load packages of a local dlt pipeline) as
+DuckDB views over read_parquet, so SQL transformations query them in place,
+and writes result tables back as (hive-partitioned) Parquet directories.
+"""
+
+import os
+import glob
+import shutil
+import logging
+from typing import Dict, Any, List, Union
+
+from .connections import execute_statement
+
+
+logger = logging.getLogger(__name__)
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _is_internal(table: str) -> bool:
+    # dlt bookkeeping tables (_dlt_loads, _dlt_version, ...)
+    return table.startswith('_dlt')
+
+
+def parquet_directory_tables(path: str) -> Dict[str, str]:
+    """Tables of a Parquet directory: each subdirectory, and each top-level <table>.parquet file"""
+    tables = {}
+    path = os.path.expanduser(path)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Parquet directory not found: {path}")
+    
+    for entry in sorted(os.listdir(path)):
+        full_path = os.path.join(path, entry)
+        if os.path.isdir(full_path):
+            if glob.glob(os.path.join(full_path, '**', '*.parquet'), recursive=True):
+                tables[entry] = os.path.join(full_path, '**', '*.parquet')
+        elif entry.endswith('.parquet'):
+            tables[entry[:-len('.parquet')]] = full_path
+    return {table: files for table, files in tables.items() if not _is_internal(table)}
+
+
+def load_package_tables(pipeline: str, pipelines_dir: str = '~/.dlt/pipelines') -> Dict[str, List[str]]:
+    """Tables of the loaded Parquet packages of a local dlt pipeline
+    
+    Job files are named <table>.<file_id>.<retry>.parquet under
+    <pipelines_dir>/<pipeline>/load/loaded/<load_id>/completed_jobs.
+    """
+    pattern = os.path.join(os.path.expanduser(pipelines_dir), pipeline, 'load', 'loaded', '*',
+                           'completed_jobs', '*.parquet')
+    tables: Dict[str, List[str]] = {}
+    for path in sorted(glob.glob(pattern)):
+        table = os.path.basename(path).split('.')[0]
+        if not _is_internal(table):
+            tables.setdefault(table, []).append(path)
+    return tables
+
+
+def view_statement(view: str, files: Union[str, List[str]], hive_partitioning: bool = True) -> str:
+    """CREATE VIEW statement reading Parquet files (a glob or a list of paths)"""
+    if isinstance(files, str):
+        paths = _sql_string(files)
+    else:
+        paths = '[' + ', '.join(_sql_string(path) for path in files) + ']'
+    hive = 'true' if hive_partitioning else 'false'
+    return (f"CREATE OR REPLACE VIEW {view} AS SELECT * FROM "
+            f"read_parquet({paths}, hive_partitioning = {hive}, union_by_name = true)")
+
+
+def register_parquet_views(connection, lakehouse: Dict[str, Any]) -> List[str]:
+    """Create a view for each table of the configured Parquet sources; returns the view names"""
+    views = []
+    for source in lakehouse.get('sources', []):
+        schema = source.get('schema', lakehouse.get('schema', 'main'))
+        if 'pipeline' in source:
+            tables = load_package_tables(source['pipeline'], source.get('pipelines_dir', '~/.dlt/pipelines'))
+            # Load package files are not laid out in partition directories
+            hive_partitioning = False
+        else:
+            tables = parquet_directory_tables(source['path'])
+            hive_partitioning = source.get('hive_partitioning', lakehouse.get('hive_partitioning', True))
+        
+        if not tables:
+            logger.warning(f"No Parquet files found for lakehouse source {source}")
+            continue
+        
+        execute_statement(connection, f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        for table, files in tables.items():
+            view = f"{schema}.{table}"
+            execute_statement(connection, view_statement(view, files, hive_partitioning))
+            views.append(view)
+    
+    logger.info(f"Registered {len(views)} Parquet views: {views}")
+    return views
+
+
+def partition_columns(partition_by: Union[Dict[str, List[str]], List[str], None], table: str) -> List[str]:
+    """Partition columns of a table: a list for all tables, or per (qualified or bare) table name"""
+    if isinstance(partition_by, dict):
+        columns = partition_by.get(table, partition_by.get(table.split('.')[-1], []))
+    else:
+        columns = partition_by or []
+    return [columns] if isinstance(columns, str) else list(columns)
+
+
+def export_table(connection, table: str, output_dir: str, partition_by: List[str] = None,
+                 compression: str = 'zstd') -> str:
+    """Write a table to <output_dir>/<table> as Parquet, replacing the previous export"""
+    output_dir = os.path.expanduser(output_dir)
+    final_path = os.path.join(output_dir, table.split('.')[-1])
+    tmp_path = f"{final_path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    options = ['FORMAT PARQUET', f"COMPRESSION {compression}"]
+    if partition_by:
+        options.append(f"PARTITION_BY ({', '.join(partition_by)})")
+        target = tmp_path
+    else:
+        os.makedirs(tmp_path)
+        target = os.path.join(tmp_path, 'data.parquet')
+    execute_statement(connection, f"COPY (SELECT * FROM {table}) TO {_sql_string(target)} ({', '.join(options)})")
+    
+    # Swap the new export in place of the previous one
+    previous_path = f"{final_path}.previous"
+    shutil.rmtree(previous_path, ignore_errors=True)
+    if os.path.exists(final_path):
+        os.replace(final_path, previous_path)
+    os.replace(tmp_path, final_path)
+    shutil.rmtree(previous_path, ignore_errors=True)
+    return final_path
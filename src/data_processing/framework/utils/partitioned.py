@@ -0,0 +1,237 @@
+"""
+Partition-parallel Python transformations for the DQ Transformation Framework
+
+Splits a source table by a partition key (whole key groups per partition) or
+into row ranges and maps the transformation function over the partitions in
+a process pool. Tables cross process boundaries as Arrow IPC streams in
+shared memory blocks, written once and read in place, instead of pickles.
+"""
+
+import os
+import sys
+import inspect
+import importlib
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple, Union
+
+from .arrow_tables import to_arrow
+
+
+# Key of a function result that is a single table rather than a dict of tables
+SINGLE_RESULT = ''
+
+
+def load_entrypoint(entrypoint: str, module_path: Optional[str] = None, reload: bool = True) -> Callable:
+    """Import module:function (or path/to/file.py:function), re-executing the module to pick up edits"""
+    module_name, function_name = entrypoint.rsplit(':', 1)
+    
+    if module_name.endswith('.py'):
+        spec = importlib.util.spec_from_file_location(
+            os.path.splitext(os.path.basename(module_name))[0], module_name
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        if module_path and module_path not in sys.path:
+            sys.path.insert(0, module_path)
+        module = importlib.import_module(module_name)
+        if reload:
+            module = importlib.reload(module)
+    
+    function = getattr(module, function_name, None)
+    if not callable(function):
+        raise AttributeError(f"{module_name} has no function {function_name}")
+    return function
+
+
+def call_entrypoint(function: Callable, sources: Dict[str, Any], context: Dict[str, Any]) -> Any:
+    """Call a transformation function, passing the context if it takes a second parameter"""
+    if len(inspect.signature(function).parameters) > 1:
+        return function(sources, context)
+    return function(sources)
+
+
+def split_by_rows(table, rows: int) -> List[Any]:
+    """Zero-copy slices of at most rows rows"""
+    return [table.slice(start, rows) for start in range(0, max(table.num_rows, 1), rows)]
+
+
+def split_by_key(table, keys: Union[str, List[str]], max_partitions: int) -> List[Any]:
+    """Partitions holding whole groups of the key columns, of roughly equal row counts"""
+    import pyarrow.compute as pc
+    
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    if table.num_rows == 0:
+        return [table]
+    
+    ordered = table.take(pc.sort_indices(table, [(key, 'ascending') for key in keys]))
+    
+    # Rows where any key column differs from the previous row start a new group
+    changed = None
+    for key in keys:
+        values = ordered[key].combine_chunks()
+        current, previous = values.slice(1), values.slice(0, len(values) - 1)
+        differs = pc.fill_null(pc.not_equal(current, previous), True)
+        both_null = pc.and_(pc.is_null(current), pc.is_null(previous))
+        differs = pc.and_(differs, pc.invert(both_null))
+        changed = differs if changed is None else pc.or_(changed, differs)
+    starts = [0] + [index + 1 for index in pc.indices_nonzero(changed).to_pylist()]
+    bounds = list(zip(starts, starts[1:] + [ordered.num_rows]))
+    
+    # Pack consecutive groups into partitions of about num_rows / max_partitions rows
+    target_rows = -(-ordered.num_rows // max(max_partitions, 1))
+    partitions = []
+    partition_start = 0
+    for start, end in bounds:
+        if end - partition_start >= target_rows or end == ordered.num_rows:
+            partitions.append(ordered.slice(partition_start, end - partition_start))
+            partition_start = end
+    return partitions
+
+
+def to_shared_memory(table) -> str:
+    """Write a table as an Arrow IPC stream into a new shared memory block; returns its name"""
+    import pyarrow as pa
+    
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    size = max(sink.size(), 1)
+    
+    block = shared_memory.SharedMemory(create=True, size=size)
+    buffer = pa.py_buffer(block.buf)
+    stream = pa.FixedSizeBufferWriter(buffer)
+    with pa.ipc.new_stream(stream, table.schema) as writer:
+        writer.write_table(table)
+    stream.close()
+    # The writer, stream and buffer all view the block; drop them before unmapping it
+    del writer, stream, buffer
+    block.close()
+    return block.name
+
+
+def from_shared_memory(name: str):
+    """Map a table in a shared memory block; the block must stay open while the table is used"""
+    import pyarrow as pa
+    
+    block = shared_memory.SharedMemory(name=name)
+    table = pa.ipc.open_stream(pa.py_buffer(block.buf)).read_all()
+    return table, block
+
+
+def _close(block):
+    try:
+        block.close()
+    except BufferError:
+        # Tables still reference the mapping; it is unmapped when they are freed
+        pass
+
+
+def _run_partition(entrypoint: str, module_path: Optional[str], inputs: Dict[str, str],
+                   input_format: str, context: Dict[str, Any]) -> Dict[str, str]:
+    """Worker: run the function over one partition; returns shared memory names of its results"""
+    function = load_entrypoint(entrypoint, module_path, reload=False)
+    
+    blocks = []
+    try:
+        sources = {}
+        for table_name, block_name in inputs.items():
+            table, block = from_shared_memory(block_name)
+            blocks.append(block)
+            sources[table_name] = table.to_pandas() if input_format == 'pandas' else table
+        
+        result = call_entrypoint(function, sources, context)
+        if not isinstance(result, dict):
+            result = {SINGLE_RESULT: result}
+        return {name: to_shared_memory(to_arrow(value)) for name, value in result.items()}
+    finally:
+        sources = table = result = None
+        for block in blocks:
+            _close(block)
+
+
+class PartitionedRun:
+    """Map a transformation function over partitions in a process pool
+    
+    Input and result tables live in shared memory blocks owned by this run;
+    close() releases every block still held.
+    """
+    
+    def __init__(self, entrypoint: str, module_path: Optional[str] = None, workers: Optional[int] = None,
+                 start_method: str = 'spawn', input_format: str = 'arrow'):
+        self.entrypoint = entrypoint
+        self.module_path = module_path
+        self.workers = workers or os.cpu_count() or 1
+        self.start_method = start_method
+        self.input_format = input_format
+        self._blocks: Dict[str, Any] = {}
+        self._results: Dict[int, List[str]] = {}
+    
+    def share(self, table) -> str:
+        """Place an input table in shared memory"""
+        name = to_shared_memory(table)
+        self._blocks[name] = None
+        return name
+    
+    def map(self, partitions: List[Dict[str, str]], context: Dict[str, Any]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (partition index, result tables by name) as partitions complete
+        
+        Each partition maps source table names to shared input blocks.
+        """
+        workers = min(self.workers, len(partitions))
+        mp_context = multiprocessing.get_context(self.start_method)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+            futures = {
+                executor.submit(
+                    _run_partition, self.entrypoint, self.module_path, inputs, self.input_format,
+                    {**context, 'partition': {'index': index, 'count': len(partitions)}}
+                ): index
+                for index, inputs in enumerate(partitions)
+            }
+            try:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    names = future.result()
+                    self._results[index] = list(names.values())
+                    # Not bound to a local, so release() can unmap the blocks while suspended here
+                    yield index, self._open_results(names)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    
+    def _open_results(self, names: Dict[str, str]) -> Dict[str, Any]:
+        outputs = {}
+        for result_name, block_name in names.items():
+            outputs[result_name], self._blocks[block_name] = from_shared_memory(block_name)
+        return outputs
+    
+    def release(self, index: int):
+        """Release the result blocks of a partition once its tables are no longer used"""
+        for name in self._results.pop(index, []):
+            self._release(name)
+    
+    def close(self):
+        """Release every input and result block"""
+        for name in list(self._blocks):
+            self._release(name)
+        self._results.clear()
+    
+    def _release(self, name: str):
+        block = self._blocks.pop(name, None)
+        try:
+            if block is None:
+                block = shared_memory.SharedMemory(name=name)
+            _close(block)
+            block.unlink()
+        except FileNotFoundError:
+            pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,212 @@
+"""
+Cached Python environments for the DQ Transformation Framework
+
+Python transformations with a requirements file run in a virtualenv built
+once per (requirements content, base interpreter) hash and reused by every
+later run, instead of pip-installing into the framework's interpreter each
+time. Environments are kept on disk with least-recently-used eviction and
+can be built from a local wheelhouse without network access. Runs hold a
+shared lock on their environment, so eviction skips environments in use.
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+from .fingerprint import hash_payload, hash_file
+from .subprocess_runner import SubprocessRunner
+
+
+# Marker written once an environment is fully built; its mtime records the last use
+COMPLETE_MARKER = '.dq-env-complete'
+
+_build_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False, blocking: bool = True) -> Iterator[bool]:
+    """Exclusive (or shared) lock across processes (no-op where fcntl is unavailable)
+    
+    Yields whether the lock was taken, which is only False for a non-blocking
+    attempt on a lock held elsewhere.
+    """
+    with open(path, 'a') as handle:
+        try:
+            import fcntl
+        except ImportError:
+            yield True
+            return
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(handle, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def env_python(env_dir: str) -> str:
+    """Interpreter of a virtualenv"""
+    if os.name == 'nt':
+        return os.path.join(env_dir, 'Scripts', 'python.exe')
+    return os.path.join(env_dir, 'bin', 'python')
+
+
+class EnvironmentCache:
+    """Virtualenvs keyed by requirements hash, evicted least recently used first"""
+    
+    def __init__(self, cache_dir: str = '~/.cache/dq-framework/venvs', max_envs: int = 8,
+                 wheelhouse: Optional[str] = None, offline: bool = False,
+                 system_site_packages: bool = True):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_envs = max_envs
+        self.wheelhouse = os.path.expanduser(wheelhouse) if wheelhouse else None
+        self.offline = offline
+        self.system_site_packages = system_site_packages
+        self.logger = logging.getLogger(__name__)
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any]) -> 'EnvironmentCache':
+        """Cache from the python.environment config section"""
+        return cls(
+            cache_dir=settings.get('cache_dir', '~/.cache/dq-framework/venvs'),
+            max_envs=int(settings.get('max_envs', 8)),
+            wheelhouse=settings.get('wheelhouse'),
+            offline=settings.get('offline', False),
+            system_site_packages=settings.get('system_site_packages', True)
+        )
+    
+    def key(self, requirements_file: str, base_python: str) -> str:
+        """Environment identity: requirements content, base interpreter and site-packages mode"""
+        return hash_payload({
+            'requirements': hash_file(requirements_file),
+            'python': os.path.realpath(shutil.which(base_python) or base_python),
+            'system_site_packages': self.system_site_packages
+        })[:16]
+    
+    @contextmanager
+    def use(self, requirements_file: str, base_python: str = sys.executable,
+            cancel_event: threading.Event = None) -> Iterator[Optional[str]]:
+        """Interpreter of the environment (None if it cannot be built), kept from eviction in the block"""
+        while True:
+            python_executable = self.ensure(requirements_file, base_python, cancel_event)
+            if python_executable is None:
+                yield None
+                return
+            env_dir = os.path.join(self.cache_dir, self.key(requirements_file, base_python))
+            with file_lock(f"{env_dir}.lock", shared=True):
+                # Evicted between ensure() and the lock: build it again
+                if os.path.exists(os.path.join(env_dir, COMPLETE_MARKER)):
+                    yield python_executable
+                    return
+    
+    def ensure(self, requirements_file: str, base_python: str = sys.executable,
+               cancel_event: threading.Event = None) -> Optional[str]:
+        """Interpreter of the environment for a requirements file, building it on first use
+        
+        Setting cancel_event stops a build in progress (the environment is then removed).
+        """
+        env_dir = os.path.join(self.cache_dir, self.key(requirements_file, base_python))
+        marker = os.path.join(env_dir, COMPLETE_MARKER)
+        
+        if os.path.exists(marker):
+            self.logger.info(f"Reusing cached Python environment: {env_dir}")
+            os.utime(marker)
+            # Environments skipped while in use are removed by a later run
+            self._evict(keep=env_dir)
+            return env_python(env_dir)
+        
+        # One builder per environment, across threads and processes
+        with _build_lock, file_lock(f"{env_dir}.lock"):
+            if not os.path.exists(marker):
+                if not self._build(env_dir, requirements_file, base_python, cancel_event):
+                    shutil.rmtree(env_dir, ignore_errors=True)
+                    return None
+                with open(marker, 'w') as f:
+                    f.write(os.path.abspath(requirements_file))
+            else:
+                os.utime(marker)
+        
+        self._evict(keep=env_dir)
+        return env_python(env_dir)
+    
+    def _build(self, env_dir: str, requirements_file: str, base_python: str,
+               cancel_event: threading.Event = None) -> bool:
+        """Create the virtualenv and install the requirements into it"""
+        self.logger.info(f"Building Python environment for {requirements_file}: {env_dir}")
+        started = time.monotonic()
+        shutil.rmtree(env_dir, ignore_errors=True)
+        
+        venv_cmd = [base_python, '-m', 'venv', env_dir]
+        if self.system_site_packages:
+            venv_cmd.insert(3, '--system-site-packages')
+        if not self._run('venv', venv_cmd, cancel_event):
+            return False
+        
+        pip_cmd = [env_python(env_dir), '-m', 'pip', 'install', '--disable-pip-version-check',
+                   '-r', requirements_file]
+        installed = False
+        if self.wheelhouse:
+            # Local wheels first; the index is only used if some are missing
+            installed = self._run('pip', pip_cmd + ['--no-index', '--find-links', self.wheelhouse],
+                                  cancel_event)
+            if not installed and not self.offline:
+                self.logger.info("Wheelhouse incomplete, installing from the package index")
+        if not installed:
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            if self.offline:
+                self.logger.error("Offline mode requires every requirement in the wheelhouse")
+                return False
+            installed = self._run('pip', pip_cmd, cancel_event)
+        if not installed:
+            return False
+        
+        self.logger.info(f"Python environment built in {time.monotonic() - started:.1f}s")
+        return True
+    
+    def _run(self, name: str, cmd: List[str], cancel_event: threading.Event = None) -> bool:
+        runner = SubprocessRunner(name, self.logger, stderr_level=logging.INFO, cancel_event=cancel_event)
+        result = runner.run(cmd)
+        if not result.success:
+            self.logger.error(f"{name} failed: {' | '.join(result.stderr_tail[-5:])}")
+        return result.success
+    
+    def environments(self) -> List[Dict[str, Any]]:
+        """Built environments, most recently used first"""
+        envs = []
+        for entry in os.listdir(self.cache_dir):
+            marker = os.path.join(self.cache_dir, entry, COMPLETE_MARKER)
+            if os.path.exists(marker):
+                envs.append({'path': os.path.join(self.cache_dir, entry), 'last_used': os.path.getmtime(marker)})
+        return sorted(envs, key=lambda env: env['last_used'], reverse=True)
+    
+    def _evict(self, keep: str):
+        """Remove the least recently used environments beyond max_envs that no run is using"""
+        for env in self.environments()[self.max_envs:]:
+            if env['path'] == keep:
+                continue
+            marker = os.path.join(env['path'], COMPLETE_MARKER)
+            with file_lock(f"{env['path']}.lock", blocking=False) as locked:
+                if not locked:
+                    self.logger.info(f"Not evicting cached Python environment in use: {env['path']}")
+                    continue
+                if not os.path.exists(marker):
+                    # Evicted by another process meanwhile
+                    continue
+                self.logger.info(f"Evicting cached Python environment: {env['path']}")
+                # Marker first, so a half-removed environment is never reused
+                os.remove(marker)
+                shutil.rmtree(env['path'], ignore_errors=True)
@@ -0,0 +1,253 @@
+"""
+Query profiling utilities for the DQ Transformation Framework
+
+Captures the plan, duration and rows affected of each SQL statement of a run
+and compares them with a per-statement baseline built from earlier runs, so
+that statements whose runtime or plan shape regressed are flagged.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from statistics import median
+from typing import Dict, Any, List, Optional
+
+from .connections import execute_statement
+from .fingerprint import hash_payload
+from .sql_parser import SqlStatement, tokenize, WORD, STRING, WHITESPACE, COMMENT
+from .structured_logging import current_log_context
+
+
+# Destinations whose EXPLAIN output can be captured as JSON
+PROFILED_TYPES = ('duckdb', 'postgres')
+
+# Statements that can be explained (plus CREATE TABLE ... AS)
+_EXPLAINABLE = {'select', 'with', 'insert', 'update', 'delete', 'merge'}
+
+# Statements reporting the number of rows they changed
+_COUNTED = {'insert', 'update', 'delete', 'merge', 'create'}
+
+
+def _words(sql: str) -> List[str]:
+    return [text.lower() for kind, text in tokenize(sql) if kind == WORD]
+
+
+def explainable(sql: str) -> bool:
+    """Whether EXPLAIN accepts the statement"""
+    words = _words(sql)
+    if not words:
+        return False
+    if words[0] == 'create':
+        return 'table' in words[1:5] and 'as' in words
+    return words[0] in _EXPLAINABLE
+
+
+def normalized_sql(sql: str) -> str:
+    """Statement text without comments, whitespace and literal values"""
+    parts = []
+    for kind, text in tokenize(sql):
+        if kind in (WHITESPACE, COMMENT):
+            continue
+        if kind == STRING or (kind == WORD and text[0].isdigit()):
+            parts.append('?')
+        else:
+            parts.append(text.lower() if kind == WORD else text)
+    return ' '.join(parts)
+
+
+def plan_shape(plan: Any) -> Optional[str]:
+    """Operator tree of a JSON plan (DuckDB or PostgreSQL), e.g. HASH_GROUP_BY(HASH_JOIN(SEQ_SCAN,SEQ_SCAN))"""
+    if isinstance(plan, list):
+        shapes = [shape for shape in (plan_shape(node) for node in plan) if shape]
+        return ','.join(shapes) or None
+    if not isinstance(plan, dict):
+        return None
+    if 'Plan' in plan:
+        # PostgreSQL wraps the root node
+        return plan_shape(plan['Plan'])
+    
+    name = plan.get('Node Type') or plan.get('operator_name') or plan.get('name')
+    inner = plan_shape(plan.get('Plans') or plan.get('children') or [])
+    if name in (None, 'EXPLAIN_ANALYZE'):
+        return inner
+    return f"{name}({inner})" if inner else name
+
+
+def _explain(connection, query: str) -> Any:
+    """Run an EXPLAIN ... (FORMAT JSON) query and return the parsed plan"""
+    if hasattr(connection, 'execute'):
+        # DuckDB: rows of (plan type, JSON text)
+        rows = connection.execute(query).fetchall()
+        plan = rows[-1][-1] if rows else None
+    else:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query)
+            row = cursor.fetchone()
+            plan = row[0] if row else None
+        finally:
+            cursor.close()
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+def _execute_counted(connection, sql: str) -> Optional[int]:
+    """Run a statement and return the rows it changed, if reported"""
+    counted = (_words(sql) or [''])[0] in _COUNTED
+    if hasattr(connection, 'execute'):
+        # DuckDB returns the count as the statement's result
+        result = connection.execute(sql)
+        row = result.fetchone() if counted else None
+        return row[0] if row and isinstance(row[0], int) else None
+    
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql)
+        return cursor.rowcount if counted and cursor.rowcount >= 0 else None
+    finally:
+        cursor.close()
+
+
+class QueryProfiler:
+    """Profile the statements of a run and compare them with their baseline
+    
+    The baseline (state/query_baseline.json) keeps the last durations and the
+    plan shape of each statement, keyed by script and position. It is reset
+    when the statement's normalized text changes.
+    """
+    
+    def __init__(self, output_dir: str, settings: Dict[str, Any], dest_type: Optional[str]):
+        self.logger = logging.getLogger(__name__)
+        self.output_dir = output_dir
+        self.dest_type = dest_type
+        self.analyze = settings.get('explain', 'plan') == 'analyze'
+        self.capture_plans = settings.get('explain', 'plan') in ('plan', 'analyze')
+        self.runtime_threshold = float(settings.get('runtime_threshold', 2.0))
+        self.min_seconds = float(settings.get('min_seconds', 1.0))
+        self.history = int(settings.get('history', 10))
+        self.baseline_path = os.path.join(output_dir, 'state', 'query_baseline.json')
+        self.profiles: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        
+        if self.capture_plans and dest_type not in PROFILED_TYPES:
+            self.logger.info(f"Query plans are not captured for {dest_type} destinations, timing statements only")
+            self.capture_plans = self.analyze = False
+    
+    def execute(self, connection, statement: SqlStatement):
+        """Run a statement, recording its plan, duration and rows affected"""
+        sql = statement.sql
+        plan = None
+        rows = None
+        explain = self.capture_plans and explainable(sql)
+        
+        if explain and not self.analyze:
+            plan = _explain(connection, f"EXPLAIN (FORMAT JSON) {sql}")
+        
+        started = time.perf_counter()
+        if explain and self.analyze:
+            # EXPLAIN ANALYZE runs the statement itself
+            plan = _explain(connection, f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+        elif self.dest_type in PROFILED_TYPES:
+            rows = _execute_counted(connection, sql)
+        else:
+            execute_statement(connection, sql)
+        duration = time.perf_counter() - started
+        
+        profile = {
+            'key': f"{os.path.basename(statement.source)}#{statement.index + 1}",
+            'sql': sql[:2000],
+            'sql_hash': hash_payload(normalized_sql(sql)),
+            'duration_seconds': round(duration, 6),
+            'rows_affected': rows,
+            'plan_shape': plan_shape(plan),
+            'plan': plan
+        }
+        with self._lock:
+            self.profiles.append(profile)
+    
+    def save(self) -> List[Dict[str, Any]]:
+        """Store this run's profiles, flag regressions and update the baseline"""
+        baseline = self._load_baseline()
+        regressions = []
+        
+        for profile in self.profiles:
+            key = profile['key']
+            entry = baseline.get(key)
+            if entry and entry.get('sql_hash') == profile['sql_hash']:
+                regressions.extend(self._compare(profile, entry))
+            else:
+                # New or edited statement: start a new baseline
+                entry = {'sql_hash': profile['sql_hash'], 'durations': []}
+            
+            entry['durations'] = (entry['durations'] + [profile['duration_seconds']])[-self.history:]
+            if profile['plan_shape']:
+                entry['plan_shape'] = profile['plan_shape']
+            baseline[key] = entry
+        
+        for regression in regressions:
+            self.logger.warning(f"Query regression in {regression['key']}: {regression['detail']}")
+        
+        run_id = current_log_context().get('run_id') or datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        profile_path = os.path.join(self.output_dir, 'query_profiles', f"profile_{run_id}.json")
+        try:
+            os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+            with open(profile_path, 'w') as f:
+                json.dump({
+                    'run_id': run_id,
+                    'captured_at': datetime.now().isoformat(),
+                    'destination_type': self.dest_type,
+                    'statements': self.profiles,
+                    'regressions': regressions
+                }, f, indent=2, default=str)
+            self._save_baseline(baseline)
+            self.logger.info(f"Query profile saved: {profile_path}")
+        except Exception as e:
+            self.logger.warning(f"Could not save query profile: {str(e)}")
+        
+        return regressions
+    
+    def _compare(self, profile: Dict[str, Any], entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Regressions of a statement against its baseline"""
+        regressions = []
+        durations = entry.get('durations') or []
+        duration = profile['duration_seconds']
+        if durations:
+            typical = median(durations)
+            if duration >= typical * self.runtime_threshold and duration - typical >= self.min_seconds:
+                regressions.append({
+                    'key': profile['key'],
+                    'type': 'runtime',
+                    'duration_seconds': duration,
+                    'baseline_seconds': round(typical, 6),
+                    'detail': f"{duration:.2f}s against a baseline of {typical:.2f}s"
+                })
+        
+        previous_shape = entry.get('plan_shape')
+        if previous_shape and profile['plan_shape'] and profile['plan_shape'] != previous_shape:
+            regressions.append({
+                'key': profile['key'],
+                'type': 'plan',
+                'plan_shape': profile['plan_shape'],
+                'baseline_plan_shape': previous_shape,
+                'detail': f"plan changed from {previous_shape} to {profile['plan_shape']}"
+            })
+        return regressions
+    
+    def _load_baseline(self) -> Dict[str, Any]:
+        if not os.path.exists(self.baseline_path):
+            return {}
+        try:
+            with open(self.baseline_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable query baseline {self.baseline_path}: {str(e)}")
+            return {}
+    
+    def _save_baseline(self, baseline: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.baseline_path), exist_ok=True)
+        tmp_path = f"{self.baseline_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        os.replace(tmp_path, self.baseline_path)
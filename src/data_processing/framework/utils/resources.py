@@ -0,0 +1,204 @@
+"""
+Resource accounting utilities for the DQ Transformation Framework
+
+Measures CPU time, peak memory and block I/O of transformation phases and of
+the engine subprocesses they launch, and wraps those subprocesses in
+prlimit(1) to enforce per-transformation memory and CPU limits on them.
+
+Subprocess figures come from getrusage(RUSAGE_CHILDREN), which only covers
+children that have exited and been waited for. The counters are per process,
+so phases running concurrently in one process (speculative execution, DAG
+runs) see each other's usage.
+"""
+
+import sys
+import time
+import shlex
+import signal
+import shutil
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Union
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+# ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+# ru_inblock / ru_oublock count 512-byte blocks
+_BLOCK_SIZE = 512
+
+logger = logging.getLogger(__name__)
+
+
+def _rusage(who) -> Dict[str, float]:
+    """CPU, peak RSS and block I/O counters for RUSAGE_SELF or RUSAGE_CHILDREN"""
+    if resource is None:
+        return {}
+    usage = resource.getrusage(who)
+    return {
+        'user': usage.ru_utime,
+        'system': usage.ru_stime,
+        'maxrss_bytes': usage.ru_maxrss * _MAXRSS_UNIT,
+        'read_bytes': usage.ru_inblock * _BLOCK_SIZE,
+        'write_bytes': usage.ru_oublock * _BLOCK_SIZE
+    }
+
+
+def _process_io() -> Optional[Dict[str, int]]:
+    """Bytes read/written by this process, if psutil is installed"""
+    try:
+        import psutil
+        counters = psutil.Process().io_counters()
+        return {'read_bytes': counters.read_bytes, 'write_bytes': counters.write_bytes}
+    except (ImportError, AttributeError, OSError):
+        # psutil missing, or I/O counters unsupported on this platform
+        return None
+
+
+def snapshot() -> Dict[str, Any]:
+    """Current resource counters of this process and its waited-for children"""
+    return {
+        'wall': time.perf_counter(),
+        'self': _rusage(resource.RUSAGE_SELF) if resource else {},
+        'children': _rusage(resource.RUSAGE_CHILDREN) if resource else {},
+        'io': _process_io()
+    }
+
+
+def usage_between(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Resource usage between two snapshots"""
+    def delta(scope: str, key: str) -> float:
+        return after[scope].get(key, 0) - before[scope].get(key, 0)
+    
+    usage = {'wall_seconds': round(after['wall'] - before['wall'], 3)}
+    if not after['self']:
+        return usage
+    
+    usage.update({
+        'cpu_user_seconds': round(delta('self', 'user') + delta('children', 'user'), 3),
+        'cpu_system_seconds': round(delta('self', 'system') + delta('children', 'system'), 3),
+        'children_cpu_seconds': round(delta('children', 'user') + delta('children', 'system'), 3),
+        # High-water marks: process lifetime peak and largest child waited for so far
+        'peak_rss_mb': round(after['self']['maxrss_bytes'] / 2**20, 1),
+        'children_peak_rss_mb': round(after['children']['maxrss_bytes'] / 2**20, 1),
+        'children_read_bytes': int(delta('children', 'read_bytes')),
+        'children_write_bytes': int(delta('children', 'write_bytes'))
+    })
+    
+    if before['io'] and after['io']:
+        usage['read_bytes'] = after['io']['read_bytes'] - before['io']['read_bytes']
+        usage['write_bytes'] = after['io']['write_bytes'] - before['io']['write_bytes']
+    else:
+        usage['read_bytes'] = int(delta('self', 'read_bytes'))
+        usage['write_bytes'] = int(delta('self', 'write_bytes'))
+    
+    return usage
+
+
+class ResourceTracker:
+    """Resource usage of the phases of one transformation run"""
+    
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.usage: Dict[str, Dict[str, Any]] = {}
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+    
+    @contextmanager
+    def measure(self, phase: str):
+        """Record the resource usage of the enclosed code under a phase name"""
+        if self.trace_memory:
+            self._start_tracemalloc()
+        
+        before = snapshot()
+        try:
+            yield
+        finally:
+            usage = usage_between(before, snapshot())
+            if self.trace_memory and tracemalloc.is_tracing():
+                # Python allocations only; the peak is shared by overlapping phases
+                usage['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            with self._lock:
+                self.usage[phase] = usage
+    
+    def _start_tracemalloc(self):
+        """Start tracemalloc or reset its peak for the next phase"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        elif hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+    
+    def close(self):
+        """Stop tracemalloc if this tracker started it"""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+
+def limit_command(cmd: Union[str, List[str]], limits: Dict[str, Any],
+                  shell: bool = False) -> Union[str, List[str]]:
+    """Wrap an engine command in prlimit so memory and CPU limits apply to it
+    
+    memory_mb caps the data segment (RLIMIT_DATA: heap and private writable
+    mappings) rather than the address space, which JVMs, Arrow and DuckDB
+    reserve far beyond what they use; cpu_seconds caps the CPU time
+    (RLIMIT_CPU). Both are inherited by everything the command starts.
+    prlimit sets them in the child itself, so nothing runs between fork and
+    exec of the (multi-threaded) framework process.
+    """
+    if not limits or resource is None:
+        return cmd
+    
+    memory_mb = limits.get('memory_mb')
+    cpu_seconds = limits.get('cpu_seconds')
+    if not memory_mb and not cpu_seconds:
+        return cmd
+    
+    prlimit = shutil.which('prlimit')
+    if prlimit is None:
+        logger.warning("prlimit not found (util-linux); resource limits are not enforced")
+        return cmd
+    
+    def lowered(kind: int, soft: int, hard: int) -> str:
+        # Unprivileged processes can only lower limits; never ask above the inherited hard limit
+        _, current_hard = resource.getrlimit(kind)
+        if current_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, current_hard), min(hard, current_hard)
+        return f"{soft}:{hard}"
+    
+    wrapper = [prlimit]
+    if memory_mb:
+        memory_bytes = int(memory_mb * 2**20)
+        wrapper.append(f"--data={lowered(resource.RLIMIT_DATA, memory_bytes, memory_bytes)}")
+    if cpu_seconds:
+        # Soft limit sends SIGXCPU; the hard limit one second later kills
+        cpu = int(cpu_seconds)
+        wrapper.append(f"--cpu={lowered(resource.RLIMIT_CPU, cpu, cpu + 1)}")
+    wrapper.append('--')
+    
+    if shell:
+        return ' '.join(shlex.quote(part) for part in wrapper + ['/bin/sh', '-c', cmd])
+    return wrapper + list(cmd)
+
+
+def limit_violation(returncode: int, limits: Dict[str, Any]) -> Optional[str]:
+    """Describe a subprocess exit that was most likely caused by a resource limit"""
+    if not limits or returncode is None:
+        return None
+    
+    # shell=True reports a killed child as 128 + signal number
+    signum = -returncode if returncode < 0 else returncode - 128 if returncode > 128 else None
+    if signum in (signal.SIGXCPU, signal.SIGKILL) and limits.get('cpu_seconds'):
+        return f"CPU limit of {limits['cpu_seconds']}s exceeded"
+    if signum in (signal.SIGSEGV, signal.SIGABRT, signal.SIGKILL) and limits.get('memory_mb'):
+        return f"possibly exceeded memory limit of {limits['memory_mb']} MB"
+    return None
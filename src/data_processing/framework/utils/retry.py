@@ -0,0 +1,118 @@
+"""
+Retry utilities for the DQ Transformation Framework
+
+Classifies errors as transient (connection drops, timeouts, throttling, lock
+conflicts) or permanent, and computes exponential backoff delays for retrying
+runs that failed transiently. Engine output is classified by its last error
+line only, since earlier lines are ordinary log output.
+"""
+
+import re
+import random
+import socket
+from typing import Dict, Any, List, Optional, Union
+
+
+# Driver exception class names that indicate a transient condition
+TRANSIENT_ERROR_TYPES = (
+    'OperationalError',        # psycopg2, snowflake-connector
+    'InterfaceError',          # psycopg2 connection closed
+    'ServiceUnavailable',      # google.api_core
+    'TooManyRequests',
+    'InternalServerError',
+    'BadGateway',
+    'GatewayTimeout',
+    'DeadlineExceeded',
+    'RetryError',
+    'ConnectionException',     # duckdb
+)
+
+# Message fragments of transient failures, matched case-insensitively
+TRANSIENT_MESSAGE_PATTERNS = (
+    r'connection (?:reset|refused|closed|timed out|aborted|lost)',
+    r'could not connect',
+    r'server closed the connection',
+    r'broken pipe',
+    r'\btimed out\b',
+    r'temporarily unavailable',
+    r'service unavailable',
+    r'too many (?:connections|requests)',
+    r'rate limit',
+    r'deadlock detected',
+    r'could not serialize access',
+    r'serialization failure',
+    r'lock (?:wait )?timeout',
+    r'could not set lock',
+    r'HTTP(?:/\S+)? (?:429|502|503|504)\b',
+)
+
+# Output lines reporting the error that ended a run
+_ERROR_LINE = re.compile(r'error|exception|fatal|failed|traceback', re.IGNORECASE)
+
+_TRANSIENT_MESSAGE = re.compile('|'.join(TRANSIENT_MESSAGE_PATTERNS), re.IGNORECASE)
+
+
+def is_transient(error: Union[BaseException, str, None]) -> bool:
+    """Whether an error (or error output) is likely to succeed on retry"""
+    if error is None:
+        return False
+    
+    if isinstance(error, BaseException):
+        if isinstance(error, (ConnectionError, TimeoutError, socket.timeout)):
+            return True
+        if any(cls.__name__ in TRANSIENT_ERROR_TYPES for cls in type(error).__mro__):
+            return True
+        # Check the chained cause as well (e.g. a wrapper exception around a driver error)
+        cause = error.__cause__ or error.__context__
+        if cause is not None and cause is not error and is_transient(cause):
+            return True
+        error = str(error)
+    
+    return bool(_TRANSIENT_MESSAGE.search(error))
+
+
+def last_error_line(lines: List[str]) -> Optional[str]:
+    """Last output line that reports an error, or the last line if none does"""
+    lines = [line for line in lines if line.strip()]
+    for line in reversed(lines):
+        if _ERROR_LINE.search(line):
+            return line
+    return lines[-1] if lines else None
+
+
+class RetryPolicy:
+    """Exponential backoff for transiently failed runs"""
+    
+    def __init__(self, max_attempts: int = 1, initial_delay: float = 5.0, backoff: float = 2.0,
+                 max_delay: float = 300.0, jitter: float = 0.1):
+        self.max_attempts = max(1, max_attempts)
+        self.initial_delay = initial_delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+    
+    @classmethod
+    def from_config(cls, retry_config: Dict[str, Any] = None, idempotent: bool = True) -> 'RetryPolicy':
+        """Policy from an execution.retry config section
+        
+        Runs of engines that may not be safe to repeat (idempotent=False) are
+        only retried when max_attempts is set explicitly.
+        """
+        retry_config = retry_config or {}
+        return cls(
+            max_attempts=retry_config.get('max_attempts', 3 if idempotent else 1),
+            initial_delay=retry_config.get('initial_delay_seconds', 5.0),
+            backoff=retry_config.get('backoff', 2.0),
+            max_delay=retry_config.get('max_delay_seconds', 300.0),
+            jitter=retry_config.get('jitter', 0.1)
+        )
+    
+    def should_retry(self, attempt: int, transient: bool) -> bool:
+        """Whether to retry after a failed attempt (1-based)"""
+        return transient and attempt < self.max_attempts
+    
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after a failed attempt (1-based)"""
+        delay = min(self.max_delay, self.initial_delay * self.backoff ** (attempt - 1))
+        # Spread retries of concurrent runs hitting the same outage
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
@@ -0,0 +1,285 @@
+"""
+Run state utilities for the DQ Transformation Framework
+
+Computes the input fingerprint of a transformation (source table states,
+script/model hashes, engine config and contract) and remembers the one of
+the last successful run, so unchanged transformations can be skipped. Phase
+checkpoints tied to the same fingerprint let a retried run resume after the
+phases that already completed. Watermarks of incremental transformations are
+staged by the engine and only committed once the run's post-checks passed.
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from .fingerprint import TableFingerprinter, hash_payload, hash_file, hash_directory, is_reliable
+
+
+# Engine config keys that point at code or dependency files
+CODE_PATH_KEYS = ('script_path', 'requirements_file', 'project_dir', 'scripts_dir',
+                  'execution_order', 'py_files')
+
+# Directories inside dbt projects that hold build output, not code
+IGNORED_DIRS = ('target', 'logs', 'dbt_packages', '__pycache__', '.git')
+
+
+def hash_code_path(path: str) -> Optional[str]:
+    """Hash a script file or code directory, ignoring build output"""
+    if os.path.isfile(path):
+        return hash_file(path)
+    if not os.path.isdir(path):
+        return None
+    
+    hashes = {}
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            hashes[os.path.relpath(file_path, path)] = hash_file(file_path)
+    return hash_payload(hashes)
+
+
+def collect_code_paths(engine_config: Dict[str, Any]) -> List[str]:
+    """Code and dependency paths referenced by an engine config"""
+    paths = []
+    for engine_settings in engine_config.values():
+        if not isinstance(engine_settings, dict):
+            continue
+        for key in CODE_PATH_KEYS:
+            value = engine_settings.get(key)
+            if isinstance(value, str):
+                paths.append(value)
+            elif isinstance(value, list):
+                paths.extend(item for item in value if isinstance(item, str))
+    return sorted(set(paths))
+
+
+class InputFingerprint:
+    """Fingerprint of everything a transformation run depends on"""
+    
+    def __init__(self, config, fingerprinter: TableFingerprinter = None):
+        self.config = config
+        self.fingerprinter = fingerprinter or TableFingerprinter(config.contract_path, config.cursor_columns)
+        self.logger = logging.getLogger(__name__)
+    
+    def components(self) -> Optional[Dict[str, Any]]:
+        """Fingerprint components, or None if a source table cannot be fingerprinted reliably"""
+        source_components = {table: self.fingerprinter.components(table) for table in self.config.source_tables}
+        missing = [table for table, components in source_components.items() if components is None]
+        if missing:
+            self.logger.info(f"Input fingerprint unavailable for source tables: {missing}")
+            return None
+        
+        # Row counts alone miss in-place updates: without a version, cursor or content hash, always run
+        unreliable = [table for table, components in source_components.items() if not is_reliable(components)]
+        if unreliable:
+            self.logger.info(
+                f"No version, cursor or content hash for source tables {unreliable}; "
+                "their changes cannot be detected, so the run is not skipped"
+            )
+            return None
+        sources = {table: hash_payload(components) for table, components in source_components.items()}
+        
+        code = {
+            path: hash_code_path(path)
+            for path in collect_code_paths(self.config.transformation_config)
+        }
+        
+        return {
+            'transformation': self.config.name,
+            'engine_type': self.config.type,
+            'sources': sources,
+            'targets': sorted(self.config.target_tables),
+            'code': code,
+            'engine_config': hash_payload(self.config.transformation_config),
+            'contract': hash_file(self.config.contract_path),
+            'dq_checks': {
+                'pre': list(self.config.pre_dq_checks),
+                'post': list(self.config.post_dq_checks),
+                'suites': hash_directory(self.config.gx_suites_path) if self.config.gx_suites_path else None
+            }
+        }
+    
+    def compute(self) -> Optional[str]:
+        """Fingerprint hash, or None if it cannot be determined"""
+        components = self.components()
+        if components is None:
+            return None
+        return hash_payload(components)
+
+
+class RunStateStore:
+    """Persist the input fingerprint of the last successful run"""
+    
+    def __init__(self, output_dir: str):
+        self.state_dir = os.path.join(output_dir, 'state')
+        self.state_path = os.path.join(self.state_dir, 'last_success.json')
+        self.logger = logging.getLogger(__name__)
+        
+        os.makedirs(self.state_dir, exist_ok=True)
+    
+    def last_fingerprint(self) -> Optional[str]:
+        """Input fingerprint of the last successful run"""
+        state = self.load()
+        return state.get('fingerprint') if state else None
+    
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Last successful run state"""
+        if not os.path.exists(self.state_path):
+            return None
+        
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable run state {self.state_path}: {str(e)}")
+            return None
+    
+    def save(self, fingerprint: str, components: Dict[str, Any] = None,
+             target_state: Dict[str, Optional[str]] = None):
+        """Record a successful run"""
+        state = {
+            'fingerprint': fingerprint,
+            'completed_at': datetime.now().isoformat(),
+            'components': components or {},
+            'target_state': target_state or {}
+        }
+        
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(tmp_path, self.state_path)
+
+
+class PhaseCheckpoint:
+    """Completed phases of a failed run, so a retry can resume after them
+    
+    Markers are only valid for the input fingerprint they were written with,
+    and each records the fingerprints of the tables the phase produced so
+    that a retry can check they were not changed or dropped in between.
+    """
+    
+    def __init__(self, output_dir: str):
+        self.checkpoint_path = os.path.join(output_dir, 'state', 'checkpoint.json')
+        self.logger = logging.getLogger(__name__)
+        self.fingerprint: Optional[str] = None
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        
+        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+    
+    def load(self, fingerprint: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        """Completed phases recorded for this input fingerprint"""
+        self.fingerprint = fingerprint
+        self.phases = {}
+        if not fingerprint or not os.path.exists(self.checkpoint_path):
+            return self.phases
+        
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable checkpoint {self.checkpoint_path}: {str(e)}")
+            return self.phases
+        
+        if checkpoint.get('fingerprint') == fingerprint:
+            self.phases = checkpoint.get('phases', {})
+        else:
+            self.logger.info("Inputs changed since the checkpoint was written, starting from scratch")
+            self.clear()
+        return self.phases
+    
+    def is_complete(self, phase: str) -> bool:
+        """Whether a phase completed in an earlier attempt"""
+        return phase in self.phases
+    
+    def tables(self, phase: str) -> Dict[str, Optional[str]]:
+        """Table fingerprints recorded when a phase completed"""
+        return self.phases.get(phase, {}).get('tables', {})
+    
+    def mark(self, phase: str, tables: Dict[str, Optional[str]] = None):
+        """Record a completed phase"""
+        if not self.fingerprint:
+            return
+        
+        self.phases[phase] = {
+            'completed_at': datetime.now().isoformat(),
+            'tables': tables or {}
+        }
+        
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'phases': self.phases}, f, indent=2, default=str)
+        os.replace(tmp_path, self.checkpoint_path)
+    
+    def clear(self):
+        """Forget all completed phases"""
+        self.phases = {}
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+
+class WatermarkStore:
+    """Watermark of an incremental transformation: committed and pending values
+    
+    The engine stages the end of the window it processed as pending; the
+    wrapper commits it after post-checks (and publishing) succeed. A failed
+    run leaves the committed watermark in place, so the next run processes
+    the same window again.
+    """
+    
+    def __init__(self, output_dir: str):
+        self.watermark_path = os.path.join(output_dir, 'state', 'watermark.json')
+        self.logger = logging.getLogger(__name__)
+        
+        os.makedirs(os.path.dirname(self.watermark_path), exist_ok=True)
+    
+    def load(self) -> Dict[str, Any]:
+        """Watermark state: {'committed': {...}, 'pending': {...}}"""
+        if not os.path.exists(self.watermark_path):
+            return {}
+        
+        try:
+            with open(self.watermark_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable watermark {self.watermark_path}: {str(e)}")
+            return {}
+    
+    def committed(self) -> Optional[Any]:
+        """Watermark of the last run whose output passed its checks"""
+        return (self.load().get('committed') or {}).get('value')
+    
+    def pending(self) -> Optional[Dict[str, Any]]:
+        """Watermark staged by a run that has not passed its checks yet"""
+        return self.load().get('pending')
+    
+    def stage(self, value: Any, window: Dict[str, Any] = None):
+        """Record the watermark reached by the engine, to be committed later"""
+        state = self.load()
+        state['pending'] = {
+            'value': value,
+            'window': window or {},
+            'staged_at': datetime.now().isoformat()
+        }
+        self._save(state)
+    
+    def commit(self) -> bool:
+        """Advance the committed watermark to the pending one; False if none is pending"""
+        state = self.load()
+        pending = state.pop('pending', None)
+        if not pending:
+            return False
+        
+        state['committed'] = {**pending, 'committed_at': datetime.now().isoformat()}
+        self._save(state)
+        self.logger.info(f"Watermark advanced to {pending['value']}")
+        return True
+    
+    def _save(self, state: Dict[str, Any]):
+        tmp_path = f"{self.watermark_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(tmp_path, self.watermark_path)
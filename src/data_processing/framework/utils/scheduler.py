@@ -0,0 +1,244 @@
+"""
+Admission scheduling utilities for the DQ Transformation Framework
+
+Admits concurrent transformation runs against a CPU, memory and concurrency
+budget of the host. Each run is charged an estimated cost: declared in its
+config, derived from the engine settings (Spark driver memory and cores), or
+learned from the resource usage of its previous run. Runs that do not fit
+wait in a priority queue.
+"""
+
+import os
+import re
+import heapq
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+
+import yaml
+
+
+@dataclass
+class ResourceCost:
+    """CPU and memory a run is expected to hold while it executes"""
+    cpus: float
+    memory_mb: float
+    source: str = 'default'  # declared | engine_config | learned | default
+
+
+def parse_memory_mb(value: Any) -> Optional[float]:
+    """Memory size such as '8g', '512m' or 1024 (MiB) in MiB"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    
+    match = re.fullmatch(r'\s*([\d.]+)\s*([kmgt]?)i?b?\s*', str(value).lower())
+    if not match:
+        return None
+    number, unit = float(match.group(1)), match.group(2) or 'm'
+    return number * {'k': 1 / 1024, 'm': 1, 'g': 1024, 't': 1024 * 1024}[unit]
+
+
+def host_memory_mb() -> Optional[float]:
+    """Physical memory of the host in MiB, if it can be determined"""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 2**20
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class CostEstimator:
+    """Estimate the resource cost of a transformation run"""
+    
+    # Fallback costs per engine type (cpus, memory MiB)
+    DEFAULT_COSTS = {
+        'sql': (1, 512),
+        'dbt': (1, 1024),
+        'python': (1, 1024),
+        'spark': (2, 2048)
+    }
+    
+    # Headroom added to costs learned from previous runs
+    LEARNED_HEADROOM = 1.2
+    
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+    
+    def estimate(self, config) -> ResourceCost:
+        """Cost of a run: declared, else engine config, else learned, else default"""
+        declared = (config.resources or {}).get('cost') or {}
+        if declared:
+            default = self._default(config.type)
+            return ResourceCost(
+                cpus=float(declared.get('cpus', default.cpus)),
+                memory_mb=parse_memory_mb(declared.get('memory_mb', declared.get('memory'))) or default.memory_mb,
+                source='declared'
+            )
+        
+        spark_config = config.transformation_config.get('spark', {})
+        # Spark Connect clients run on a shared server whose driver is not charged per run
+        if config.type == 'spark' and spark_config.get('mode', 'submit') != 'connect':
+            spark_cost = self._spark_cost(spark_config)
+            if spark_cost:
+                return spark_cost
+        
+        learned = self._learned(config.output_dir)
+        if learned:
+            return learned
+        
+        return self._default(config.type)
+    
+    def _default(self, engine_type: str) -> ResourceCost:
+        cpus, memory_mb = self.DEFAULT_COSTS.get(engine_type, (1, 1024))
+        return ResourceCost(cpus=cpus, memory_mb=memory_mb)
+    
+    def _spark_cost(self, spark_config: Dict[str, Any]) -> Optional[ResourceCost]:
+        """Host resources held by spark-submit: the driver JVM and, in local mode, its task threads
+        
+        Executor memory is only charged for local-cluster masters; on YARN,
+        Kubernetes or standalone clusters executors do not run on this host.
+        """
+        conf = spark_config.get('conf', {})
+        master = str(spark_config.get('master') or conf.get('spark.master') or 'local[*]')
+        
+        driver_mb = parse_memory_mb(spark_config.get('driver_memory') or conf.get('spark.driver.memory'))
+        if driver_mb is None:
+            return None
+        
+        # JVM overhead on top of the heap, as Spark sizes it for containers
+        memory_mb = driver_mb + max(384, 0.1 * driver_mb)
+        cpus = float(conf.get('spark.driver.cores', 1))
+        
+        local = re.fullmatch(r'local(?:\[(\d+|\*)(?:,\d+)?\])?', master)
+        local_cluster = re.fullmatch(r'local-cluster\[(\d+),\s*(\d+),\s*(\d+)\]', master)
+        if local:
+            threads = local.group(1) or '1'
+            cpus = float(os.cpu_count() or 1) if threads == '*' else float(threads)
+        elif local_cluster:
+            workers, cores, worker_mb = (int(group) for group in local_cluster.groups())
+            cpus += workers * cores
+            memory_mb += workers * worker_mb
+        
+        return ResourceCost(cpus=cpus, memory_mb=memory_mb, source='engine_config')
+    
+    def _learned(self, output_dir: str) -> Optional[ResourceCost]:
+        """Cost observed in the previous run report of the transformation"""
+        report_path = os.path.join(output_dir, 'reports', 'transformation_report.yaml')
+        if not os.path.exists(report_path):
+            return None
+        
+        try:
+            with open(report_path, 'r') as f:
+                report = yaml.safe_load(f) or {}
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable run report {report_path}: {str(e)}")
+            return None
+        
+        usage = report.get('engine_process') or {}
+        if not usage.get('peak_rss_mb') or not usage.get('duration_seconds'):
+            return None
+        
+        cpus = max(1.0, round(usage.get('cpu_seconds', 0) / usage['duration_seconds'], 1))
+        return ResourceCost(
+            cpus=cpus,
+            memory_mb=round(usage['peak_rss_mb'] * self.LEARNED_HEADROOM, 1),
+            source='learned'
+        )
+
+
+class AdmissionScheduler:
+    """Admit runs against a CPU, memory and concurrency budget
+    
+    Waiting runs are served highest priority first, then in arrival order. The
+    head of the queue blocks the runs behind it so large runs are not starved
+    by a stream of small ones. A run costing more than the whole budget is
+    admitted alone.
+    """
+    
+    def __init__(self, max_cpus: float = None, max_memory_mb: float = None,
+                 max_concurrent: int = None):
+        self.max_cpus = float(max_cpus or os.cpu_count() or 1)
+        host_memory = host_memory_mb()
+        self.max_memory_mb = float(max_memory_mb or (host_memory * 0.8 if host_memory else float('inf')))
+        self.max_concurrent = max_concurrent
+        self.logger = logging.getLogger(__name__)
+        
+        self.used_cpus = 0.0
+        self.used_memory_mb = 0.0
+        self.running: Dict[int, Tuple[str, ResourceCost]] = {}
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+    
+    @contextmanager
+    def admit(self, name: str, cost: ResourceCost, priority: int = 0):
+        """Hold budget for the enclosed run, waiting until it fits"""
+        ticket = self.acquire(name, cost, priority)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+    
+    def acquire(self, name: str, cost: ResourceCost, priority: int = 0) -> int:
+        """Block until the run fits in the budget and reserve its cost; returns a ticket"""
+        ticket = next(self._sequence)
+        entry = (-priority, ticket, name)
+        
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            if not self._can_admit(entry, cost):
+                self.logger.info(
+                    f"Queueing {name} (priority {priority}, {cost.cpus} CPUs, {cost.memory_mb:.0f} MB): "
+                    f"{self.used_cpus}/{self.max_cpus} CPUs and "
+                    f"{self.used_memory_mb:.0f}/{self.max_memory_mb:.0f} MB in use"
+                )
+            while not self._can_admit(entry, cost):
+                self._condition.wait()
+            
+            heapq.heappop(self._waiting)
+            self.used_cpus += cost.cpus
+            self.used_memory_mb += cost.memory_mb
+            self.running[ticket] = (name, cost)
+            # The next waiter may fit as well
+            self._condition.notify_all()
+        
+        self.logger.info(f"Admitted {name} ({cost.cpus} CPUs, {cost.memory_mb:.0f} MB, {cost.source} cost)")
+        return ticket
+    
+    def release(self, ticket: int):
+        """Return the budget held by a run"""
+        with self._condition:
+            name, cost = self.running.pop(ticket, (None, None))
+            if cost is None:
+                return
+            self.used_cpus = max(0.0, self.used_cpus - cost.cpus)
+            self.used_memory_mb = max(0.0, self.used_memory_mb - cost.memory_mb)
+            self._condition.notify_all()
+    
+    def _can_admit(self, entry, cost: ResourceCost) -> bool:
+        """Whether the head-of-queue entry fits the remaining budget"""
+        if self._waiting[0] is not entry:
+            return False
+        if not self.running:
+            return True
+        if self.max_concurrent and len(self.running) >= self.max_concurrent:
+            return False
+        return (self.used_cpus + cost.cpus <= self.max_cpus
+                and self.used_memory_mb + cost.memory_mb <= self.max_memory_mb)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Budget usage and queue length"""
+        with self._condition:
+            return {
+                'max_cpus': self.max_cpus,
+                'max_memory_mb': self.max_memory_mb if self.max_memory_mb != float('inf') else None,
+                'max_concurrent': self.max_concurrent,
+                'used_cpus': self.used_cpus,
+                'used_memory_mb': round(self.used_memory_mb, 1),
+                'running': sorted(name for name, _ in self.running.values()),
+                'waiting': len(self._waiting)
+            }
@@ -0,0 +1,236 @@
+"""
+Spark Connect server management for the DQ Transformation Framework
+
+Starts a local Spark Connect server once and keeps it running, so Spark
+transformations connect to a warm driver as client sessions instead of
+paying JVM and SparkContext startup in a spark-submit per run. The server
+is detached and recorded in a state file, so later framework processes
+(CLI runs, DAG nodes, daemon jobs) reuse it and share its cached data.
+"""
+
+import os
+import json
+import time
+import atexit
+import signal
+import socket
+import logging
+import threading
+import subprocess
+from typing import Dict, Any, List, Optional
+
+from .fingerprint import hash_payload
+from .python_envs import file_lock
+
+
+CONNECT_SERVER_CLASS = 'org.apache.spark.sql.connect.service.SparkConnectServer'
+DEFAULT_PORT = 15002
+
+
+def port_open(host: str, port: int, timeout: float = 1.0) -> bool:
+    """Whether something accepts TCP connections on host:port"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class SparkConnectServer:
+    """A detached local Spark Connect server, started on first use and reused afterwards"""
+    
+    def __init__(self, port: int = DEFAULT_PORT, master: str = 'local[*]', conf: Dict[str, Any] = None,
+                 packages: List[str] = None, driver_memory: Optional[str] = None,
+                 state_dir: str = '~/.cache/dq-framework/spark-connect', startup_timeout: float = 120,
+                 spark_submit: str = 'spark-submit', env: Dict[str, str] = None):
+        self.port = int(port)
+        self.master = master
+        self.conf = conf or {}
+        self.packages = packages or []
+        self.driver_memory = driver_memory
+        self.state_dir = os.path.expanduser(state_dir)
+        self.startup_timeout = startup_timeout
+        self.spark_submit = spark_submit
+        self.env = env or {}
+        self.logger = logging.getLogger(__name__)
+        self._process: Optional[subprocess.Popen] = None
+        
+        os.makedirs(self.state_dir, exist_ok=True)
+    
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any]) -> 'SparkConnectServer':
+        """Server from the spark.connect config section"""
+        return cls(
+            port=settings.get('port', DEFAULT_PORT),
+            master=settings.get('master', 'local[*]'),
+            conf=settings.get('conf', {}),
+            packages=settings.get('packages', []),
+            driver_memory=settings.get('driver_memory'),
+            state_dir=settings.get('state_dir', '~/.cache/dq-framework/spark-connect'),
+            startup_timeout=float(settings.get('startup_timeout', 120)),
+            spark_submit=settings.get('spark_submit', 'spark-submit'),
+            env=settings.get('env', {})
+        )
+    
+    @property
+    def url(self) -> str:
+        return f"sc://localhost:{self.port}"
+    
+    @property
+    def state_file(self) -> str:
+        return os.path.join(self.state_dir, f"server_{self.port}.json")
+    
+    @property
+    def log_file(self) -> str:
+        return os.path.join(self.state_dir, f"server_{self.port}.log")
+    
+    def settings_hash(self) -> str:
+        """Identity of the server settings, to notice a running server started differently"""
+        return hash_payload({
+            'master': self.master, 'conf': self.conf, 'packages': self.packages,
+            'driver_memory': self.driver_memory
+        })[:16]
+    
+    def command(self) -> List[str]:
+        """spark-submit command running the Connect server in the foreground"""
+        cmd = [self.spark_submit, '--class', CONNECT_SERVER_CLASS, '--name', 'dq-spark-connect',
+               '--master', self.master, '--conf', f"spark.connect.grpc.binding.port={self.port}"]
+        for key, value in self.conf.items():
+            cmd.extend(['--conf', f"{key}={value}"])
+        if self.driver_memory:
+            cmd.extend(['--driver-memory', str(self.driver_memory)])
+        if self.packages:
+            cmd.extend(['--packages', ','.join(self.packages)])
+        return cmd
+    
+    def running(self) -> bool:
+        return port_open('localhost', self.port)
+    
+    def ensure(self) -> str:
+        """URL of the server, starting it if nothing listens on its port"""
+        if not self.running():
+            # One starter per port, across threads and processes
+            with _start_lock, file_lock(f"{self.state_file}.lock"):
+                if not self.running():
+                    self._start()
+                    return self.url
+        
+        state = self._read_state()
+        if state and state.get('settings') != self.settings_hash():
+            self.logger.warning(
+                f"Spark Connect server on port {self.port} was started with different settings; "
+                "reusing it (stop it to apply the new settings)"
+            )
+        self.logger.info(f"Reusing Spark Connect server: {self.url}")
+        return self.url
+    
+    def _start(self):
+        cmd = self.command()
+        self.logger.info(f"Starting Spark Connect server: {' '.join(cmd)}")
+        started = time.monotonic()
+        
+        env = os.environ.copy()
+        env.update(self.env)
+        with open(self.log_file, 'ab') as log:
+            # Own session: the server outlives this process and its signals
+            self._process = subprocess.Popen(
+                cmd, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                env=env, start_new_session=True
+            )
+        self._write_state({'pid': self._process.pid, 'port': self.port, 'settings': self.settings_hash(),
+                           'started_at': time.time()})
+        
+        while not self.running():
+            if self._process.poll() is not None:
+                self._remove_state()
+                raise RuntimeError(
+                    f"Spark Connect server exited with code {self._process.returncode}: {self._log_tail()}"
+                )
+            if time.monotonic() - started > self.startup_timeout:
+                self.stop()
+                raise RuntimeError(f"Spark Connect server not ready after {self.startup_timeout}s: {self._log_tail()}")
+            time.sleep(0.5)
+        
+        self.logger.info(f"Spark Connect server ready in {time.monotonic() - started:.1f}s: {self.url}")
+    
+    def stop(self, grace_seconds: float = 30) -> bool:
+        """Stop the server recorded for this port; returns whether one was stopped"""
+        state = self._read_state()
+        pid = state.get('pid') if state else None
+        if not pid or not _pid_alive(pid):
+            self._remove_state()
+            return False
+        
+        self.logger.info(f"Stopping Spark Connect server (pid {pid})")
+        self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + grace_seconds
+        while _pid_alive(pid) and time.monotonic() < deadline:
+            if self._process is not None and self._process.pid == pid and self._process.poll() is not None:
+                break
+            time.sleep(0.2)
+        else:
+            if _pid_alive(pid):
+                self._signal(pid, signal.SIGKILL)
+        self._remove_state()
+        return True
+    
+    @staticmethod
+    def _signal(pid: int, signum: int):
+        try:
+            os.killpg(pid, signum)
+        except (ProcessLookupError, PermissionError):
+            pass
+    
+    def _read_state(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_state(self, state: Dict[str, Any]):
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_file)
+    
+    def _remove_state(self):
+        try:
+            os.remove(self.state_file)
+        except FileNotFoundError:
+            pass
+    
+    def _log_tail(self, lines: int = 5) -> str:
+        try:
+            with open(self.log_file, 'r', errors='replace') as f:
+                return ' | '.join(line.strip() for line in f.readlines()[-lines:])
+        except OSError:
+            return ''
+
+
+_start_lock = threading.Lock()
+_servers: Dict[int, SparkConnectServer] = {}
+_servers_lock = threading.Lock()
+
+
+def get_connect_server(settings: Dict[str, Any]) -> SparkConnectServer:
+    """The process-wide server for the configured port"""
+    port = int(settings.get('port', DEFAULT_PORT))
+    with _servers_lock:
+        server = _servers.get(port)
+        if server is None:
+            server = SparkConnectServer.from_config(settings)
+            _servers[port] = server
+            if settings.get('stop_on_exit', False):
+                atexit.register(server.stop)
+        return server
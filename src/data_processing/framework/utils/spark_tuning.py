@@ -0,0 +1,257 @@
+"""
+Spark configuration auto-tuning for the DQ Transformation Framework
+
+Sizes shuffle partitions, executors and their memory, and the broadcast
+join threshold of a Spark run from the size of its inputs in the
+destination and the throughput and memory failures of its previous runs,
+instead of static settings that fit neither small deltas nor backfills.
+"""
+
+import os
+import re
+import glob
+import json
+import math
+import time
+import logging
+import statistics
+from typing import Dict, Any, List, Optional
+
+from .connections import get_connection_pool, load_destination, fetch_one
+
+
+# Output of a Spark run that ran out of memory
+MEMORY_ERRORS = re.compile(
+    r'OutOfMemoryError|GC overhead limit exceeded|exceeding memory limits|Container killed .*memory|exit code 137',
+    re.IGNORECASE
+)
+
+DEFAULT_SETTINGS = {
+    'target_partition_mb': 128,         # Input bytes per shuffle partition
+    'executor_cores': 4,
+    'min_executors': 1,
+    'max_executors': 50,
+    'memory_per_partition_factor': 4,   # In-memory size of a partition relative to its input bytes
+    'min_memory_mb': 1024,
+    'max_memory_mb': 16384,
+    'memory_failure_boost': 1.5,        # Memory growth after a run that ran out of memory
+    'target_duration_seconds': 600,     # Executors are sized to process the input in this time
+    'throughput_mb_per_core_second': 20,  # Used until runs have been recorded
+    'broadcast_max_mb': 256,            # Largest input considered for broadcast joins
+    'row_bytes': 100,                   # Bytes per row when only the row count is known
+    'history_size': 20
+}
+
+# Spark's default broadcast join threshold
+DEFAULT_BROADCAST_MB = 10
+
+# JVM overhead on top of the heap, as Spark sizes it for containers
+MIN_OVERHEAD_MB = 384
+
+
+def _split_table(table: str):
+    parts = table.split('.')
+    return (parts[-2] if len(parts) > 1 else None), parts[-1]
+
+
+def _is_file_table(table: str) -> bool:
+    return os.path.sep in table or table.endswith(('.parquet', '.csv', '.json')) or '*' in table
+
+
+def file_stats(table: str) -> Dict[str, Optional[int]]:
+    """Size of a table given as a path, directory or glob"""
+    if os.path.isdir(table):
+        paths = [os.path.join(root, name) for root, _, files in os.walk(table) for name in files]
+    else:
+        paths = glob.glob(table, recursive=True)
+    return {'rows': None, 'bytes': sum(os.path.getsize(path) for path in paths)}
+
+
+def table_stats(connection, dest_type: str, table: str) -> Dict[str, Optional[int]]:
+    """Row count and stored bytes of a destination table, from metadata where available"""
+    schema, name = _split_table(table)
+    
+    if dest_type == 'bigquery':
+        metadata = connection.get_table(table)
+        return {'rows': metadata.num_rows, 'bytes': metadata.num_bytes}
+    
+    if dest_type == 'snowflake':
+        row = fetch_one(
+            connection,
+            "SELECT ROW_COUNT, BYTES FROM INFORMATION_SCHEMA.TABLES "
+            f"WHERE TABLE_SCHEMA = '{(schema or 'PUBLIC').upper()}' AND TABLE_NAME = '{name.upper()}'"
+        )
+        if row:
+            return {'rows': row[0], 'bytes': row[1]}
+    
+    elif dest_type == 'postgres':
+        # Planner estimates avoid scanning large tables
+        row = fetch_one(
+            connection,
+            f"SELECT c.reltuples::bigint, pg_total_relation_size(c.oid) FROM pg_class c "
+            f"JOIN pg_namespace n ON n.oid = c.relnamespace "
+            f"WHERE n.nspname = '{schema or 'public'}' AND c.relname = '{name}'"
+        )
+        if row:
+            return {'rows': max(row[0], 0), 'bytes': row[1]}
+    
+    # DuckDB (and views) report no stored size: count rows
+    row = fetch_one(connection, f"SELECT COUNT(*) FROM {table}")
+    return {'rows': row[0], 'bytes': None}
+
+
+def memory_string(memory_mb: float) -> str:
+    """Spark memory setting for a size in MiB"""
+    return f"{int(math.ceil(memory_mb))}m"
+
+
+class SparkTuner:
+    """Recommend Spark sizing for a run and record how the run went"""
+    
+    def __init__(self, output_dir: str, settings: Dict[str, Any] = None):
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.history_path = os.path.join(output_dir, 'state', 'spark_tuning.json')
+        self.logger = logging.getLogger(__name__)
+    
+    def input_stats(self, contract_path: str, tables: List[str]) -> Dict[str, Dict[str, Optional[int]]]:
+        """Rows and bytes of each source table (bytes estimated from rows when not reported)"""
+        stats = {}
+        warehouse_tables = [table for table in tables if not _is_file_table(table)]
+        for table in tables:
+            if _is_file_table(table):
+                stats[table] = file_stats(table)
+        
+        if warehouse_tables:
+            destination = load_destination(contract_path)
+            pool = get_connection_pool()
+            connection = pool.acquire(destination)
+            try:
+                for table in warehouse_tables:
+                    try:
+                        stats[table] = table_stats(connection, destination.get('type'), table)
+                    except Exception as e:
+                        self.logger.warning(f"No statistics for {table}: {str(e)}")
+                        stats[table] = {'rows': None, 'bytes': None}
+            finally:
+                pool.release(connection)
+        
+        for entry in stats.values():
+            if entry['bytes'] is None and entry['rows'] is not None:
+                entry['bytes'] = entry['rows'] * self.settings['row_bytes']
+                entry['estimated'] = True
+        return stats
+    
+    def history(self) -> List[Dict[str, Any]]:
+        """Recorded runs, oldest first"""
+        try:
+            with open(self.history_path, 'r') as f:
+                return json.load(f).get('runs', [])
+        except (OSError, ValueError):
+            return []
+    
+    def throughput(self, history: List[Dict[str, Any]]) -> Optional[float]:
+        """Median input MiB processed per core-second by successful runs"""
+        rates = [
+            run['input_mb'] / (run['duration_seconds'] * run['cores'])
+            for run in history
+            if run.get('success') and run.get('input_mb', 0) >= 1 and run.get('duration_seconds') and run.get('cores')
+        ]
+        return statistics.median(rates) if rates else None
+    
+    def memory_floor(self, history: List[Dict[str, Any]], input_mb: float) -> Optional[float]:
+        """Memory above that of runs which ran out of it on a similar or larger input"""
+        failed = [
+            run['memory_mb'] for run in history
+            if run.get('memory_failure') and run.get('memory_mb') and run.get('input_mb', 0) >= 0.8 * input_mb
+        ]
+        if not failed:
+            return None
+        return round(max(failed) * float(self.settings['memory_failure_boost']))
+    
+    def recommend(self, stats: Dict[str, Dict[str, Optional[int]]], master: str = 'local[*]') -> Dict[str, Any]:
+        """Executor, memory and SQL settings for inputs of the given size"""
+        settings = self.settings
+        history = self.history()
+        sizes_mb = {table: (entry['bytes'] or 0) / 2**20 for table, entry in stats.items()}
+        input_mb = sum(sizes_mb.values())
+        
+        # Executors: enough cores to process the input in the target time at the observed throughput
+        learned_throughput = self.throughput(history)
+        throughput = learned_throughput or float(settings['throughput_mb_per_core_second'])
+        local = re.fullmatch(r'local(?:\[(\d+|\*)(?:,\d+)?\])?', master)
+        if local:
+            threads = local.group(1) or '1'
+            executor_cores = (os.cpu_count() or 1) if threads == '*' else int(threads)
+            executors = None
+            total_cores = executor_cores
+        else:
+            executor_cores = int(settings['executor_cores'])
+            cores_needed = input_mb / (throughput * float(settings['target_duration_seconds']))
+            executors = min(max(math.ceil(cores_needed / executor_cores), int(settings['min_executors'])),
+                            int(settings['max_executors']))
+            total_cores = executors * executor_cores
+        
+        # Shuffle partitions of about target_partition_mb, in whole waves over the cores
+        partitions = max(1, math.ceil(input_mb / float(settings['target_partition_mb'])))
+        if partitions > total_cores:
+            partitions = math.ceil(partitions / total_cores) * total_cores
+        
+        # Memory: the partitions processed concurrently plus JVM overhead, grown after memory failures
+        heap_mb = executor_cores * float(settings['target_partition_mb']) * float(settings['memory_per_partition_factor'])
+        memory_mb = heap_mb + max(MIN_OVERHEAD_MB, 0.1 * heap_mb)
+        memory_floor_mb = self.memory_floor(history, input_mb)
+        memory_mb = max(memory_mb, memory_floor_mb or 0)
+        memory_mb = min(max(memory_mb, float(settings['min_memory_mb'])), float(settings['max_memory_mb']))
+        
+        conf = {
+            'spark.sql.shuffle.partitions': str(partitions),
+            'spark.sql.adaptive.advisoryPartitionSizeInBytes': f"{int(settings['target_partition_mb'])}m"
+        }
+        
+        # Broadcast the largest input that is small enough, but never the largest one
+        candidates = sorted(sizes_mb.values())[:-1]
+        broadcastable = [size for size in candidates if size <= float(settings['broadcast_max_mb'])]
+        if broadcastable and max(broadcastable) > DEFAULT_BROADCAST_MB:
+            conf['spark.sql.autoBroadcastJoinThreshold'] = memory_string(max(broadcastable) * 1.2)
+        
+        tuning = {
+            'input_mb': round(input_mb, 1),
+            'input_rows': sum(entry['rows'] or 0 for entry in stats.values()),
+            'throughput_mb_per_core_second': round(throughput, 2),
+            'throughput_source': 'history' if learned_throughput else 'default',
+            'memory_floor_mb': memory_floor_mb,
+            'cores': total_cores,
+            'memory_mb': round(memory_mb),
+            'conf': conf
+        }
+        if local:
+            tuning['driver_memory'] = memory_string(memory_mb)
+        else:
+            tuning.update({
+                'num_executors': executors,
+                'executor_cores': executor_cores,
+                'executor_memory': memory_string(memory_mb)
+            })
+        return tuning
+    
+    def record(self, tuning: Dict[str, Any], success: bool, duration_seconds: float, output: List[str] = None):
+        """Append the outcome of a tuned run to the history"""
+        runs = self.history()
+        runs.append({
+            'recorded_at': time.time(),
+            'input_mb': tuning['input_mb'],
+            'cores': tuning['cores'],
+            'memory_mb': tuning['memory_mb'],
+            'duration_seconds': round(duration_seconds, 3),
+            'success': success,
+            'memory_failure': not success and any(MEMORY_ERRORS.search(line) for line in output or [])
+        })
+        
+        try:
+            os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+            tmp_path = f"{self.history_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'runs': runs[-int(self.settings['history_size']):]}, f, indent=2)
+            os.replace(tmp_path, self.history_path)
+        except OSError as e:
+            self.logger.warning(f"Could not record Spark tuning history: {str(e)}")
@@ -0,0 +1,420 @@
+"""
+SQL parsing utilities for the DQ Transformation Framework
+
+A small dialect-tolerant tokenizer that understands string literals, quoted
+identifiers, comments and dollar-quoted bodies, used to split scripts into
+statements without breaking on semicolons inside them or inside procedural
+BEGIN ... END blocks. Statements are annotated with the tables they read and
+write so that independent statements can be run concurrently.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple, Iterator, Optional
+
+
+# Token kinds
+WORD = 'word'
+STRING = 'string'
+QUOTED = 'quoted'      # "identifier" or `identifier`
+COMMENT = 'comment'
+DOLLAR = 'dollar'      # $tag$ ... $tag$ bodies
+SEMICOLON = 'semicolon'
+WHITESPACE = 'whitespace'
+SYMBOL = 'symbol'
+
+_WORD = re.compile(r'[A-Za-z_][\w$]*|\d[\w.]*')
+_DOLLAR_TAG = re.compile(r'\$(?:[A-Za-z_]\w*)?\$')
+_WHITESPACE = re.compile(r'\s+')
+
+# Dialects whose quoted strings use backslash escapes; elsewhere only E'...' literals do
+BACKSLASH_DIALECTS = {'bigquery', 'mysql', 'databricks', 'spark'}
+
+# Words after BEGIN that make it transaction control rather than a block
+_TRANSACTION_WORDS = {'transaction', 'work', 'tran', 'isolation', 'read', 'deferred', 'immediate', 'exclusive'}
+
+# Words after which BEGIN opens a nested block inside a procedural block
+_BLOCK_PREFIXES = {'then', 'else', 'loop', 'do'}
+
+# Routines whose body may follow AS without dollar quoting (CREATE PROCEDURE ... AS BEGIN)
+_ROUTINE_WORDS = {'procedure', 'function'}
+
+# Words after END that close a construct opened without BEGIN
+_END_QUALIFIERS = {'if', 'loop', 'while', 'for', 'repeat'}
+
+# Statements that end a DECLARE section being scanned for its BEGIN
+_STATEMENT_WORDS = {'select', 'with', 'insert', 'update', 'delete', 'merge', 'create', 'drop', 'alter',
+                    'truncate', 'set', 'call', 'fetch', 'close', 'move', 'commit', 'rollback', 'execute'}
+
+# Statements that change or depend on connection state (transactions, variables, cursors)
+_SESSION_WORDS = {'begin', 'start', 'commit', 'rollback', 'end', 'abort', 'savepoint', 'release', 'set',
+                  'reset', 'use', 'declare', 'fetch', 'close', 'move', 'prepare', 'deallocate', 'pragma',
+                  'attach', 'detach', 'lock'}
+
+# Statement types whose writes can be inferred
+_ANALYZED = {'select', 'with', 'create', 'insert', 'update', 'delete', 'merge',
+             'drop', 'alter', 'truncate', 'replace'}
+
+
+def tokenize(sql: str, dialect: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """Yield (kind, text) tokens covering the whole input
+    
+    Backslashes escape quotes only in E'...' literals, or in every quoted
+    string for dialects in BACKSLASH_DIALECTS.
+    """
+    backslashes = dialect in BACKSLASH_DIALECTS
+    i, n = 0, len(sql)
+    while i < n:
+        char = sql[i]
+        
+        if char.isspace():
+            end = _WHITESPACE.match(sql, i).end()
+            yield WHITESPACE, sql[i:end]
+            i = end
+        
+        elif sql.startswith('--', i):
+            end = sql.find('\n', i)
+            end = n if end == -1 else end
+            yield COMMENT, sql[i:end]
+            i = end
+        
+        elif sql.startswith('/*', i):
+            # Block comments nest in PostgreSQL and Snowflake
+            depth, j = 1, i + 2
+            while j < n and depth:
+                if sql.startswith('/*', j):
+                    depth, j = depth + 1, j + 2
+                elif sql.startswith('*/', j):
+                    depth, j = depth - 1, j + 2
+                else:
+                    j += 1
+            yield COMMENT, sql[i:j]
+            i = j
+        
+        elif char in ('e', 'E') and sql.startswith("'", i + 1):
+            # PostgreSQL escape string constant
+            end = _quoted_end(sql, i + 1, True)
+            yield STRING, sql[i:end]
+            i = end
+        
+        elif char in ("'", '"', '`'):
+            end = _quoted_end(sql, i, backslashes and char != '`')
+            yield (STRING if char == "'" else QUOTED), sql[i:end]
+            i = end
+        
+        elif char == '$' and _DOLLAR_TAG.match(sql, i):
+            tag = _DOLLAR_TAG.match(sql, i).group(0)
+            end = sql.find(tag, i + len(tag))
+            end = n if end == -1 else end + len(tag)
+            yield DOLLAR, sql[i:end]
+            i = end
+        
+        elif char == ';':
+            yield SEMICOLON, char
+            i += 1
+        
+        elif _WORD.match(sql, i):
+            end = _WORD.match(sql, i).end()
+            yield WORD, sql[i:end]
+            i = end
+        
+        else:
+            yield SYMBOL, char
+            i += 1
+
+
+def _quoted_end(sql: str, start: int, backslashes: bool) -> int:
+    """End of the quoted string or identifier opening at start"""
+    char, j, n = sql[start], start + 1, len(sql)
+    while j < n:
+        if sql[j] == char:
+            # Doubled quote is an escaped quote
+            if j + 1 < n and sql[j + 1] == char:
+                j += 2
+                continue
+            break
+        if backslashes and sql[j] == '\\':
+            j += 2
+            continue
+        j += 1
+    return min(j + 1, n)
+
+
+def _significant(tokens: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    return [token for token in tokens if token[0] not in (WHITESPACE, COMMENT)]
+
+
+def split_statements(sql: str, dialect: Optional[str] = None) -> List[str]:
+    """Split a script on top-level semicolons
+    
+    Semicolons inside strings, comments, dollar-quoted bodies and procedural
+    blocks (BEGIN ... END, DECLARE ... BEGIN ... END, CASE ... END) do not
+    end a statement. BEGIN opens a block only where a statement starts, as
+    the body of a routine (AS BEGIN) or nested in a block, so columns and
+    aliases named begin do not.
+    """
+    statements = []
+    current: List[Tuple[str, str]] = []
+    blocks: List[str] = []
+    previous = None
+    segment_start = True
+    
+    tokens = list(tokenize(sql, dialect))
+    for index, (kind, text) in enumerate(tokens):
+        if kind == SEMICOLON:
+            segment_start = True
+            if not blocks:
+                _append_statement(statements, current)
+                current = []
+                continue
+        
+        current.append((kind, text))
+        if kind in (WHITESPACE, COMMENT, SEMICOLON):
+            continue
+        at_start, segment_start = segment_start, False
+        if kind != WORD:
+            previous = None
+            continue
+        
+        word = text.lower()
+        previous_word, previous = previous, word
+        if word == 'case' and previous_word != 'end':
+            blocks.append('case')
+        elif word == 'declare' and not _significant(current[:-1]) and _declares_block(tokens, index):
+            # Scripting block: DECLARE section followed by BEGIN ... END
+            blocks.append('declare')
+        elif word == 'begin' and blocks and blocks[-1] == 'declare':
+            blocks[-1] = 'begin'
+        elif word == 'begin' and _opens_block(current, blocks, previous_word, at_start):
+            following = _next_word(tokens, index)
+            if following is None or following not in _TRANSACTION_WORDS:
+                # BEGIN followed by ; or a transaction keyword is transaction control
+                if following is not None or blocks:
+                    blocks.append('begin')
+        elif word == 'end' and blocks:
+            if _next_word(tokens, index) not in _END_QUALIFIERS:
+                blocks.pop()
+    
+    _append_statement(statements, current)
+    return statements
+
+
+def _opens_block(current: List[Tuple[str, str]], blocks: List[str], previous_word: Optional[str],
+                 at_start: bool) -> bool:
+    """Whether a BEGIN stands where a block may open, rather than as a name"""
+    if at_start:
+        return True
+    if previous_word == 'as':
+        words = [text.lower() for kind, text in _significant(current) if kind == WORD]
+        return words[0] == 'create' and bool(_ROUTINE_WORDS & set(words))
+    return previous_word in _BLOCK_PREFIXES and bool(blocks) and blocks[-1] != 'case'
+
+
+def _declares_block(tokens: List[Tuple[str, str]], index: int) -> bool:
+    """Whether a statement-leading DECLARE opens a DECLARE ... BEGIN ... END block
+    
+    True when the declarations up to the next BEGIN are not interrupted by
+    another statement (e.g. a PostgreSQL cursor DECLARE followed by FETCH).
+    """
+    at_segment_start = False
+    for kind, text in tokens[index + 1:]:
+        if kind in (WHITESPACE, COMMENT):
+            continue
+        if kind == SEMICOLON:
+            at_segment_start = True
+            continue
+        if at_segment_start:
+            word = text.lower() if kind == WORD else None
+            if word == 'begin':
+                return True
+            if word in _STATEMENT_WORDS:
+                return False
+            at_segment_start = False
+    return False
+
+
+def _next_word(tokens: List[Tuple[str, str]], index: int) -> Optional[str]:
+    """Next significant token after index, lower-cased, or None at a semicolon or the end"""
+    for kind, text in tokens[index + 1:]:
+        if kind in (WHITESPACE, COMMENT):
+            continue
+        if kind == SEMICOLON:
+            return None
+        return text.lower()
+    return None
+
+
+def _append_statement(statements: List[str], tokens: List[Tuple[str, str]]):
+    if _significant(tokens):
+        statements.append(''.join(text for _, text in tokens).strip())
+
+
+@dataclass
+class SqlStatement:
+    """A statement with the tables it writes and the names it references"""
+    sql: str
+    source: str = ''
+    index: int = 0
+    reads: Set[str] = field(default_factory=set)   # Every referenced name other than the written tables
+    writes: Set[str] = field(default_factory=set)
+    barrier: bool = False  # Effects unknown: runs after everything before and before everything after
+    session: bool = False  # Changes or depends on connection state, so the script needs one connection
+    view: bool = False  # Creates a view: statements reading it read the tables behind it
+
+
+def analyze_statement(sql: str, source: str = '', index: int = 0, dialect: Optional[str] = None) -> SqlStatement:
+    """Infer the tables a statement writes and the names it may read
+    
+    Reads are over-approximated with every (qualified) identifier in the
+    statement, so a missed FROM-clause form can only cost parallelism.
+    """
+    tokens = _significant(list(tokenize(sql, dialect)))
+    statement = SqlStatement(sql=sql, source=source, index=index)
+    if not tokens or tokens[0][0] != WORD or tokens[0][1].lower() not in _ANALYZED:
+        statement.barrier = True
+        statement.session = bool(tokens) and tokens[0][1].lower() in _SESSION_WORDS
+        return statement
+    
+    words = [text.lower() if kind == WORD else None for kind, text in tokens]
+    first = words[0]
+    target = None
+    if first == 'create' and ('temp' in words[1:4] or 'temporary' in words[1:4]):
+        # Temporary tables are only visible to the connection that created them
+        statement.session = True
+    
+    if first == 'create':
+        position = _skip_words(words, 1, {'or', 'replace', 'temp', 'temporary', 'transient', 'local',
+                                          'global', 'unlogged', 'external', 'materialized', 'secure',
+                                          'recursive', 'unique'})
+        kind = words[position] if position < len(words) else None
+        if kind in ('table', 'view'):
+            target = _skip_words(words, position + 1, {'if', 'not', 'exists'})
+            statement.view = kind == 'view'
+        elif kind == 'index' and 'on' in words:
+            target = words.index('on', position) + 1
+        else:
+            # Schemas, functions, procedures, sequences, ...
+            statement.barrier = True
+            return statement
+    
+    elif first in ('insert', 'replace'):
+        target = _skip_words(words, 1, {'into', 'overwrite', 'table', 'or', 'ignore', 'replace'})
+    
+    elif first == 'update':
+        target = 1
+    
+    elif first in ('delete', 'merge'):
+        target = _skip_words(words, 1, {'from', 'into'})
+    
+    elif first in ('drop', 'alter', 'truncate'):
+        if first != 'truncate' and words[1:2] and words[1] not in ('table', 'view', 'materialized'):
+            # DROP SCHEMA, ALTER SESSION, ...
+            statement.barrier = True
+            return statement
+        target = _skip_words(words, 1, {'table', 'view', 'materialized', 'if', 'exists'})
+        if first == 'alter' and 'rename' in words and 'to' in words:
+            # The renamed table is written as well
+            renamed, _ = _read_name(tokens, words.index('to', words.index('rename')) + 1)
+            if renamed:
+                statement.writes.add(renamed)
+    
+    if target is not None:
+        # The written table may be followed by a column list: INSERT INTO t (a, b) SELECT ...
+        name, _ = _read_name(tokens, target, column_list=True)
+        if name:
+            statement.writes.add(name)
+    
+    position = 0
+    while position < len(tokens):
+        name, end = _read_name(tokens, position)
+        if name:
+            statement.reads.add(name)
+        position = max(end, position + 1)
+    statement.reads -= statement.writes
+    
+    if not statement.writes and first not in ('select', 'with'):
+        statement.barrier = True
+    return statement
+
+
+def _skip_words(words: List[Optional[str]], position: int, skip: Set[str]) -> int:
+    while position < len(words) and words[position] in skip:
+        position += 1
+    return position
+
+
+def _read_name(tokens: List[Tuple[str, str]], position: int,
+               column_list: bool = False) -> Tuple[Optional[str], int]:
+    """Read a possibly qualified name; None for keywords-only positions and function calls
+    
+    With column_list a parenthesis after the name is a column list, not a call.
+    """
+    parts = []
+    while position < len(tokens):
+        kind, text = tokens[position]
+        if kind == WORD and not text[0].isdigit():
+            parts.append(text.lower())
+        elif kind == QUOTED:
+            parts.append(text[1:-1])
+        else:
+            break
+        position += 1
+        if position < len(tokens) and tokens[position] == (SYMBOL, '.'):
+            position += 1
+            continue
+        break
+    
+    if not parts:
+        return None, position
+    if not column_list and position < len(tokens) and tokens[position] == (SYMBOL, '('):
+        # Function call such as read_parquet(...)
+        return None, position
+    return '.'.join(parts), position
+
+
+def _tables_overlap(left: Set[str], right: Set[str]) -> bool:
+    """Whether two table sets share a table, comparing unqualified names as a fallback"""
+    if left & right:
+        return True
+    return bool({name.split('.')[-1] for name in left} & {name.split('.')[-1] for name in right})
+
+
+def statement_dependencies(statements: List[SqlStatement]) -> List[Set[int]]:
+    """Indexes of the earlier statements each statement must wait for
+    
+    A statement depends on an earlier one that writes a table it references,
+    or that references a table it writes. Referencing a view created by the
+    script counts as referencing every table the view reads. Barriers depend
+    on, and are depended on by, every other statement.
+    """
+    reads = _reads_through_views(statements)
+    dependencies = []
+    for position, statement in enumerate(statements):
+        depends_on = set()
+        for earlier in range(position):
+            other = statements[earlier]
+            if (statement.barrier or other.barrier
+                    or _tables_overlap(other.writes, reads[position] | statement.writes)
+                    or _tables_overlap(reads[earlier], statement.writes)):
+                depends_on.add(earlier)
+        dependencies.append(depends_on)
+    return dependencies
+
+
+def _reads_through_views(statements: List[SqlStatement]) -> List[Set[str]]:
+    """Names each statement reads, with the views it reads expanded to the names behind them"""
+    views: Dict[str, Set[str]] = {}
+    expanded = []
+    for statement in statements:
+        reads = set(statement.reads)
+        for view, behind in views.items():
+            if _tables_overlap({view}, statement.reads):
+                reads |= behind
+        for name in statement.writes:
+            if statement.view:
+                views[name] = reads
+            else:
+                # Dropped or replaced by a table
+                views.pop(name, None)
+        expanded.append(reads)
+    return expanded
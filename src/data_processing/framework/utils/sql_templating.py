@@ -0,0 +1,111 @@
+"""
+SQL templating utilities for the DQ Transformation Framework
+
+Renders SQL scripts as Jinja templates with framework-provided variables
+(watermark, run window, target tables) and generates the statements of the
+incremental materialization: the model's new rows are staged in a temporary
+table and appended, delete+inserted or merged into the target.
+"""
+
+from typing import Dict, Any, List, Optional, Union
+
+from .connections import fetch_one
+
+
+INCREMENTAL_STRATEGIES = ('append', 'delete+insert', 'merge')
+
+
+def has_template_markup(sql: str) -> bool:
+    """Whether SQL text contains Jinja expressions, statements or comments"""
+    return '{{' in sql or '{%' in sql or '{#' in sql
+
+
+def render_sql(sql: str, variables: Dict[str, Any], name: str = '<sql>') -> str:
+    """Render a SQL template; undefined variables are errors"""
+    try:
+        import jinja2
+    except ImportError:
+        raise RuntimeError("Jinja2 not installed. Install with: pip install jinja2")
+    
+    environment = jinja2.Environment(undefined=jinja2.StrictUndefined, keep_trailing_newline=True)
+    try:
+        return environment.from_string(sql).render(**variables)
+    except jinja2.TemplateError as e:
+        raise RuntimeError(f"Error rendering SQL template {name}: {str(e)}")
+
+
+def quote_identifier(name: str) -> str:
+    """Double-quote a column name"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def table_exists(connection, table: str) -> bool:
+    """Whether a (schema-qualified) table or view exists on the destination"""
+    parts = table.replace('"', '').split('.')
+    name = parts[-1]
+    schema = f"LOWER('{parts[-2]}')" if len(parts) > 1 else 'LOWER(current_schema())'
+    row = fetch_one(
+        connection,
+        "SELECT COUNT(*) FROM information_schema.tables "
+        f"WHERE LOWER(table_schema) = {schema} AND LOWER(table_name) = LOWER('{name}')"
+    )
+    return bool(row and row[0])
+
+
+def query_columns(connection, table: str) -> List[str]:
+    """Column names of a table, from an empty result set"""
+    query = f"SELECT * FROM {table} LIMIT 0"
+    if hasattr(connection, 'execute'):
+        # DuckDB
+        return [column[0] for column in connection.execute(query).description]
+    
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query)
+        return [column[0] for column in cursor.description]
+    finally:
+        cursor.close()
+
+
+def incremental_statements(target: str, new_rows: str, columns: List[str], strategy: str,
+                           unique_key: Union[str, List[str], None] = None) -> List[str]:
+    """Statements applying staged new rows to an existing target table"""
+    if strategy not in INCREMENTAL_STRATEGIES:
+        raise ValueError(f"Unsupported incremental strategy: {strategy}")
+    
+    keys = [unique_key] if isinstance(unique_key, str) else list(unique_key or [])
+    if strategy != 'append' and not keys:
+        raise ValueError(f"Incremental strategy {strategy} requires a unique_key")
+    
+    column_list = ', '.join(quote_identifier(column) for column in columns)
+    insert = f"INSERT INTO {target} ({column_list}) SELECT {column_list} FROM {new_rows}"
+    
+    if strategy == 'append':
+        return [insert]
+    
+    key_list = ', '.join(quote_identifier(key) for key in keys)
+    if strategy == 'delete+insert':
+        return [
+            f"DELETE FROM {target} WHERE ({key_list}) IN (SELECT {key_list} FROM {new_rows})",
+            insert
+        ]
+    
+    matches = ' AND '.join(f"t.{quote_identifier(key)} = s.{quote_identifier(key)}" for key in keys)
+    updates = ', '.join(
+        f"{quote_identifier(column)} = s.{quote_identifier(column)}"
+        for column in columns if column not in keys
+    )
+    values = ', '.join(f"s.{quote_identifier(column)}" for column in columns)
+    merge = f"MERGE INTO {target} AS t USING {new_rows} AS s ON {matches}"
+    if updates:
+        merge += f" WHEN MATCHED THEN UPDATE SET {updates}"
+    merge += f" WHEN NOT MATCHED THEN INSERT ({column_list}) VALUES ({values})"
+    return [merge]
+
+
+def seed_statement(staging: str, target: str, dest_type: Optional[str]) -> str:
+    """Statement copying a target into its staging table before an incremental run"""
+    if dest_type == 'snowflake':
+        # Zero-copy clone
+        return f"CREATE OR REPLACE TABLE {staging} CLONE {target}"
+    return f"CREATE TABLE {staging} AS SELECT * FROM {target}"
@@ -0,0 +1,263 @@
+"""
+Staging utilities for the DQ Transformation Framework
+
+Maps transformation target tables to staging tables living next to them
+(``schema.table`` -> ``schema.table__staging``) and promotes or discards them.
+Keeping staging tables in the target schema means promotion is a rename
+(DuckDB, Postgres) or a swap (Snowflake), both metadata-only operations.
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from .connections import get_connection_pool, load_destination, fetch_one
+from .sql_parser import tokenize, WORD, QUOTED, SYMBOL, WHITESPACE, COMMENT
+
+
+# Schema of unqualified table names when the destination does not declare one
+DEFAULT_SCHEMAS = {'duckdb': 'main', 'postgres': 'public', 'snowflake': 'public'}
+
+# Words after which an unqualified name is a table
+_TABLE_KEYWORDS = {'from', 'join', 'into', 'table', 'update', 'exists', 'using', 'truncate', 'view'}
+
+# Words after which a table may be read under its own name (and so is given it as an alias)
+_READ_KEYWORDS = {'from', 'join', 'using'}
+
+# Words that can follow an unaliased table in a FROM clause
+_CLAUSE_WORDS = {'where', 'join', 'inner', 'left', 'right', 'full', 'cross', 'natural', 'on', 'using', 'group',
+                 'order', 'limit', 'union', 'except', 'intersect', 'having', 'window', 'qualify', 'lateral',
+                 'offset', 'fetch', 'returning', 'set', 'values', 'select', 'when', 'tablesample', 'sample',
+                 'pivot', 'unpivot'}
+
+
+def default_schema(destination: Dict[str, Any]) -> Optional[str]:
+    """Schema that unqualified table names resolve to on a destination"""
+    return destination.get('schema') or DEFAULT_SCHEMAS.get(destination.get('type'))
+
+
+class StagingError(Exception):
+    """Exception raised when staging tables cannot be prepared or promoted"""
+    pass
+
+
+class StagingArea:
+    """Staging tables for a set of transformation targets"""
+    
+    DEFAULT_SUFFIX = '__staging'
+    PREVIOUS_SUFFIX = '__previous'
+    
+    def __init__(self, contract_path: str, target_tables: List[str], suffix: str = None):
+        self.contract_path = contract_path
+        self.target_tables = list(target_tables)
+        self.suffix = suffix or self.DEFAULT_SUFFIX
+        self.logger = logging.getLogger(__name__)
+        self.destination = load_destination(contract_path)
+        self.mapping = {table: self.staging_name(table) for table in self.target_tables}
+    
+    @property
+    def staging_tables(self) -> List[str]:
+        """Staging table names, in target order"""
+        return [self.mapping[table] for table in self.target_tables]
+    
+    def staging_name(self, table: str) -> str:
+        """Staging table name for a target table"""
+        return f"{table}{self.suffix}"
+    
+    def prepare(self):
+        """Drop leftover staging tables from previous runs"""
+        self.logger.info(f"Preparing staging tables: {self.staging_tables}")
+        self._execute([f"DROP TABLE IF EXISTS {table}" for table in self.staging_tables])
+    
+    def discard(self):
+        """Drop staging tables without publishing them"""
+        self.logger.info(f"Discarding staging tables: {self.staging_tables}")
+        try:
+            self._execute([f"DROP TABLE IF EXISTS {table}" for table in self.staging_tables])
+        except Exception as e:
+            # Discarding is best effort; leftovers are dropped by the next prepare()
+            self.logger.warning(f"Could not discard staging tables: {str(e)}")
+    
+    def publish(self, keep_previous: bool = False):
+        """Swap staging tables into place
+        
+        Only renames and swaps are issued, so publishing does not copy data.
+        On DuckDB and Postgres all targets are replaced in one transaction.
+        Snowflake DDL commits implicitly, so there each target is replaced by
+        a single atomic ALTER TABLE ... SWAP WITH (or a rename when it does
+        not exist yet), but not all targets at once. With keep_previous the
+        replaced targets survive as <table>__previous. Publishing is refused
+        when a staging table is missing, since the targets would be dropped.
+        """
+        missing = self.missing_tables()
+        if missing:
+            raise StagingError(f"Staging tables {missing} do not exist; refusing to publish")
+        
+        dest_type = self.destination.get('type')
+        statements = []
+        
+        for target, staging in self.mapping.items():
+            previous = f"{target}{self.PREVIOUS_SUFFIX}"
+            
+            if dest_type == 'snowflake':
+                if not self._table_exists(target):
+                    statements.append(f"ALTER TABLE {staging} RENAME TO {target}")
+                    continue
+                # After the swap the staging table holds the replaced data
+                statements.append(f"ALTER TABLE {target} SWAP WITH {staging}")
+                if keep_previous:
+                    statements.append(f"DROP TABLE IF EXISTS {previous}")
+                    statements.append(f"ALTER TABLE {staging} RENAME TO {previous}")
+                else:
+                    statements.append(f"DROP TABLE {staging}")
+            elif dest_type in ('duckdb', 'postgres'):
+                if keep_previous:
+                    statements.append(f"DROP TABLE IF EXISTS {previous}")
+                    statements.append(f"ALTER TABLE IF EXISTS {target} RENAME TO {self._unqualified(previous)}")
+                else:
+                    statements.append(f"DROP TABLE IF EXISTS {target}")
+                statements.append(f"ALTER TABLE {staging} RENAME TO {self._unqualified(target)}")
+            else:
+                raise StagingError(f"Publishing staging tables is not supported for destination: {dest_type}")
+        
+        self.logger.info(f"Publishing staging tables to: {self.target_tables}")
+        self._execute(statements, transactional=dest_type != 'snowflake')
+    
+    def _execute(self, statements: List[str], transactional: bool = False):
+        """Execute statements on the destination"""
+        pool = get_connection_pool()
+        connection = pool.acquire(self.destination)
+        if connection is None:
+            raise StagingError("Failed to establish database connection for staging")
+        
+        dest_type = self.destination.get('type')
+        try:
+            cursor = connection.cursor()
+            if transactional and dest_type == 'duckdb':
+                cursor.execute("BEGIN TRANSACTION")
+            
+            for statement in statements:
+                cursor.execute(statement)
+            
+            if transactional and dest_type == 'duckdb':
+                cursor.execute("COMMIT")
+            elif dest_type == 'postgres':
+                connection.commit()
+        
+        except Exception as e:
+            if hasattr(connection, 'rollback'):
+                try:
+                    connection.rollback()
+                except Exception:
+                    pass
+            raise StagingError(f"Staging operation failed: {str(e)}")
+        
+        finally:
+            pool.release(connection)
+    
+    def missing_tables(self) -> List[str]:
+        """Staging tables that do not exist, e.g. because the script wrote its targets directly"""
+        return [table for table in self.staging_tables if not self._table_exists(table)]
+    
+    def _table_exists(self, table: str) -> bool:
+        """Whether a (possibly schema-qualified) table exists on the destination"""
+        parts = table.split('.')
+        schema = parts[-2] if len(parts) > 1 else default_schema(self.destination)
+        # DuckDB binds ? parameters; psycopg2 and the Snowflake connector %s
+        placeholder = '?' if self.destination.get('type') == 'duckdb' else '%s'
+        pool = get_connection_pool()
+        connection = pool.acquire(self.destination)
+        if connection is None:
+            raise StagingError("Failed to establish database connection for staging")
+        try:
+            row = fetch_one(
+                connection,
+                "SELECT COUNT(*) FROM information_schema.tables "
+                f"WHERE LOWER(table_schema) = LOWER({placeholder}) AND LOWER(table_name) = LOWER({placeholder})",
+                (schema, parts[-1])
+            )
+            return bool(row and row[0])
+        finally:
+            pool.release(connection)
+    
+    @staticmethod
+    def _unqualified(table: str) -> str:
+        """Table name without schema"""
+        return table.split('.')[-1]
+
+
+def rewrite_table_references(sql: str, overrides: Dict[str, str], dialect: Optional[str] = None,
+                             default_schema: Optional[str] = None) -> str:
+    """Replace table references in SQL text with their overrides
+    
+    Only complete (possibly quoted) identifier chains are compared, so names
+    inside string literals and comments, and longer qualified names ending
+    in an overridden one (db.schema.table), are left alone. Unqualified
+    names in table positions (FROM, JOIN, INTO, TABLE, ...) resolve against
+    default_schema; when read, they keep their name as an alias so column
+    references qualified with it still resolve.
+    """
+    lookup = {}
+    for original, replacement in overrides.items():
+        key = original.lower()
+        if '.' not in key and default_schema:
+            key = f"{default_schema.lower()}.{key}"
+        lookup[key] = replacement
+    
+    tokens = list(tokenize(sql, dialect))
+    parts = []
+    position = 0
+    previous, before_previous = None, None
+    while position < len(tokens):
+        kind, text = tokens[position]
+        end, name = _identifier_chain(tokens, position)
+        if name is None:
+            parts.append(text)
+            position += 1
+            if kind not in (WHITESPACE, COMMENT):
+                previous, before_previous = None, previous
+            continue
+        
+        chain = ''.join(text for _, text in tokens[position:end])
+        replacement = None
+        if '.' in name:
+            replacement = lookup.get(name)
+        elif default_schema and previous in _TABLE_KEYWORDS:
+            replacement = lookup.get(f"{default_schema.lower()}.{name}")
+            if (replacement is not None and previous in _READ_KEYWORDS and before_previous != 'delete'
+                    and not _aliased(tokens, end)):
+                replacement = f"{replacement} AS {chain}"
+        parts.append(chain if replacement is None else replacement)
+        position = end
+        previous, before_previous = (name if kind == WORD and '.' not in name else None), previous
+    return ''.join(parts)
+
+
+def _aliased(tokens: List[Tuple[str, str]], position: int) -> bool:
+    """Whether the table reference ending at position is followed by an alias"""
+    for kind, text in tokens[position:]:
+        if kind in (WHITESPACE, COMMENT):
+            continue
+        if kind == QUOTED:
+            return True
+        return kind == WORD and (text.lower() == 'as' or text.lower() not in _CLAUSE_WORDS)
+    return False
+
+
+def _identifier_chain(tokens: List[Tuple[str, str]], position: int) -> Tuple[int, Optional[str]]:
+    """End of the dotted identifier chain starting at position and its name (quotes removed, lower-cased)"""
+    names = []
+    while position < len(tokens):
+        kind, text = tokens[position]
+        if kind == WORD and not text[0].isdigit():
+            names.append(text.lower())
+        elif kind == QUOTED:
+            names.append(text[1:-1].lower())
+        else:
+            break
+        position += 1
+        if (position + 1 < len(tokens) and tokens[position] == (SYMBOL, '.')
+                and tokens[position + 1][0] in (WORD, QUOTED)):
+            position += 1
+            continue
+        break
+    return position, ('.'.join(names) if names else None)
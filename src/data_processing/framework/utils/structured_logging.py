@@ -0,0 +1,270 @@
+"""
+Structured logging utilities for the DQ Transformation Framework
+
+Log records are put on an in-memory queue by the threads that emit them and
+written by a single background listener thread, so engine output streamed
+through the logger never blocks execution on file or console I/O. When the
+queue is full, records below WARNING are dropped and warnings and errors
+are written synchronously by the emitting thread instead. Each run
+writes JSON lines, tagged with its run, transformation and phase ids, to its
+own size-rotated log file.
+
+Usage:
+    setup_logging()
+    with log_context(run_id=run_id, transformation='orders', log_file='out/transformation.log'):
+        with log_context(phase='pre_checks'):
+            logger.info('...')
+"""
+
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+import logging.handlers
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Callable
+
+from .tracing import current_span
+
+
+# Fields attached to every record emitted within a log_context
+CONTEXT_FIELDS = ('run_id', 'transformation', 'phase', 'log_file')
+
+_context: contextvars.ContextVar = contextvars.ContextVar('dq_log_context', default={})
+
+_setup_lock = threading.Lock()
+_listener: Optional['_LogListener'] = None
+_queue_handler: Optional['NonBlockingQueueHandler'] = None
+_file_router: Optional['RotatingFileRouter'] = None
+
+
+@contextmanager
+def log_context(**fields):
+    """Tag records logged by the enclosed code (and threads copying its context)"""
+    token = _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_log_context() -> Dict[str, Any]:
+    """Fields currently attached to log records"""
+    return dict(_context.get())
+
+
+class ContextFilter(logging.Filter):
+    """Copy the log context and active trace span onto records in the emitting thread"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _context.get()
+        for name in CONTEXT_FIELDS:
+            setattr(record, name, context.get(name))
+        
+        span = current_span()
+        record.trace_id = span.trace_id if span else None
+        record.span_id = span.span_id if span else None
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks when the queue is full
+    
+    Records below WARNING are then dropped; WARNING and above are passed to
+    the fallback (the listener's handlers, run in the emitting thread).
+    """
+    
+    def __init__(self, log_queue: queue.Queue, fallback: Optional[Callable[[logging.LogRecord], None]] = None):
+        super().__init__(log_queue)
+        self.fallback = fallback
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render message and traceback now; arguments may not be safe to format later
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING and self.fallback is not None:
+                self.fallback(record)
+            else:
+                self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        for name in ('run_id', 'transformation', 'phase', 'trace_id', 'span_id'):
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ContextTextFormatter(logging.Formatter):
+    """Human-readable lines prefixed with the transformation and phase"""
+    
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(context)s%(message)s')
+    
+    def format(self, record: logging.LogRecord) -> str:
+        scope = '/'.join(filter(None, (getattr(record, 'transformation', None), getattr(record, 'phase', None))))
+        record.context = f"[{scope}] " if scope else ''
+        return super().format(record)
+
+
+class RotatingFileRouter(logging.Handler):
+    """Write each record to the rotating log file named in its context
+    
+    Runs in the listener thread. At most max_open files are kept open; the
+    least recently written one is closed when another is needed.
+    """
+    
+    def __init__(self, max_bytes: int, backup_count: int, max_open: int = 32):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_open = max_open
+        self.handlers: 'OrderedDict[str, logging.Handler]' = OrderedDict()
+        self.setFormatter(JsonFormatter())
+    
+    def emit(self, record: logging.LogRecord):
+        path = getattr(record, 'log_file', None)
+        if not path:
+            return
+        
+        try:
+            handler = self.handlers.get(path)
+            if handler is None:
+                handler = logging.handlers.RotatingFileHandler(
+                    path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8'
+                )
+                handler.setFormatter(self.formatter)
+                self.handlers[path] = handler
+                while len(self.handlers) > self.max_open:
+                    _, oldest = self.handlers.popitem(last=False)
+                    oldest.close()
+            else:
+                self.handlers.move_to_end(path)
+            handler.emit(record)
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self):
+        for handler in list(self.handlers.values()):
+            handler.flush()
+    
+    def close(self):
+        for handler in self.handlers.values():
+            handler.close()
+        self.handlers.clear()
+        super().close()
+
+
+class _LogListener(logging.handlers.QueueListener):
+    """Queue listener that also acknowledges flush markers"""
+    
+    def handle(self, record: logging.LogRecord):
+        flush_event = getattr(record, 'flush_event', None)
+        if flush_event is not None:
+            for handler in self.handlers:
+                handler.flush()
+            flush_event.set()
+            return
+        super().handle(record)
+
+
+def setup_logging(level: str = 'INFO', console_format: str = 'text', max_bytes: int = 50 * 2**20,
+                  backup_count: int = 5, max_queue: int = 100000) -> logging.Logger:
+    """Route framework logging through a background writer (idempotent)
+    
+    If the application already configured root handlers they are kept and
+    no console handler is added; per-run log files are written either way.
+    """
+    global _listener, _queue_handler, _file_router
+    
+    root = logging.getLogger()
+    with _setup_lock:
+        if _listener is not None:
+            return root
+        
+        handlers = []
+        if not root.handlers:
+            console = logging.StreamHandler(sys.stderr)
+            console.setFormatter(JsonFormatter() if console_format == 'json' else ContextTextFormatter())
+            handlers.append(console)
+            root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+        
+        _file_router = RotatingFileRouter(int(max_bytes), int(backup_count))
+        handlers.append(_file_router)
+        
+        log_queue = queue.Queue(maxsize=max_queue)
+        _listener = _LogListener(log_queue, *handlers, respect_handler_level=True)
+        _queue_handler = NonBlockingQueueHandler(log_queue, fallback=_listener.handle)
+        _queue_handler.addFilter(ContextFilter())
+        root.addHandler(_queue_handler)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    
+    return root
+
+
+def flush_logs():
+    """Wait until queued records are written"""
+    listener = _listener
+    if listener is None:
+        return
+    # Records are handled in order, so all earlier records are written once the marker is
+    done = threading.Event()
+    marker = logging.makeLogRecord({'msg': '', 'levelno': logging.NOTSET})
+    marker.flush_event = done
+    try:
+        listener.queue.put(marker, timeout=5)
+    except queue.Full:
+        return
+    done.wait(timeout=5)
+
+
+def dropped_records() -> int:
+    """Records below WARNING dropped because the log queue was full"""
+    return _queue_handler.dropped if _queue_handler else 0
+
+
+def shutdown_logging():
+    """Drain the queue, stop the background writer and close log files"""
+    global _listener, _queue_handler, _file_router
+    
+    with _setup_lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.flush()
+        _file_router.close()
+        if _queue_handler.dropped:
+            print(f"Logging queue full: dropped {_queue_handler.dropped} records", file=sys.stderr)
+        _listener = _queue_handler = _file_router = None
@@ -0,0 +1,310 @@
+"""
+Subprocess runner for the DQ Transformation Framework
+
+Runs engine and tool subprocesses with their output streamed line by line
+into the logger instead of being buffered whole. Keeps only a bounded tail of
+the output for failure reports, enforces timeouts, supports cancellation from
+another thread and turns dbt/Spark progress markers into live metrics.
+"""
+
+import os
+import re
+import sys
+import time
+import signal
+import logging
+import threading
+import subprocess
+import contextvars
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable, Union
+
+from .tracing import get_tracer
+
+
+@dataclass
+class ProcessResult:
+    """Outcome of a subprocess run"""
+    returncode: int
+    duration_seconds: float
+    stdout_tail: List[str] = field(default_factory=list)
+    stderr_tail: List[str] = field(default_factory=list)
+    timed_out: bool = False
+    cancelled: bool = False
+    progress: Dict[str, Any] = field(default_factory=dict)
+    rusage: Dict[str, Any] = field(default_factory=dict)  # CPU and peak RSS of the process tree
+    
+    @property
+    def success(self) -> bool:
+        """True if the process exited cleanly on its own"""
+        return self.returncode == 0 and not self.timed_out and not self.cancelled
+
+
+class ProgressParser:
+    """Turns progress markers in subprocess output into metrics"""
+    
+    def parse(self, line: str, progress: Dict[str, Any]) -> bool:
+        """Update progress from a line; returns True if the line was a progress marker"""
+        return False
+    
+    def suppress(self, line: str) -> bool:
+        """True for lines that only redraw progress and should not be logged"""
+        return False
+
+
+class DbtProgressParser(ProgressParser):
+    """Node completion lines such as '3 of 12 OK created sql table model analytics.orders'"""
+    
+    START = re.compile(r'\b(\d+) of (\d+) START\b(.*?)\s*\.{3,}')
+    DONE = re.compile(r'\b(\d+) of (\d+) (OK|PASS|WARN|ERROR|FAIL|SKIP)\b(.*?)\s*\.{3,}')
+    
+    def parse(self, line: str, progress: Dict[str, Any]) -> bool:
+        match = self.START.search(line)
+        if match:
+            progress['total'] = int(match.group(2))
+            progress['running'] = match.group(3).split()[-1] if match.group(3).split() else None
+            return True
+        
+        match = self.DONE.search(line)
+        if match:
+            progress['total'] = int(match.group(2))
+            progress['completed'] = progress.get('completed', 0) + 1
+            if match.group(3) in ('ERROR', 'FAIL'):
+                progress['failed'] = progress.get('failed', 0) + 1
+            if match.group(4).split():
+                progress['last_completed'] = match.group(4).split()[-1]
+            return True
+        
+        return False
+
+
+class SparkProgressParser(ProgressParser):
+    """Console progress bars '[Stage 3:====>   (12 + 4) / 200]' and stage completion log lines"""
+    
+    BAR = re.compile(r'\[Stage (\d+):[=>\s]*\((\d+) \+ (\d+)\) / (\d+)\]')
+    STAGE_DONE = re.compile(r'Stage (\d+) \(.*\) finished in ([\d.]+) s')
+    JOB_DONE = re.compile(r'Job (\d+) finished:')
+    
+    def parse(self, line: str, progress: Dict[str, Any]) -> bool:
+        bars = self.BAR.findall(line)
+        if bars:
+            stage, completed, running, total = bars[-1]
+            progress.update({
+                'stage': int(stage),
+                'tasks_completed': int(completed),
+                'tasks_running': int(running),
+                'tasks_total': int(total)
+            })
+            return True
+        
+        match = self.STAGE_DONE.search(line)
+        if match:
+            progress['stages_completed'] = progress.get('stages_completed', 0) + 1
+            progress['last_stage_seconds'] = float(match.group(2))
+            return True
+        
+        if self.JOB_DONE.search(line):
+            progress['jobs_completed'] = progress.get('jobs_completed', 0) + 1
+            return True
+        
+        return False
+    
+    def suppress(self, line: str) -> bool:
+        return bool(self.BAR.search(line))
+
+
+class SubprocessRunner:
+    """Run a subprocess with streamed output, timeout and cancellation
+    
+    One runner is used per invocation; cancel() may be called from any thread.
+    """
+    
+    POLL_INTERVAL = 0.1
+    TERMINATE_GRACE_SECONDS = 10
+    
+    def __init__(self, name: str, logger: logging.Logger = None, timeout: float = None,
+                 tail_lines: int = 200, progress_parser: ProgressParser = None,
+                 stderr_level: int = logging.WARNING, progress_log_interval: float = 30,
+                 cancel_event: threading.Event = None):
+        self.name = name
+        self.logger = logger or logging.getLogger(__name__)
+        self.timeout = timeout
+        self.progress_parser = progress_parser or ProgressParser()
+        self.stderr_level = stderr_level
+        self.progress_log_interval = progress_log_interval
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[ProcessResult] = None
+        self._stdout_tail = deque(maxlen=tail_lines)
+        self._stderr_tail = deque(maxlen=tail_lines)
+        # An engine's event cancels every runner of its execution, including ones not started yet
+        self._cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self._lock = threading.Lock()
+        self._last_progress_log = 0.0
+    
+    def run(self, cmd: Union[str, List[str]], shell: bool = False, env: Dict[str, str] = None,
+            cwd: str = None, preexec_fn: Callable[[], None] = None) -> ProcessResult:
+        """Run a command to completion, streaming its output"""
+        with get_tracer().span(f"subprocess.{self.name}") as span:
+            result = self._run(cmd, shell, env, cwd, preexec_fn)
+            span.set_status(result.success)
+            span.set_attribute('returncode', result.returncode)
+            for key, value in result.rusage.items():
+                span.set_attribute(f"rusage.{key}", value)
+        self.result = result
+        return result
+    
+    def _run(self, cmd, shell, env, cwd, preexec_fn) -> ProcessResult:
+        started = time.monotonic()
+        if self._cancel_event.is_set():
+            return ProcessResult(returncode=-1, duration_seconds=0.0, cancelled=True)
+        
+        process = subprocess.Popen(
+            cmd,
+            shell=shell,
+            env=env,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors='replace',
+            bufsize=1,
+            preexec_fn=preexec_fn,
+            # Own process group so the whole tree (shell, JVM, ...) can be stopped
+            start_new_session=os.name == 'posix'
+        )
+        
+        # Readers run in copies of the caller's context so their log records keep its run/phase ids
+        readers = [
+            threading.Thread(target=contextvars.copy_context().run,
+                             args=(self._read_stream, process.stdout, self._stdout_tail, logging.INFO),
+                             name=f"{self.name}-stdout", daemon=True),
+            threading.Thread(target=contextvars.copy_context().run,
+                             args=(self._read_stream, process.stderr, self._stderr_tail, self.stderr_level),
+                             name=f"{self.name}-stderr", daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+        
+        timed_out = False
+        cancelled = False
+        kill_at = None
+        
+        while True:
+            returncode, rusage = self._poll(process)
+            if returncode is not None:
+                break
+            
+            if kill_at is None:
+                if self._cancel_event.wait(self.POLL_INTERVAL):
+                    cancelled = True
+                    self.logger.warning(f"Cancelling {self.name} process (pid {process.pid})")
+                elif self.timeout and time.monotonic() - started > self.timeout:
+                    timed_out = True
+                    self.logger.error(f"{self.name} process timed out after {self.timeout}s (pid {process.pid})")
+                
+                if cancelled or timed_out:
+                    self._signal(process, signal.SIGTERM)
+                    kill_at = time.monotonic() + self.TERMINATE_GRACE_SECONDS
+            else:
+                time.sleep(self.POLL_INTERVAL)
+                if time.monotonic() > kill_at:
+                    self._signal(process, getattr(signal, 'SIGKILL', signal.SIGTERM))
+                    kill_at = float('inf')
+        
+        for reader in readers:
+            reader.join(timeout=5)
+        
+        duration = time.monotonic() - started
+        self.logger.info(
+            f"{self.name} process exited with code {returncode} in {duration:.1f}s"
+            + (f", {rusage['cpu_seconds']}s CPU, {rusage['peak_rss_mb']} MB peak RSS" if rusage else "")
+        )
+        
+        with self._lock:
+            return ProcessResult(
+                returncode=returncode,
+                duration_seconds=round(duration, 3),
+                stdout_tail=list(self._stdout_tail),
+                stderr_tail=list(self._stderr_tail),
+                timed_out=timed_out,
+                cancelled=cancelled,
+                progress=dict(self.progress),
+                rusage=rusage
+            )
+    
+    def cancel(self):
+        """Stop the running process (SIGTERM, then SIGKILL after a grace period)"""
+        self._cancel_event.set()
+    
+    def tail(self) -> List[str]:
+        """Last output lines, stdout then stderr"""
+        with self._lock:
+            return list(self._stdout_tail) + list(self._stderr_tail)
+    
+    def _read_stream(self, stream, tail: deque, level: int):
+        """Log a stream line by line and keep its tail"""
+        for line in iter(stream.readline, ''):
+            line = line.rstrip('\r\n')
+            if not line:
+                continue
+            
+            with self._lock:
+                is_progress = self.progress_parser.parse(line, self.progress)
+            
+            if is_progress:
+                self._log_progress()
+            if is_progress and self.progress_parser.suppress(line):
+                continue
+            
+            with self._lock:
+                tail.append(line)
+            self.logger.log(level, f"[{self.name}] {line}")
+        stream.close()
+    
+    def _log_progress(self):
+        """Log progress metrics at most once per interval"""
+        now = time.monotonic()
+        if now - self._last_progress_log < self.progress_log_interval:
+            return
+        self._last_progress_log = now
+        with self._lock:
+            progress = dict(self.progress)
+        self.logger.info(f"{self.name} progress: {progress}")
+    
+    @staticmethod
+    def _poll(process: subprocess.Popen):
+        """Return (returncode, rusage) once the process has exited, else (None, None)"""
+        if not hasattr(os, 'wait4'):
+            return process.poll(), {}
+        
+        try:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        except ChildProcessError:
+            # Already reaped
+            return process.wait(), {}
+        
+        if pid == 0:
+            return None, None
+        
+        returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        process.returncode = returncode
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        maxrss_unit = 1 if sys.platform == 'darwin' else 1024
+        return returncode, {
+            'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 3),
+            'peak_rss_mb': round(usage.ru_maxrss * maxrss_unit / 2**20, 1)
+        }
+    
+    @staticmethod
+    def _signal(process: subprocess.Popen, signum: int):
+        """Send a signal to the process group (or the process on non-POSIX systems)"""
+        try:
+            if os.name == 'posix':
+                os.killpg(process.pid, signum)
+            elif signum == signal.SIGTERM:
+                process.terminate()
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
@@ -0,0 +1,258 @@
+"""
+Tracing utilities for the DQ Transformation Framework
+
+Lightweight nested spans for transformation phases, DQ checks and engine
+execution, exported in the OpenTelemetry OTLP/JSON format to a local file
+and/or an OTLP/HTTP collector. No OpenTelemetry SDK is required.
+
+Usage:
+    tracer = Tracer('my_transformation', output_dir)
+    with use_tracer(tracer), tracer.span('transformation.run'):
+        with get_tracer().span('pre_checks', table='raw.orders'):
+            ...
+    tracer.export()
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import functools
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+
+_current_tracer: contextvars.ContextVar = contextvars.ContextVar('dq_current_tracer', default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('dq_current_span', default=None)
+
+
+class Span:
+    """A timed operation within a trace"""
+    
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = 'unset'  # unset | ok | error
+        self.status_message: Optional[str] = None
+    
+    @property
+    def duration_ms(self) -> float:
+        """Duration in milliseconds (up to now if still open)"""
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+    
+    def set_attribute(self, key: str, value: Any):
+        """Attach an attribute to the span"""
+        self.attributes[key] = value
+    
+    def set_status(self, ok: bool, message: str = None):
+        """Mark the span as succeeded or failed"""
+        self.status = 'ok' if ok else 'error'
+        self.status_message = message
+
+
+class Tracer:
+    """Collects the spans of one transformation run"""
+    
+    def __init__(self, service_name: str, output_dir: str = None,
+                 otlp_endpoint: str = None, export_file: bool = True):
+        self.service_name = service_name
+        self.output_dir = output_dir
+        self.otlp_endpoint = otlp_endpoint or os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT')
+        self.export_file = export_file
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Open a span nested under the current span of this context"""
+        parent = _current_span.get()
+        span = Span(name, self.trace_id, parent.span_id if parent else None, attributes)
+        if parent is None and self.root is None:
+            self.root = span
+        token = _current_span.set(span)
+        
+        try:
+            yield span
+            if span.status == 'unset':
+                span.set_status(True)
+        except BaseException as e:
+            span.set_status(False, str(e))
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(span)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Per-run timing summary: total, top-level phases and durations per table"""
+        with self._lock:
+            spans = list(self.spans)
+        
+        root_id = self.root.span_id if self.root else None
+        
+        phases = {}
+        for span in spans:
+            if root_id and span.parent_id == root_id:
+                phases[span.name] = round(phases.get(span.name, 0.0) + span.duration_ms, 3)
+        
+        tables = {}
+        for span in spans:
+            if span.name == 'dq.table':
+                check_type = span.attributes.get('check_type', 'dq')
+                tables.setdefault(check_type, {})[span.attributes.get('table')] = round(span.duration_ms, 3)
+        
+        return {
+            'trace_id': self.trace_id,
+            'total_ms': round(self.root.duration_ms, 3) if self.root else 0.0,
+            'phases_ms': phases,
+            'tables_ms': tables
+        }
+    
+    def export(self) -> Optional[str]:
+        """Export spans to the trace file and/or OTLP collector"""
+        payload = self.to_otlp()
+        file_path = None
+        
+        if self.export_file and self.output_dir:
+            try:
+                traces_dir = os.path.join(self.output_dir, 'traces')
+                os.makedirs(traces_dir, exist_ok=True)
+                file_path = os.path.join(traces_dir, f"trace_{self.trace_id}.json")
+                with open(file_path, 'w') as f:
+                    json.dump(payload, f, indent=2)
+                self.logger.info(f"Trace exported: {file_path}")
+            except Exception as e:
+                self.logger.warning(f"Could not write trace file: {str(e)}")
+        
+        if self.otlp_endpoint:
+            try:
+                request = urllib.request.Request(
+                    f"{self.otlp_endpoint.rstrip('/')}/v1/traces",
+                    data=json.dumps(payload).encode('utf-8'),
+                    headers={'Content-Type': 'application/json'},
+                    method='POST'
+                )
+                with urllib.request.urlopen(request, timeout=5):
+                    pass
+                self.logger.info(f"Trace sent to collector: {self.otlp_endpoint}")
+            except Exception as e:
+                self.logger.warning(f"Could not send trace to collector {self.otlp_endpoint}: {str(e)}")
+        
+        return file_path
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        """Spans in OTLP/JSON (ExportTraceServiceRequest) form"""
+        with self._lock:
+            spans = list(self.spans)
+        
+        return {
+            'resourceSpans': [{
+                'resource': {
+                    'attributes': [_otlp_attribute('service.name', self.service_name)]
+                },
+                'scopeSpans': [{
+                    'scope': {'name': 'dq_framework'},
+                    'spans': [self._otlp_span(span) for span in spans]
+                }]
+            }]
+        }
+    
+    @staticmethod
+    def _otlp_span(span: Span) -> Dict[str, Any]:
+        """Single span in OTLP/JSON form"""
+        status_codes = {'unset': 0, 'ok': 1, 'error': 2}
+        otlp_span = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': 1,
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns or span.start_ns),
+            'attributes': [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+            'status': {'code': status_codes[span.status]}
+        }
+        if span.parent_id:
+            otlp_span['parentSpanId'] = span.parent_id
+        if span.status_message:
+            otlp_span['status']['message'] = span.status_message
+        return otlp_span
+
+
+class _NoopTracer:
+    """Tracer used when no run is being traced"""
+    
+    @contextmanager
+    def span(self, name: str, **attributes):
+        yield Span(name, '', None, attributes)
+
+
+_NOOP_TRACER = _NoopTracer()
+
+
+def get_tracer():
+    """Tracer of the current run, or a no-op tracer"""
+    return _current_tracer.get() or _NOOP_TRACER
+
+
+def current_span() -> Optional[Span]:
+    """Innermost active span, if any"""
+    return _current_span.get()
+
+
+@contextmanager
+def use_tracer(tracer: Tracer):
+    """Make a tracer current for the enclosed code"""
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+
+def traced(name: str):
+    """Decorator running a function inside a span of the current tracer"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            attributes = {}
+            # Record the transformation name when called with a TransformationConfig
+            for arg in args[1:2]:
+                if hasattr(arg, 'name') and hasattr(arg, 'target_tables'):
+                    attributes['transformation'] = arg.name
+            with get_tracer().span(name, **attributes) as span:
+                result = func(*args, **kwargs)
+                if result is False:
+                    span.set_status(False)
+                return result
+        return wrapper
+    return decorator
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Key/value in OTLP AnyValue form"""
+    if isinstance(value, bool):
+        encoded = {'boolValue': value}
+    elif isinstance(value, int):
+        encoded = {'intValue': str(value)}
+    elif isinstance(value, float):
+        encoded = {'doubleValue': value}
+    elif isinstance(value, (list, tuple)):
+        encoded = {'arrayValue': {'values': [{'stringValue': str(item)} for item in value]}}
+    else:
+        encoded = {'stringValue': str(value)}
+    return {'key': key, 'value': encoded}
@@ -15,136 +15,437 @@ import sys
 import os
 import argparse
 import yaml
+import time
+import uuid
 import logging
+import contextvars
 from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
-from abc import ABC, abstractmethod
+from dataclasses import replace
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
 
 # Add framework to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from engines.dbt_engine import DbtEngine
-from engines.sql_engine import SqlEngine
-from engines.spark_engine import SparkEngine
-from engines.python_engine import PythonEngine
+from engines import get_engine_class
+from engines.base import TransformationConfig, TransformationEngine
 from dq.gx_runner import GXRunner
-from utils.config import ConfigManager
+from dq.spark_checks import load_handoff, clear_handoff, uncovered_checks
 from utils.lineage import LineageTracker
-
-
-@dataclass
-class TransformationConfig:
-    """Configuration for a data transformation"""
-    name: str
-    type: str
-    source_tables: List[str]
-    target_tables: List[str]
-    transformation_config: Dict[str, Any]
-    pre_dq_checks: List[str]
-    post_dq_checks: List[str]
-    contract_path: str
-    output_dir: str
-    gx_suites_path: Optional[str] = None  # Path to Step 5 generated GX suites
-
-
-class TransformationEngine(ABC):
-    """Abstract base class for transformation engines"""
-    
-    @abstractmethod
-    def execute(self, config: TransformationConfig) -> bool:
-        """Execute the transformation"""
-        pass
-    
-    @abstractmethod
-    def validate_config(self, config: Dict[str, Any]) -> bool:
-        """Validate engine-specific configuration"""
-        pass
+from utils.staging import StagingArea
+from utils.fingerprint import hash_payload
+from utils.run_state import InputFingerprint, RunStateStore, PhaseCheckpoint, WatermarkStore
+from utils.retry import RetryPolicy, is_transient
+from utils.tracing import Tracer, use_tracer
+from utils.resources import ResourceTracker
+from utils.structured_logging import setup_logging, log_context, flush_logs
+from utils.connections import get_connection_pool, load_destination
 
 
 class DQCheckFailedException(Exception):
     """Exception raised when DQ checks fail"""
-    pass
+    
+    def __init__(self, message: str, cause=None):
+        super().__init__(message)
+        self.cause = cause  # Error that prevented the checks from running, if any
 
 
 class TransformationFailedException(Exception):
     """Exception raised when transformation execution fails"""
-    pass
+    
+    def __init__(self, message: str, cause=None):
+        super().__init__(message)
+        self.cause = cause  # Engine error or output explaining the failure, if any
 
 
 class DQTransformationWrapper:
     """Main wrapper class that enforces DQ checks around transformations"""
     
-    def __init__(self, config: TransformationConfig):
+    def __init__(self, config: TransformationConfig, engine: TransformationEngine = None):
         self.config = config
+        self.run_id = uuid.uuid4().hex
+        self.log_file = os.path.join(config.output_dir, 'transformation.log')
         self.logger = self._setup_logging()
-        self.engine = self._get_engine()
-        self.gx_runner = GXRunner(config.contract_path, config.output_dir, config.gx_suites_path)
+        if config.connections:
+            # Pool settings of this run apply to its destination only
+            get_connection_pool().configure(config.connections, load_destination(config.contract_path))
+        # A warm engine instance may be injected (e.g. by the worker daemon)
+        self.engine = engine or self._get_engine()
+        self.gx_runner = GXRunner(
+            config.contract_path,
+            config.output_dir,
+            config.gx_suites_path,
+            run_id=self.run_id,
+            cache_config=config.dq_cache,
+            cursor_columns=config.cursor_columns
+        )
         self.lineage_tracker = LineageTracker(config.output_dir)
+        self.run_state = RunStateStore(config.output_dir)
+        self.checkpoint = PhaseCheckpoint(config.output_dir)
+        self.watermarks = WatermarkStore(config.output_dir)
+        self.tracer = Tracer(
+            config.name,
+            config.output_dir,
+            otlp_endpoint=config.tracing.get('otlp_endpoint'),
+            export_file=config.tracing.get('export_file', True)
+        )
+        self.resources = ResourceTracker(trace_memory=config.resources.get('trace_memory', False))
+        self.skipped = False
+        self.attempts = 0
+        self.transient_failure = False
         
     def _setup_logging(self) -> logging.Logger:
-        """Setup logging configuration"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f'{self.config.output_dir}/transformation.log'),
-                logging.StreamHandler()
-            ]
+        """Setup logging configuration (records are written by a background thread)"""
+        logging_config = self.config.logging
+        setup_logging(
+            level=logging_config.get('level', 'INFO'),
+            console_format=logging_config.get('console_format', 'text'),
+            max_bytes=logging_config.get('max_bytes', 50 * 2**20),
+            backup_count=logging_config.get('backup_count', 5),
+            max_queue=logging_config.get('max_queue', 100000)
         )
         return logging.getLogger(__name__)
     
     def _get_engine(self) -> TransformationEngine:
-        """Get the appropriate transformation engine"""
-        engines = {
-            'dbt': DbtEngine,
-            'sql': SqlEngine,
-            'spark': SparkEngine,
-            'python': PythonEngine
-        }
-        
-        engine_class = engines.get(self.config.type)
-        if not engine_class:
-            raise ValueError(f"Unsupported transformation type: {self.config.type}")
-            
+        """Get the appropriate transformation engine (imported on first use)"""
+        engine_class = get_engine_class(self.config.type)
         return engine_class()
     
     def run(self) -> bool:
         """Execute transformation with enforced DQ checks"""
+        with log_context(run_id=self.run_id, transformation=self.config.name, log_file=self.log_file):
+            started_at = datetime.now()
+            try:
+                if not self.config.tracing.get('enabled', True):
+                    with self.resources.measure('run'):
+                        success = self._run_with_retries()
+                else:
+                    with use_tracer(self.tracer), self.resources.measure('run'):
+                        with self.tracer.span('transformation.run', transformation=self.config.name,
+                                              engine=self.config.type) as root:
+                            success = self._run_with_retries()
+                            root.set_status(success)
+                            root.set_attribute('skipped', self.skipped)
+                            root.set_attribute('attempts', self.attempts)
+                    
+                    self.tracer.export()
+            finally:
+                self.resources.close()
+            
+            self._generate_run_report(success, started_at)
+        
+        # Make the run log complete before returning to the caller
+        flush_logs()
+        return success
+    
+    def _run_with_retries(self) -> bool:
+        """Run, retrying with backoff while failures are transient"""
+        policy = RetryPolicy.from_config(self.config.retry, self.engine.idempotent)
+        attempt = 1
+        
+        while True:
+            self.attempts = attempt
+            success = self._run()
+            if success or not policy.should_retry(attempt, self.transient_failure):
+                return success
+            
+            delay = policy.delay(attempt)
+            self.logger.warning(
+                f"Transient failure on attempt {attempt}/{policy.max_attempts}, retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+            attempt += 1
+    
+    @contextmanager
+    def _phase(self, name: str, **attributes):
+        """Trace a phase, tag its log records and account for its resource usage"""
+        with log_context(phase=name), self.tracer.span(name, **attributes) as span, self.resources.measure(name):
+            yield span
+        
+        usage = self.resources.usage.get(name, {})
+        for key in ('cpu_user_seconds', 'cpu_system_seconds', 'children_peak_rss_mb'):
+            if key in usage:
+                span.set_attribute(f"resources.{key}", usage[key])
+    
+    def _run(self) -> bool:
+        """Run the transformation phases"""
         try:
             self.logger.info(f"Starting transformation: {self.config.name}")
             
             # Validate configuration
-            if not self.engine.validate_config(self.config.transformation_config):
+            if not self.engine.validate_config(self.config.transformation_config,
+                                               load_destination(self.config.contract_path)):
                 raise TransformationFailedException("Invalid transformation configuration")
             
-            # 1. Pre-transformation DQ checks
-            self.logger.info("Running pre-transformation DQ checks...")
-            if not self._run_pre_checks():
-                raise DQCheckFailedException("Pre-transformation DQ checks failed")
+            # Sources managed by the engine (e.g. lakehouse Parquet views) must exist before checks
+            with self._phase('sources'):
+                sources_ready = self.engine.prepare_sources(self.config)
+            if not sources_ready:
+                raise TransformationFailedException("Could not prepare transformation sources", self.engine.failure_cause())
+            
+            # 0. Skip when nothing changed since the last successful run
+            input_fingerprint, input_components = None, None
+            if self.config.skip_unchanged or self.config.checkpoints:
+                with self._phase('fingerprint'):
+                    input_fingerprint, input_components = self._compute_input_fingerprint()
+                if self.config.skip_unchanged and not self.config.force and self._is_unchanged(input_fingerprint):
+                    self.logger.info("Inputs unchanged since last successful run, skipping transformation")
+                    self.skipped = True
+                    return True
+            
+            # Resume after the phases a failed attempt already completed
+            self._load_checkpoint(input_fingerprint)
+            
+            # Staging is used when targets must not be written in place
+            staging = None
+            run_config = self.config
+            if self.config.execution_mode == 'speculative' or self.config.write_audit_publish:
+                if not self.engine.supports_staging:
+                    raise TransformationFailedException(
+                        f"Staged execution is not supported by the {self.config.type} engine"
+                    )
+                staging = StagingArea(self.config.contract_path, self.config.target_tables, self.config.staging_suffix)
+                if not self.checkpoint.is_complete('transformation'):
+                    with self._phase('staging.prepare'):
+                        staging.prepare()
+                run_config = replace(
+                    self.config,
+                    target_tables=staging.staging_tables,
+                    table_overrides=staging.mapping
+                )
+            
+            # In-job DQ results of an earlier execution must not stand in for this one
+            if not self.checkpoint.is_complete('transformation'):
+                clear_handoff(self.config.output_dir)
+            
+            if self.config.execution_mode == 'speculative':
+                # 1+2. Pre-checks overlapped with the transformation writing to staging
+                if not self._resumed('transformation'):
+                    self._run_speculative(run_config, staging)
+                    self._mark_phase('pre_checks')
+                    self._mark_phase('transformation', run_config.target_tables)
+            else:
+                # 1. Pre-transformation DQ checks
+                if not self._resumed('pre_checks'):
+                    self.logger.info("Running pre-transformation DQ checks...")
+                    with self._phase('pre_checks') as span:
+                        pre_checks_passed = self._run_pre_checks()
+                        span.set_status(pre_checks_passed)
+                    if not pre_checks_passed:
+                        raise DQCheckFailedException("Pre-transformation DQ checks failed", self.gx_runner.last_error)
+                    self._mark_phase('pre_checks')
+                
+                # 2. Execute transformation
+                if not self._resumed('transformation'):
+                    self.logger.info(f"Executing {self.config.type} transformation...")
+                    with self._phase('transformation', engine=self.config.type) as span:
+                        executed = self.engine.execute(run_config)
+                        span.set_status(executed)
+                    if not executed:
+                        if staging:
+                            staging.discard()
+                        raise TransformationFailedException("Transformation execution failed", self.engine.failure_cause())
+                    if staging:
+                        # Auditing or publishing a staging table this run did not write would replace good targets
+                        self._verify_staging(staging)
+                    self._mark_phase('transformation', run_config.target_tables)
             
-            # 2. Execute transformation
-            self.logger.info(f"Executing {self.config.type} transformation...")
-            if not self.engine.execute(self.config):
-                raise TransformationFailedException("Transformation execution failed")
+            if staging and not self.config.write_audit_publish:
+                # Speculative run without audit: publish before post-checks
+                if not self._resumed('publish'):
+                    with self._phase('publish'):
+                        staging.publish()
+                    self._mark_phase('publish', self.config.target_tables)
+                run_config = self.config
             
-            # 3. Post-transformation DQ checks
-            self.logger.info("Running post-transformation DQ checks...")
-            if not self._run_post_checks():
-                raise DQCheckFailedException("Post-transformation DQ checks failed")
+            # 3. Post-transformation DQ checks (audit staging in write-audit-publish mode)
+            if not self._resumed('post_checks'):
+                self.logger.info("Running post-transformation DQ checks...")
+                with self._phase('post_checks') as span:
+                    post_checks_passed = self._run_post_checks(run_config.target_tables)
+                    span.set_status(post_checks_passed)
+                if not post_checks_passed:
+                    if self.config.write_audit_publish:
+                        self._handle_failed_audit(staging)
+                    raise DQCheckFailedException("Post-transformation DQ checks failed", self.gx_runner.last_error)
+                self._mark_phase('post_checks')
+            
+            if self.config.write_audit_publish and not self._resumed('publish'):
+                # Publish audited staging tables with an atomic swap
+                self.logger.info("Audit passed, publishing staging tables...")
+                with self._phase('publish'):
+                    staging.publish(keep_previous=self.config.keep_previous)
+                self._mark_phase('publish', self.config.target_tables)
+            
+            # Engine-managed outputs are written from the published targets
+            if not self._resumed('export'):
+                with self._phase('export'):
+                    exported = self.engine.export_outputs(self.config)
+                if not exported:
+                    raise TransformationFailedException("Could not export transformation outputs", self.engine.failure_cause())
+                self._mark_phase('export')
+            
+            # Incremental models advance their watermark only once output is checked and published
+            self.watermarks.commit()
             
             # 4. Update lineage
-            self.logger.info("Updating data lineage...")
-            self._update_lineage()
+            if not self._resumed('lineage'):
+                self.logger.info("Updating data lineage...")
+                with self._phase('lineage'):
+                    self._update_lineage()
+                self._mark_phase('lineage')
             
+            if input_fingerprint:
+                with self._phase('run_state'):
+                    self.run_state.save(
+                        input_fingerprint,
+                        input_components,
+                        self.gx_runner.fingerprinter.fingerprint_many(self.config.target_tables)
+                    )
+            
+            self.checkpoint.clear()
+            self.transient_failure = False
             self.logger.info("Transformation completed successfully!")
             return True
             
         except Exception as e:
-            self.logger.error(f"Transformation failed: {str(e)}")
+            self.transient_failure = is_transient(getattr(e, 'cause', None)) or is_transient(e)
+            self.logger.error(f"Transformation failed{' (transient)' if self.transient_failure else ''}: {str(e)}")
             self._generate_failure_report(str(e))
             return False
     
+    def _load_checkpoint(self, input_fingerprint: Optional[str]):
+        """Load completed phases, discarding them if their output tables changed since"""
+        if not self.config.checkpoints:
+            self.checkpoint.load(None)
+            return
+        if self.config.force and self.attempts <= 1:
+            # Forced runs start from scratch but their retries still resume
+            self.checkpoint.clear()
+        
+        phases = self.checkpoint.load(input_fingerprint)
+        for phase in phases:
+            recorded = self.checkpoint.tables(phase)
+            if recorded and self.gx_runner.fingerprinter.fingerprint_many(list(recorded)) != recorded:
+                self.logger.info(f"Tables written by {phase} changed since the checkpoint, starting from scratch")
+                self.checkpoint.clear()
+                self.checkpoint.load(input_fingerprint)
+                return
+        
+        if phases:
+            self.logger.info(f"Resuming failed run; completed phases: {sorted(phases)}")
+    
+    def _resumed(self, phase: str) -> bool:
+        """Whether a phase can be skipped because an earlier attempt completed it"""
+        if self.checkpoint.is_complete(phase):
+            self.logger.info(f"Skipping {phase}: completed by an earlier attempt with the same inputs")
+            return True
+        return False
+    
+    def _mark_phase(self, phase: str, tables: List[str] = None):
+        """Checkpoint a completed phase with the state of the tables it wrote"""
+        if not self.checkpoint.fingerprint:
+            return
+        try:
+            states = self.gx_runner.fingerprinter.fingerprint_many(tables) if tables else None
+            self.checkpoint.mark(phase, states)
+        except Exception as e:
+            self.logger.warning(f"Could not checkpoint {phase}: {str(e)}")
+    
+    def _compute_input_fingerprint(self):
+        """Input fingerprint of this run, or (None, None) if it cannot be determined"""
+        try:
+            components = InputFingerprint(self.config, self.gx_runner.fingerprinter).components()
+            if components is None:
+                return None, None
+            return hash_payload(components), components
+        except Exception as e:
+            self.logger.warning(f"Could not compute input fingerprint: {str(e)}")
+            return None, None
+    
+    def _is_unchanged(self, input_fingerprint: Optional[str]) -> bool:
+        """Check inputs and targets against the last successful run"""
+        if not input_fingerprint:
+            return False
+        
+        state = self.run_state.load()
+        if not state or state.get('fingerprint') != input_fingerprint:
+            return False
+        
+        # Targets modified or dropped outside the framework must be rebuilt
+        current_targets = self.gx_runner.fingerprinter.fingerprint_many(self.config.target_tables)
+        return current_targets == state.get('target_state')
+    
+    def _run_speculative(self, staged_config: TransformationConfig, staging: StagingArea):
+        """Run pre-checks while the engine writes to staging tables
+        
+        The transformation starts immediately against staging copies of the
+        targets. If pre-checks fail the engine is cancelled and staging is
+        discarded.
+        """
+        self.logger.info(f"Executing {self.config.type} transformation speculatively into staging...")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Run the engine in a copy of this context so its spans join the trace
+            engine_context = contextvars.copy_context()
+            engine_future = executor.submit(engine_context.run, self._execute_traced, staged_config)
+            
+            self.logger.info("Running pre-transformation DQ checks...")
+            try:
+                with self._phase('pre_checks') as span:
+                    pre_checks_passed = self._run_pre_checks()
+                    span.set_status(pre_checks_passed)
+            except Exception:
+                pre_checks_passed = False
+            
+            if not pre_checks_passed:
+                self.logger.warning("Pre-checks failed, cancelling speculative transformation")
+                # Wait for the engine to stop before dropping its staging tables; the cancel is
+                # repeated because an execution that had not started yet resets it when it does
+                self.engine.cancel()
+                while not wait([engine_future], timeout=1).done:
+                    self.engine.cancel()
+                staging.discard()
+                raise DQCheckFailedException("Pre-transformation DQ checks failed", self.gx_runner.last_error)
+            
+            if not engine_future.result():
+                staging.discard()
+                raise TransformationFailedException("Transformation execution failed", self.engine.failure_cause())
+        
+        self._verify_staging(staging)
+    
+    def _verify_staging(self, staging: StagingArea):
+        """Fail the run if the engine did not write every staging table
+        
+        A missing staging table means the script wrote (or skipped) a target
+        directly; publishing would replace the target with nothing.
+        """
+        with self._phase('staging.verify'):
+            missing = staging.missing_tables()
+        if missing:
+            staging.discard()
+            raise TransformationFailedException(
+                f"Transformation did not write staging tables {missing}; it may have written the targets "
+                "directly (use the staged --target-tables or schema-qualified references)"
+            )
+    
+    def _execute_traced(self, config: TransformationConfig) -> bool:
+        """Execute the engine inside a transformation span"""
+        with self._phase('transformation', engine=self.config.type) as span:
+            executed = self.engine.execute(config)
+            span.set_status(executed)
+            return executed
+    
+    def _handle_failed_audit(self, staging: StagingArea):
+        """Keep or drop staging tables that failed the audit; targets are untouched"""
+        if self.config.keep_failed_staging:
+            self.logger.warning(
+                f"Audit failed, staging tables kept for inspection: {staging.staging_tables}"
+            )
+        else:
+            staging.discard()
+    
     def _run_pre_checks(self) -> bool:
         """Run pre-transformation DQ checks"""
         if not self.config.pre_dq_checks:
@@ -157,49 +458,102 @@ class DQTransformationWrapper:
             check_type="pre_transformation"
         )
     
-    def _run_post_checks(self) -> bool:
+    def _run_post_checks(self, tables: List[str] = None) -> bool:
         """Run post-transformation DQ checks"""
-        if not self.config.post_dq_checks:
+        tables = tables or self.config.target_tables
+        check_names = self.config.post_dq_checks
+        in_job_passed = True
+        if self.config.post_checks_in_job:
+            # Results computed by the job on its output DataFrames, without re-reading the tables
+            handoff = load_handoff(self.config.output_dir)
+            outcome = self.gx_runner.record_in_job_results(handoff, tables, check_type="post_transformation_in_job")
+            if outcome is not None:
+                in_job_passed = outcome
+                # Configured checks the job did not evaluate still run against the written tables
+                check_names = uncovered_checks(handoff, tables, check_names or [])
+                if not check_names:
+                    return in_job_passed
+            else:
+                self.logger.warning("Incomplete in-job DQ results, checking the written tables instead")
+        
+        if not check_names:
             self.logger.info("No post-transformation DQ checks configured")
-            return True
+            return in_job_passed
             
-        return self.gx_runner.run_checks(
-            check_names=self.config.post_dq_checks,
-            tables=self.config.target_tables,
+        passed = self.gx_runner.run_checks(
+            check_names=check_names,
+            tables=tables,
             check_type="post_transformation"
         )
+        return passed and in_job_passed
     
     def _update_lineage(self):
         """Update data lineage information"""
-        lineage_info = {
-            'transformation_name': self.config.name,
-            'transformation_type': self.config.type,
-            'source_tables': self.config.source_tables,
-            'target_tables': self.config.target_tables,
-            'contract_path': self.config.contract_path,
-            'execution_time': self.logger.handlers[0].formatter.formatTime(
-                logging.LogRecord('', 0, '', 0, '', (), None)
-            )
-        }
-        
-        self.lineage_tracker.track_transformation(lineage_info)
+        self.lineage_tracker.track_transformation(
+            transformation_id=self.config.name,
+            engine_type=self.config.type,
+            source_tables=self.config.source_tables,
+            target_tables=self.config.target_tables,
+            config_path=self.config.contract_path,
+            metadata={
+                'execution_time': datetime.now().isoformat(),
+                'timings': self.tracer.summary()
+            }
+        )
+        self.lineage_tracker.save_lineage()
     
     def _generate_failure_report(self, error_message: str):
         """Generate a failure report"""
         report_path = f"{self.config.output_dir}/failure_report.yaml"
         failure_info = {
+            'run_id': self.run_id,
             'transformation_name': self.config.name,
             'transformation_type': self.config.type,
             'error_message': error_message,
             'source_tables': self.config.source_tables,
             'target_tables': self.config.target_tables,
-            'contract_path': self.config.contract_path
+            'contract_path': self.config.contract_path,
+            'timings': self.tracer.summary(),
+            'resources': self.resources.usage,
+            'engine_output_tail': self.engine.output_tail(),
+            'attempt': self.attempts,
+            'transient': self.transient_failure
         }
         
         with open(report_path, 'w') as f:
             yaml.dump(failure_info, f, default_flow_style=False)
         
         self.logger.info(f"Failure report generated: {report_path}")
+    
+    def _generate_run_report(self, success: bool, started_at: datetime):
+        """Generate the execution summary with timings and resource usage"""
+        if self.skipped:
+            # Keep the report of the last run that did the work (used for cost estimates)
+            return
+        
+        report_path = f"{self.config.output_dir}/reports/transformation_report.yaml"
+        report = {
+            'run_id': self.run_id,
+            'transformation_name': self.config.name,
+            'transformation_type': self.config.type,
+            'status': 'skipped' if self.skipped else 'success' if success else 'failed',
+            'started_at': started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'timings': self.tracer.summary(),
+            'resources': self.resources.usage,
+            'engine_process': self.engine.process_usage(),
+            'query_regressions': self.engine.query_regressions,
+            'engine_settings': self.engine.engine_settings,
+            'resource_limits': self.config.resources.get('limits', {})
+        }
+        
+        try:
+            os.makedirs(os.path.dirname(report_path), exist_ok=True)
+            with open(report_path, 'w') as f:
+                yaml.dump(report, f, default_flow_style=False, sort_keys=False)
+            self.logger.info(f"Run report generated: {report_path}")
+        except Exception as e:
+            self.logger.warning(f"Could not write run report: {str(e)}")
 
 
 def load_config(config_path: str, contract_path: str, output_dir: str) -> TransformationConfig:
@@ -216,6 +570,9 @@ def load_config(config_path: str, contract_path: str, output_dir: str) -> Transf
     gx_config = data_quality.get('gx_config', {})
     gx_suites_path = gx_config.get('suites_path', '../../gx_generation/suites_cli')
     
+    fingerprint = config_data.get('fingerprint', {})
+    execution = config_data.get('execution', {})
+    
     return TransformationConfig(
         name=transformation['name'],
         type=transformation['type'],
@@ -226,27 +583,51 @@ def load_config(config_path: str, contract_path: str, output_dir: str) -> Transf
         post_dq_checks=data_quality.get('post_checks', []),
         contract_path=contract_path,
         output_dir=output_dir,
-        gx_suites_path=gx_suites_path
+        gx_suites_path=gx_suites_path,
+        dq_cache=data_quality.get('cache', {}),
+        post_checks_in_job=data_quality.get('post_checks_in_job', False),
+        cursor_columns=fingerprint.get('cursor_columns', {}),
+        execution_mode=execution.get('mode', 'standard'),
+        staging_suffix=execution.get('staging_suffix'),
+        write_audit_publish=execution.get('write_audit_publish', False),
+        keep_previous=execution.get('keep_previous', False),
+        keep_failed_staging=execution.get('keep_failed_staging', True),
+        skip_unchanged=execution.get('skip_unchanged', False),
+        timeout_seconds=execution.get('timeout_seconds'),
+        priority=execution.get('priority', 0),
+        checkpoints=execution.get('checkpoints', False),
+        retry=execution.get('retry', {}),
+        tracing=config_data.get('tracing', {}),
+        resources=config_data.get('resources', {}),
+        logging=config_data.get('logging', {}),
+        connections=config_data.get('connections', {})
     )
 
 
+def prepare_output_dir(output_dir: str):
+    """Create the output directory layout used by a transformation run"""
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(f"{output_dir}/reports", exist_ok=True)
+    os.makedirs(f"{output_dir}/lineage", exist_ok=True)
+    os.makedirs(f"{output_dir}/logs", exist_ok=True)
+
+
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description='Execute data transformation with DQ enforcement')
     parser.add_argument('--contract', required=True, help='Path to data contract YAML file')
     parser.add_argument('--config', required=True, help='Path to transformation config YAML file')
     parser.add_argument('--output', default='./output', help='Output directory for reports and logs')
+    parser.add_argument('--force', action='store_true', help='Run even if inputs are unchanged since the last successful run')
     
     args = parser.parse_args()
     
     # Create output directory
-    os.makedirs(args.output, exist_ok=True)
-    os.makedirs(f"{args.output}/reports", exist_ok=True)
-    os.makedirs(f"{args.output}/lineage", exist_ok=True)
-    os.makedirs(f"{args.output}/logs", exist_ok=True)
+    prepare_output_dir(args.output)
     
     # Load configuration
     config = load_config(args.config, args.contract, args.output)
+    config.force = args.force
     
     # Execute transformation
     wrapper = DQTransformationWrapper(config)